@@ -21,6 +21,31 @@ def get_endpoints():
             "methods": ["POST"],
             "description": "Check wallet addresses against flagged datasets."
         },
+        {
+            "endpoint": "/api/taint",
+            "methods": ["POST"],
+            "description": "Stream a budgeted multi-hop taint crawl towards flagged addresses."
+        },
+        {
+            "endpoint": "/api/path",
+            "methods": ["POST"],
+            "description": "Find the k shortest paths between two addresses with transaction evidence."
+        },
+        {
+            "endpoint": "/api/similar_wallets",
+            "methods": ["POST"],
+            "description": "Find wallets with similar counterparty sets using a MinHash/LSH index."
+        },
+        {
+            "endpoint": "/api/metrics/batch",
+            "methods": ["POST"],
+            "description": "Stream metrics for many wallets as each one completes."
+        },
+        {
+            "endpoint": "/api/clusters",
+            "methods": ["POST"],
+            "description": "Resolve family-tree clusters and shared-cluster membership for addresses."
+        },
     
         {
             "endpoint": "/api/metrics",
@@ -35,7 +60,7 @@ def get_endpoints():
         {
             "endpoint": "/api/origins",
             "methods": ["POST"],
-            "description": "Analyze and fetch origin data for wallet addresses."
+            "description": "Analyze and fetch origin data for wallet addresses; set \"stream\": true for NDJSON results per address."
         },
         {
             "endpoint": "/api/visualize",
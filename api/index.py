@@ -7,17 +7,20 @@ import logging
 import base64
 import json
 import asyncio
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
 import firebase_admin
 from firebase_admin import credentials, db, auth, storage
 from dotenv import load_dotenv
 from flask_cors import CORS
 
 # Importing Turnqey modules
-from api.turnqey.metrics import calculate_metrics
+from api.turnqey.metrics import calculate_metrics, calculate_batch_metrics
+from api.turnqey.metrics_sketch import METRICS_MODES
+from api.turnqey.risk_scoring import RISK_MODELS
 from api.turnqey.narrative import generate_narrative
-from api.turnqey.origins import process_addresses_async
-from api.turnqey.visualize import create_visualization
+from api.turnqey.common_counterparties import DEFAULT_MIN_SHARED, CounterpartyIncidence, common_counterparty_summary
+from api.turnqey.origins import iter_processed_addresses, process_addresses_async, unique_batch_addresses
+from api.turnqey.visualize import DEFAULT_MAX_COUNTERPARTIES, create_visualization
 from api.turnqey.full_report import generate_turnqey_report
 
 # Importing additional tools and utilities
@@ -29,6 +32,13 @@ from api.tools.address_checker import (
     check_wallet_address,
     clean_and_validate_addresses,
 )
+from api.tools.cluster_index import get_cluster_index
+from api.tools.exposure_index import lookup_exposure
+from api.tools.taint_crawler import crawl_taint
+from api.tools.path_finder import find_paths
+from api.tools.centrality import lookup_centrality
+from api.tools.similarity_index import find_similar_wallets
+from api.tools.time_windows import parse_time_range
 
 # Load environment variables
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -81,6 +91,27 @@ def run_async(func, *args, **kwargs):
     asyncio.set_event_loop(loop)
     return loop.run_until_complete(func(*args, **kwargs))
 
+# Helper for streaming an async generator as newline-delimited JSON
+def stream_async(func, *args, **kwargs):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    agen = func(*args, **kwargs)
+    try:
+        while True:
+            try:
+                item = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                # Headers are already sent, so report the failure in-band.
+                logger.error(f"Streaming error: {e}")
+                yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+                break
+            yield json.dumps(item) + "\n"
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
 @app.route("/api/health", methods=["GET"])
 def health_check():
     """
@@ -152,12 +183,68 @@ def metrics_endpoint():
         wallet_address = data.get('wallet_address')
         if not wallet_address:
             return jsonify({"error": "Wallet address is required."}), 400
-        metrics = run_async(calculate_metrics, wallet_address)
+        try:
+            start, end = parse_time_range(data.get('from'), data.get('to'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        mode = data.get('mode', 'auto')
+        rolling = bool(data.get('rolling', False))
+        if mode not in METRICS_MODES:
+            return jsonify({"error": f"Invalid mode. Use one of: {', '.join(METRICS_MODES)}."}), 400
+        if mode == 'approximate' and rolling:
+            return jsonify({"error": "Rolling windows are only available in exact mode."}), 400
+        risk_model = data.get('risk_model')
+        if risk_model is not None and risk_model not in RISK_MODELS:
+            return jsonify({"error": f"Unknown risk model. Available: {', '.join(RISK_MODELS)}."}), 400
+        metrics = run_async(
+            calculate_metrics,
+            wallet_address,
+            start=start,
+            end=end,
+            rolling=rolling,
+            mode=mode,
+            risk_model=risk_model,
+        )
         return jsonify(metrics), 200
     except Exception as e:
         logger.error(f"Metrics endpoint error: {e}")
         return jsonify({"error": str(e)}), 500
 
+MAX_BATCH_WALLETS = 500
+
+@app.route('/api/metrics/batch', methods=['POST'])
+@firebase_auth_middleware
+def batch_metrics_endpoint():
+    """
+    Calculate metrics for a list of wallets, streaming one NDJSON result per wallet as it completes.
+    """
+    try:
+        data = request.get_json()
+        wallet_addresses = data.get('wallet_addresses')
+        if not wallet_addresses or not isinstance(wallet_addresses, list):
+            return jsonify({"error": "A list of wallet addresses is required."}), 400
+        if len(wallet_addresses) > MAX_BATCH_WALLETS:
+            return jsonify({"error": f"At most {MAX_BATCH_WALLETS} wallet addresses per batch."}), 400
+
+        invalid = [addr for addr in wallet_addresses if not isinstance(addr, str) or not is_valid_ethereum_address(addr)]
+        if invalid:
+            return jsonify({"error": "Invalid Ethereum addresses.", "invalid_addresses": invalid}), 400
+
+        mode = data.get('mode', 'auto')
+        if mode not in METRICS_MODES:
+            return jsonify({"error": f"Invalid mode. Use one of: {', '.join(METRICS_MODES)}."}), 400
+
+        # Deduplicate while keeping request order
+        wallet_addresses = list(dict.fromkeys(wallet_addresses))
+
+        return Response(
+            stream_with_context(stream_async(calculate_batch_metrics, wallet_addresses, data.get('chains'), mode=mode)),
+            mimetype='application/x-ndjson',
+        )
+    except Exception as e:
+        logger.error(f"Batch metrics endpoint error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/narrative', methods=['POST'])
 @firebase_auth_middleware
 def narrative_endpoint():
@@ -195,6 +282,79 @@ def narrative_endpoint():
         return jsonify({"error": str(e)}), 500
 
 
+def format_origins_result(result):
+    """
+    Shape one process_address result for the /api/origins response.
+    """
+    if isinstance(result, Exception):
+        logger.error(f"Error processing address: {result}")
+        return {"status": "ERROR", "details": str(result)}
+
+    known_origins = result.get("known_origins", [])
+    transactions = result.get("transactions", [])
+
+    # If you want to simplify/clean transactions further, do it here:
+    cleaned_transactions = []
+    for tx in transactions:
+        cleaned_transactions.append({
+            "hash": tx.get("hash"),
+            "from": tx.get("from"),
+            "to": tx.get("to"),
+            "value_ether": tx.get("value_ether"),
+            "function_name": tx.get("function_name", "N/A"),
+            "timestamp": tx.get("timestamp"),
+            "gas_used": tx.get("gas_used", "N/A")
+        })
+
+    if known_origins:
+        logger.info(f"Found {len(known_origins)} matches for address {result['address']}.")
+
+    return {
+        "address": result["address"],
+        "status": "PROCESSED",
+        "matched_origins": known_origins,
+        "transactions": cleaned_transactions,
+        "transaction_count": result.get("transaction_count", 0),
+        "complete": result.get("complete", True),
+        "chain_summaries": result.get("chain_summaries", {}),
+        "shared_transactions": result.get("shared_transactions", {}),
+        "method_summary": result.get("method_summary"),
+    }
+
+def parse_min_shared(value):
+    """
+    Validate the minimum number of batch addresses a counterparty must be shared by.
+    """
+    if value is None:
+        return DEFAULT_MIN_SHARED
+    if isinstance(value, bool) or not isinstance(value, int) or value < 2:
+        raise ValueError("min_shared must be an integer of at least 2.")
+    return value
+
+def parse_positive_int(value, name, default, maximum=None):
+    """
+    Validate an optional positive integer request field, capping it at maximum.
+    """
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"{name} must be a positive integer.")
+    return value if maximum is None else min(value, maximum)
+
+async def stream_origins(addresses, start=None, end=None, min_shared=DEFAULT_MIN_SHARED, include_transactions=False):
+    """
+    One NDJSON event per address in completion order, then the common counterparties of
+    the batch and a final "done" event.
+    """
+    completed = 0
+    incidence = CounterpartyIncidence()
+    async for result in iter_processed_addresses(addresses, start, end, include_transactions):
+        completed += 1
+        incidence.add_result(result)
+        yield {"event": "result", **format_origins_result(result), "completed": completed, "total": len(addresses)}
+    yield {"event": "common_counterparties", **common_counterparty_summary(incidence, min_shared)}
+    yield {"event": "done", "total": len(addresses)}
+
 @app.route('/api/origins', methods=['POST'])
 @firebase_auth_middleware
 def origins_endpoint():
@@ -207,11 +367,27 @@ def origins_endpoint():
           "address": "0xAddress1",
           "status": "PROCESSED",
           "matched_origins": [...],
-          "transactions": [...]
+          "transactions": [...],
+          "transaction_count": n,
+          "complete": true,
+          "chain_summaries": {"ethereum": {"transactions": n, "total_value": x, "first_seen": "...", "last_seen": "..."}},
+          "shared_transactions": {"0xAddress0": ["0xHash", ...]},
+          "method_summary": {"distinctMethods": n, "methods": [{"method": "transfer(address,uint256)", "calls": n, ...}]}
         },
         ...
-      ]
+      ],
+      "common_counterparties": {
+        "pairs": [{"addresses": [...], "commonCounterparties": n, "jaccard": x, "direct": bool}, ...],
+        "sharedCounterparties": [{"address": "0x...", "sharedBy": k, "addresses": [...]}, ...],
+        ...
+      }
     }
+    "min_shared" (default 2) sets how many input addresses a counterparty must be shared by to be listed.
+    "transactions" is only filled when "include_transactions" is true; otherwise each address
+    is summarized per chain without holding its history in memory.
+    With "stream": true the results are instead sent as newline-delimited JSON,
+    one {"event": "result", ...} line per address as soon as it completes,
+    followed by {"event": "common_counterparties", ...} and {"event": "done", "total": n}.
     """
     try:
         data = request.json
@@ -221,51 +397,37 @@ def origins_endpoint():
             logger.warning("No addresses provided in the request.")
             return jsonify({"error": "Addresses are required."}), 400
 
-        # Validate Ethereum addresses
-        valid_addresses = [addr for addr in addresses if is_valid_ethereum_address(addr)]
+        # Validate Ethereum addresses; repeats (in any letter case) are processed once
+        valid_addresses = unique_batch_addresses(addr for addr in addresses if is_valid_ethereum_address(addr))
         if not valid_addresses:
             logger.warning("No valid Ethereum addresses found in the input.")
             return jsonify({"error": "No valid Ethereum addresses provided."}), 400
 
         logger.info(f"Processing {len(valid_addresses)} valid addresses.")
 
+        # Optional time range; parse errors surface as 400s below
+        start, end = parse_time_range(data.get('from'), data.get('to'))
+        min_shared = parse_min_shared(data.get('min_shared'))
+        include_transactions = bool(data.get('include_transactions'))
+
+        if data.get('stream'):
+            return Response(
+                stream_with_context(stream_async(stream_origins, valid_addresses, start, end, min_shared, include_transactions)),
+                mimetype='application/x-ndjson',
+            )
+
         # Process addresses asynchronously
-        results = run_async(process_addresses_async, valid_addresses)
+        results = run_async(process_addresses_async, valid_addresses, start, end, include_transactions)
 
-        processed_results = []
+        incidence = CounterpartyIncidence()
         for result in results:
-            if isinstance(result, Exception):
-                logger.error(f"Error processing address: {result}")
-                processed_results.append({"status": "ERROR", "details": str(result)})
-                continue
-
-            known_origins = result.get("known_origins", [])
-            transactions = result.get("transactions", [])
-
-            # If you want to simplify/clean transactions further, do it here:
-            cleaned_transactions = []
-            for tx in transactions:
-                cleaned_transactions.append({
-                    "hash": tx.get("hash"),
-                    "from": tx.get("from"),
-                    "to": tx.get("to"),
-                    "value_ether": tx.get("value_ether"),
-                    "function_name": tx.get("function_name", "N/A"),
-                    "timestamp": tx.get("timestamp"),
-                    "gas_used": tx.get("gas_used", "N/A")
-                })
-
-            if known_origins:
-                logger.info(f"Found {len(known_origins)} matches for address {result['address']}.")
-
-            processed_results.append({
-                "address": result["address"],
-                "status": "PROCESSED",
-                "matched_origins": known_origins,
-                "transactions": cleaned_transactions,
-            })
-
-        return jsonify({"results": processed_results}), 200
+            incidence.add_result(result)
+        processed_results = [format_origins_result(result) for result in results]
+
+        return jsonify({
+            "results": processed_results,
+            "common_counterparties": common_counterparty_summary(incidence, min_shared),
+        }), 200
 
     except ValueError as e:
         logger.error(f"Validation error: {e}")
@@ -286,8 +448,13 @@ def visualize_endpoint():
         if not is_valid_ethereum_address(root_address):
             return jsonify({"error": "Invalid Ethereum address."}), 400
 
+        # Counterparties drawn individually; the rest are collapsed into one node
+        max_counterparties = data.get('max_counterparties', DEFAULT_MAX_COUNTERPARTIES)
+        if isinstance(max_counterparties, bool) or not isinstance(max_counterparties, int) or max_counterparties < 1:
+            return jsonify({"error": "max_counterparties must be a positive integer."}), 400
+
         # Run the visualization asynchronously
-        result = run_async(create_visualization, root_address)
+        result = run_async(create_visualization, root_address, max_counterparties)
         return jsonify(result), 200
 
     except Exception as e:
@@ -328,12 +495,125 @@ def check_wallet_address_endpoint():
         if not addresses:
             return jsonify({'error': 'Addresses parameter is required.'}), 400
         cleaned_addresses = clean_and_validate_addresses(addresses)
-        results = [check_wallet_address(address, []) for address in cleaned_addresses]
+        results = run_async(check_wallet_address, cleaned_addresses)
+        for result in results:
+            if result.get('address'):
+                result['exposure'] = lookup_exposure(result['address'])
+                result['centrality'] = lookup_centrality(result['address'])
         return jsonify({'results': results}), 200
     except Exception as e:
         logger.error(f"Error in checkaddress endpoint: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/taint', methods=['POST'])
+@firebase_auth_middleware
+def taint_endpoint():
+    """
+    Crawl counterparties hop by hop towards flagged addresses, streaming NDJSON progress events
+    followed by a final result with the shortest taint paths found.
+    """
+    try:
+        data = request.get_json()
+        wallet_address = data.get('wallet_address')
+        if not wallet_address:
+            return jsonify({'error': 'Wallet address is required.'}), 400
+        if not is_valid_ethereum_address(wallet_address):
+            return jsonify({'error': 'Invalid Ethereum address.'}), 400
+
+        options = {
+            'chains': data.get('chains'),
+            'max_depth': parse_positive_int(data.get('max_depth'), 'max_depth', 2, maximum=4),
+            'max_api_calls': parse_positive_int(data.get('max_api_calls'), 'max_api_calls', 60, maximum=300),
+            'max_nodes': parse_positive_int(data.get('max_nodes'), 'max_nodes', 2000, maximum=20000),
+        }
+        return Response(
+            stream_with_context(stream_async(crawl_taint, wallet_address, **options)),
+            mimetype='application/x-ndjson',
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in taint endpoint: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/path', methods=['POST'])
+@firebase_auth_middleware
+def path_endpoint():
+    """
+    Find the k shortest connections between two addresses over the family-tree
+    graph and cached transaction edges, with tx evidence for each hop.
+    """
+    try:
+        data = request.get_json()
+        source = data.get('source')
+        target = data.get('target')
+        if not source or not target:
+            return jsonify({'error': 'Source and target addresses are required.'}), 400
+        if not is_valid_ethereum_address(source) or not is_valid_ethereum_address(target):
+            return jsonify({'error': 'Invalid Ethereum address.'}), 400
+
+        k = parse_positive_int(data.get('k'), 'k', 3, maximum=10)
+        max_hops = parse_positive_int(data.get('max_hops'), 'max_hops', 6, maximum=12)
+        return jsonify(find_paths(source, target, k, max_hops)), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in path endpoint: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/similar_wallets', methods=['POST'])
+@firebase_auth_middleware
+def similar_wallets_endpoint():
+    """
+    Return the wallets whose counterparty sets are most similar to the given wallet's.
+    """
+    try:
+        data = request.get_json()
+        wallet_address = data.get('wallet_address')
+        if not wallet_address:
+            return jsonify({'error': 'Wallet address is required.'}), 400
+        if not is_valid_ethereum_address(wallet_address):
+            return jsonify({'error': 'Invalid Ethereum address.'}), 400
+
+        k = parse_positive_int(data.get('k'), 'k', 10, maximum=100)
+        similar = find_similar_wallets(wallet_address, k)
+        if similar is None:
+            return jsonify({'error': 'Wallet has not been analyzed yet. Run /api/metrics first.'}), 404
+        return jsonify({'wallet_address': wallet_address, 'similar_wallets': similar}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in similar_wallets endpoint: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/clusters', methods=['POST'])
+@firebase_auth_middleware
+def clusters_endpoint():
+    """
+    Look up the family-tree cluster of each address and whether they all share one cluster.
+    """
+    try:
+        data = request.get_json()
+        addresses = data.get('addresses', [])
+        member_limit = parse_positive_int(data.get('member_limit'), 'member_limit', 100, maximum=1000)
+        if not addresses:
+            return jsonify({'error': 'Addresses parameter is required.'}), 400
+        cleaned_addresses = clean_and_validate_addresses(addresses)
+        if not cleaned_addresses:
+            return jsonify({'error': 'No valid Ethereum addresses provided.'}), 400
+
+        index = get_cluster_index()
+        results = [index.describe(address, member_limit) for address in cleaned_addresses]
+        same_cluster = all(
+            index.same_cluster(cleaned_addresses[0], address) for address in cleaned_addresses[1:]
+        ) and results[0]['clustered']
+        return jsonify({'same_cluster': same_cluster, 'results': results}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in clusters endpoint: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/download/<filename>', methods=['GET'])
 @firebase_auth_middleware
 def download_results(filename):
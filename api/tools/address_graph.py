@@ -0,0 +1,240 @@
+import os
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from api.tools.family_tree_store import (
+    ADDRESS_SIZE,
+    FamilyTreeStore,
+    address_to_bytes,
+    bytes_to_address,
+    get_family_tree_store,
+    iter_tree_edges,
+)
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+ADDRESS_DTYPE = f"S{ADDRESS_SIZE}"
+
+# Where an edge came from
+EDGE_ORIGIN_TREE = 0
+EDGE_ORIGIN_TRANSACTION = 1
+
+
+def sorted_unique(values: np.ndarray) -> np.ndarray:
+    """
+    Sorted distinct values via sort + neighbour comparison, which stays fast on
+    numpy versions whose np.unique defaults to hashing.
+    """
+    values = np.sort(values, kind="stable")
+    if len(values) < 2:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def unique_first(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sorted distinct values and the index of each value's first occurrence.
+    """
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    keep = np.ones(len(ordered), dtype=bool)
+    if len(ordered) > 1:
+        np.not_equal(ordered[1:], ordered[:-1], out=keep[1:])
+    return ordered[keep], order[keep]
+
+
+def encode_addresses(addresses: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode hex addresses into a fixed-width byte array.
+
+    Returns (keys, valid); invalid entries are encoded as the zero address and
+    marked False in `valid`, since every 20-byte value is a legal address.
+    """
+    encoded = []
+    valid = []
+    for address in addresses:
+        try:
+            raw = address_to_bytes(address)
+            ok = len(raw) == ADDRESS_SIZE
+        except (AttributeError, TypeError, ValueError):
+            ok = False
+        encoded.append(raw if ok else b"")
+        valid.append(ok)
+    return np.array(encoded, dtype=ADDRESS_DTYPE), np.array(valid, dtype=bool)
+
+
+def search_sorted_addresses(table: np.ndarray, keys: np.ndarray, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Return the row of each key in a sorted address column, or -1 where it is absent.
+    """
+    if len(table) == 0 or len(keys) == 0:
+        return np.full(len(keys), -1, dtype=np.int64)
+    positions = np.searchsorted(table, keys)
+    clipped = np.minimum(positions, len(table) - 1)
+    found = (positions < len(table)) & (table[clipped] == keys)
+    if valid is not None:
+        found &= valid
+    return np.where(found, clipped, -1)
+
+
+class AddressGraph:
+    """
+    Compact address graph: a sorted address table, the directed edge list and
+    an undirected CSR adjacency used for breadth-first traversals.
+    """
+
+    def __init__(self, addresses: np.ndarray, src: np.ndarray, dst: np.ndarray, origin: Optional[np.ndarray] = None):
+        self.addresses = addresses
+        self.src = src
+        self.dst = dst
+        self.origin = origin if origin is not None else np.full(len(src), EDGE_ORIGIN_TREE, dtype=np.uint8)
+
+        n = len(addresses)
+        u = np.concatenate([src, dst])
+        v = np.concatenate([dst, src])
+        keep = u != v
+        keys = sorted_unique(u[keep].astype(np.int64) * n + v[keep])
+        self.indices = (keys % n).astype(np.int64) if n else keys
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        if n:
+            np.cumsum(np.bincount(keys // n, minlength=n), out=self.indptr[1:])
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.src)
+
+    def address(self, address_id: int) -> str:
+        return bytes_to_address(self.addresses[address_id])
+
+    def index_of(self, address: str) -> int:
+        return int(self.indices_of([address])[0])
+
+    def indices_of(self, addresses: Iterable[str]) -> np.ndarray:
+        return search_sorted_addresses(self.addresses, *encode_addresses(addresses))
+
+    def neighbors(self, address_id: int) -> np.ndarray:
+        return self.indices[self.indptr[address_id]:self.indptr[address_id + 1]]
+
+    def expand(self, frontier: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gather every (node, neighbor) pair for a frontier without a Python-level loop.
+        """
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        return np.repeat(frontier, lengths), self.indices[offsets]
+
+
+def collect_tree_edges(store: Optional[FamilyTreeStore], trees: Iterable[Dict[str, Any]] = ()) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collect directed edges as encoded address pairs from the store and extra tree entries.
+    """
+    src_parts = []
+    dst_parts = []
+    if store is not None and store.num_edges:
+        src_parts.append(store.addresses[store.edge_src])
+        dst_parts.append(store.addresses[store.edge_dst])
+
+    extra_edges = [(src, dst) for tree in trees for src, dst, _ in iter_tree_edges(tree)]
+    if extra_edges:
+        src_keys, src_valid = encode_addresses(e[0] for e in extra_edges)
+        dst_keys, dst_valid = encode_addresses(e[1] for e in extra_edges)
+        valid = src_valid & dst_valid
+        src_parts.append(src_keys[valid])
+        dst_parts.append(dst_keys[valid])
+
+    if not src_parts:
+        empty = np.zeros(0, dtype=ADDRESS_DTYPE)
+        return empty, empty
+    return np.concatenate(src_parts), np.concatenate(dst_parts)
+
+
+def build_address_graph(
+    store: Optional[FamilyTreeStore] = None,
+    trees: Iterable[Dict[str, Any]] = (),
+    extra_addresses: Iterable[str] = (),
+    transaction_edges: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> AddressGraph:
+    """
+    Build an AddressGraph over the family tree store plus any extra tree entries
+    (e.g. the flagged dataset) and encoded transaction edges. Extra addresses
+    are added as isolated nodes.
+    """
+    store = store if store is not None else get_family_tree_store()
+    src_bytes, dst_bytes = collect_tree_edges(store, trees)
+    n_tree_edges = len(src_bytes)
+    if transaction_edges is not None and len(transaction_edges[0]):
+        src_bytes = np.concatenate([src_bytes, transaction_edges[0]])
+        dst_bytes = np.concatenate([dst_bytes, transaction_edges[1]])
+    extra, valid = encode_addresses(extra_addresses)
+    roots = store.addresses[store.tree_roots] if len(store) else np.zeros(0, dtype=ADDRESS_DTYPE)
+
+    table, inverse = np.unique(np.concatenate([src_bytes, dst_bytes, extra[valid], roots]), return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n_edges = len(src_bytes)
+    origin = np.full(n_edges, EDGE_ORIGIN_TRANSACTION, dtype=np.uint8)
+    origin[:n_tree_edges] = EDGE_ORIGIN_TREE
+    graph = AddressGraph(table, inverse[:n_edges], inverse[n_edges:2 * n_edges], origin)
+    logger.info(f"Built address graph with {len(graph)} addresses and {graph.num_edges} edges.")
+    return graph
+
+
+def save_lookup_table(path: str, addresses: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+    """
+    Persist a lookup table sorted by address as a structured .npy file.
+    """
+    dtype = [("address", ADDRESS_DTYPE)] + [(name, values.dtype) for name, values in columns.items()]
+    order = np.argsort(addresses, kind="stable")
+    table = np.zeros(len(addresses), dtype=dtype)
+    table["address"] = addresses[order]
+    for name, values in columns.items():
+        table[name] = values[order]
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, table)
+    os.replace(tmp_path, path)
+
+
+class AddressLookupTable:
+    """
+    Memory-mapped, address-sorted lookup table written by save_lookup_table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.table = np.load(path, mmap_mode="r")
+        self.mtime = os.path.getmtime(path)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def rows_of(self, addresses: Iterable[str]) -> np.ndarray:
+        return search_sorted_addresses(self.table["address"], *encode_addresses(addresses))
+
+    def get(self, address: str) -> Optional[Dict[str, Any]]:
+        row = int(self.rows_of([address])[0])
+        if row < 0:
+            return None
+        record = self.table[row]
+        return {name: record[name].item() for name in self.table.dtype.names if name != "address"}
+
+    def address(self, row: int) -> str:
+        return bytes_to_address(self.table["address"][row])
+
+    def addresses_of(self, rows: np.ndarray) -> List[str]:
+        return [bytes_to_address(raw) for raw in self.table["address"][rows]]
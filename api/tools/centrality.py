@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from api.tools.address_checker import load_flagged_data, get_unique_addresses
+from api.tools.address_graph import AddressGraph, AddressLookupTable, build_address_graph, save_lookup_table
+from api.tools.family_tree_store import DATA_DIR, get_family_tree_store
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+CENTRALITY_INDEX_PATH = os.path.join(DATA_DIR, "centrality_index.npy")
+DEFAULT_DAMPING = 0.85
+DEFAULT_TOLERANCE = 1e-9
+DEFAULT_MAX_ITERATIONS = 100
+
+
+def pagerank(
+    graph: AddressGraph,
+    damping: float = DEFAULT_DAMPING,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+    directed: bool = False,
+) -> np.ndarray:
+    """
+    PageRank by power iteration over the graph's edge list.
+
+    Each iteration is one sparse matrix-vector product expressed as a gather
+    over source ids and a weighted np.bincount over destination ids, so memory
+    and time are linear in the edge count. Family-tree edges record discovery
+    order rather than fund flow, so the graph is treated as undirected unless
+    `directed` is set.
+    """
+    n = len(graph)
+    if n == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    src, dst = graph.src, graph.dst
+    if not directed:
+        src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+
+    out_degree = np.bincount(src, minlength=n).astype(np.float64)
+    dangling = out_degree == 0
+    edge_weight = 1.0 / out_degree[src]
+
+    rank = np.full(n, 1.0 / n)
+    for iteration in range(max_iterations):
+        spread = np.bincount(dst, weights=rank[src] * edge_weight, minlength=n)
+        updated = damping * (spread + rank[dangling].sum() / n) + (1.0 - damping) / n
+        delta = np.abs(updated - rank).sum()
+        rank = updated
+        if delta < tolerance:
+            logger.info(f"PageRank converged after {iteration + 1} iterations.")
+            break
+    return rank
+
+
+def build_centrality_index(output_path: str = CENTRALITY_INDEX_PATH, **kwargs) -> Dict[str, Any]:
+    """
+    Batch job: score every address in the combined family-tree and flagged graph
+    and persist score, rank and percentile in an mmap-able lookup table.
+    """
+    started = time.perf_counter()
+    store = get_family_tree_store()
+    flagged_data = load_flagged_data() or []
+    graph = build_address_graph(store, trees=flagged_data, extra_addresses=get_unique_addresses(flagged_data))
+
+    scores = pagerank(graph, **kwargs)
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(scores), dtype=np.uint32)
+    ranks[order] = np.arange(1, len(scores) + 1, dtype=np.uint32)
+    percentiles = (1.0 - (ranks - 1) / max(len(scores), 1)).astype(np.float32)
+
+    save_lookup_table(output_path, graph.addresses, {
+        "score": scores.astype(np.float32),
+        "rank": ranks,
+        "percentile": percentiles,
+    })
+
+    stats = {
+        "addresses": len(graph),
+        "edges": graph.num_edges,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Wrote centrality index to {output_path}: {stats}")
+    return stats
+
+
+_index_lock = threading.Lock()
+_centrality_index: Optional[AddressLookupTable] = None
+
+
+def get_centrality_index() -> Optional[AddressLookupTable]:
+    """
+    Return the mmap'd centrality index, reloading it when the batch job rewrites the file.
+    Returns None until the job has been run.
+    """
+    global _centrality_index
+    with _index_lock:
+        if not os.path.exists(CENTRALITY_INDEX_PATH):
+            if _centrality_index is None:
+                logger.warning(f"Centrality index not built yet at {CENTRALITY_INDEX_PATH}.")
+            return _centrality_index
+        if _centrality_index is None or os.path.getmtime(CENTRALITY_INDEX_PATH) != _centrality_index.mtime:
+            _centrality_index = AddressLookupTable(CENTRALITY_INDEX_PATH)
+        return _centrality_index
+
+
+def lookup_centrality(address: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the centrality score, rank and percentile of an address, or None if unscored.
+    """
+    index = get_centrality_index()
+    if index is None:
+        return None
+    record = index.get(address)
+    if record is None:
+        return None
+    return {
+        "score": record["score"],
+        "rank": record["rank"],
+        "percentile": round(record["percentile"], 6),
+        "of": len(index),
+    }
+
+
+def rank_by_centrality(addresses: Iterable[str], top_n: int = 5) -> Optional[List[Dict[str, Any]]]:
+    """
+    Return the top_n given addresses ordered by centrality, skipping unscored ones.
+    """
+    index = get_centrality_index()
+    if index is None:
+        return None
+    addresses = list(addresses)
+    rows = index.rows_of(addresses)
+    scored = np.flatnonzero(rows >= 0)
+    if scored.size == 0:
+        return []
+    table_rows = rows[scored]
+    ranks = np.asarray(index.table["rank"])[table_rows]
+    best = np.argsort(ranks, kind="stable")[:top_n]
+    return [
+        {
+            "address": addresses[scored[i]],
+            "score": float(index.table["score"][table_rows[i]]),
+            "rank": int(ranks[i]),
+            "percentile": round(float(index.table["percentile"][table_rows[i]]), 6),
+        }
+        for i in best
+    ]
+
+
+if __name__ == "__main__":
+    print(json.dumps(build_centrality_index(), indent=4))
@@ -0,0 +1,225 @@
+import os
+import glob
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from api.tools.address_checker import load_flagged_data
+from api.tools.family_tree_store import (
+    FAMILY_TREE_GLOB,
+    FamilyTreeStore,
+    get_family_tree_store,
+    iter_tree_edges,
+)
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class ClusterIndex:
+    """
+    Disjoint-set clustering over family tree and flagged dataset addresses.
+
+    Addresses present in the family tree store reuse its address ids, so the
+    initial build needs no per-address dictionary. Addresses introduced later
+    (flagged dataset entries, newly added tree files) get ids appended after
+    the store range. Each set also keeps a circular member list so members can
+    be enumerated in time proportional to the cluster size.
+    """
+
+    def __init__(self, store: Optional[FamilyTreeStore] = None):
+        self.store = store
+        base = store.num_addresses if store is not None else 0
+        self._parent = list(range(base))
+        self._size = [1] * base
+        self._next = list(range(base))
+        self._extra_ids: Dict[str, int] = {}
+        self._extra_addresses: List[str] = []
+        self._lock = threading.RLock()
+        self.loaded_files = set()
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def _lookup(self, address: str) -> int:
+        address = address.lower()
+        if self.store is not None:
+            address_id = self.store.index_of(address)
+            if address_id >= 0:
+                return address_id
+        return self._extra_ids.get(address, -1)
+
+    def _intern(self, address: str) -> int:
+        address_id = self._lookup(address)
+        if address_id >= 0:
+            return address_id
+        address_id = len(self._parent)
+        self._extra_ids[address.lower()] = address_id
+        self._extra_addresses.append(address.lower())
+        self._parent.append(address_id)
+        self._size.append(1)
+        self._next.append(address_id)
+        return address_id
+
+    def _address(self, address_id: int) -> str:
+        base = self.store.num_addresses if self.store is not None else 0
+        if address_id < base:
+            return self.store.address(address_id)
+        return self._extra_addresses[address_id - base]
+
+    def _find(self, address_id: int) -> int:
+        parent = self._parent
+        while parent[address_id] != address_id:
+            # Path halving keeps trees flat without recursion.
+            parent[address_id] = parent[parent[address_id]]
+            address_id = parent[address_id]
+        return address_id
+
+    def _union(self, a: int, b: int) -> None:
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+        # Splice the two circular member lists together.
+        self._next[root_a], self._next[root_b] = self._next[root_b], self._next[root_a]
+
+    def add_edge(self, a: str, b: str) -> None:
+        with self._lock:
+            self._union(self._intern(a), self._intern(b))
+
+    def add_tree(self, tree: Dict[str, Any]) -> None:
+        """
+        Merge a family tree (or flagged dataset entry) into the index.
+        """
+        with self._lock:
+            root = (tree.get("grandfather") or tree.get("grandparent") or "").lower()
+            if root:
+                self._intern(root)
+            for src, dst, _ in iter_tree_edges(tree):
+                self._union(self._intern(src), self._intern(dst))
+
+    def add_tree_file(self, path: str) -> None:
+        """
+        Incrementally merge a family tree JSON file into the index.
+        """
+        with open(path, "r") as f:
+            tree = json.load(f)
+        self.add_tree(tree)
+        self.loaded_files.add(os.path.abspath(path))
+        logger.info(f"Merged family tree {path} into cluster index.")
+
+    def add_store(self, store: FamilyTreeStore) -> None:
+        """
+        Union every edge of a store whose address ids match this index.
+        """
+        with self._lock:
+            for src, dst in zip(store.edge_src.tolist(), store.edge_dst.tolist()):
+                self._union(src, dst)
+
+    def find(self, address: str) -> Optional[str]:
+        """
+        Return the representative address of the cluster, or None if unknown.
+        """
+        with self._lock:
+            address_id = self._lookup(address)
+            if address_id < 0:
+                return None
+            return self._address(self._find(address_id))
+
+    def same_cluster(self, a: str, b: str) -> bool:
+        with self._lock:
+            id_a, id_b = self._lookup(a), self._lookup(b)
+            if id_a < 0 or id_b < 0:
+                return False
+            return self._find(id_a) == self._find(id_b)
+
+    def cluster_size(self, address: str) -> int:
+        with self._lock:
+            address_id = self._lookup(address)
+            if address_id < 0:
+                return 0
+            return self._size[self._find(address_id)]
+
+    def cluster_members(self, address: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Return up to `limit` members of the address's cluster.
+        """
+        with self._lock:
+            start = self._lookup(address)
+            if start < 0:
+                return []
+            members = [self._address(start)]
+            current = self._next[start]
+            while current != start and (limit is None or len(members) < limit):
+                members.append(self._address(current))
+                current = self._next[current]
+            return members
+
+    def describe(self, address: str, member_limit: Optional[int] = 100) -> Dict[str, Any]:
+        with self._lock:
+            representative = self.find(address)
+            if representative is None:
+                return {"address": address, "clustered": False, "cluster_id": None, "size": 0, "members": []}
+            return {
+                "address": address,
+                "clustered": True,
+                "cluster_id": representative,
+                "size": self.cluster_size(address),
+                "members": self.cluster_members(address, member_limit),
+            }
+
+
+def build_cluster_index(
+    store: Optional[FamilyTreeStore] = None,
+    flagged_data: Optional[Iterable[Dict[str, Any]]] = None,
+) -> ClusterIndex:
+    """
+    Build the cluster index from the family tree store and the flagged dataset.
+    """
+    store = store if store is not None else get_family_tree_store()
+    flagged_data = load_flagged_data() if flagged_data is None else flagged_data
+
+    index = ClusterIndex(store)
+    index.add_store(store)
+    for entry in flagged_data or []:
+        index.add_tree(entry)
+    index.loaded_files.update(os.path.abspath(p) for p in glob.glob(FAMILY_TREE_GLOB))
+
+    logger.info(f"Built cluster index over {len(index)} addresses.")
+    return index
+
+
+_index_lock = threading.Lock()
+_cluster_index: Optional[ClusterIndex] = None
+
+
+def get_cluster_index() -> ClusterIndex:
+    """
+    Return the process-wide cluster index, merging any tree files added since it was built.
+
+    Address ids come from the family tree store, so the index is rebuilt
+    whenever get_family_tree_store hands out a reloaded store.
+    """
+    global _cluster_index
+    with _index_lock:
+        store = get_family_tree_store()
+        if _cluster_index is None or _cluster_index.store is not store:
+            _cluster_index = build_cluster_index(store)
+        for path in glob.glob(FAMILY_TREE_GLOB):
+            if os.path.abspath(path) not in _cluster_index.loaded_files:
+                _cluster_index.add_tree_file(path)
+        return _cluster_index
+
+
+def add_family_tree_file(path: str) -> None:
+    """
+    Incrementally merge a newly written family tree file into the shared index.
+    """
+    index = get_cluster_index()
+    if os.path.abspath(path) not in index.loaded_files:
+        index.add_tree_file(path)
@@ -0,0 +1,192 @@
+import heapq
+import queue
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.tools.family_tree_store import ADDRESS_SIZE, address_to_bytes, bytes_to_address
+from api.tools.sqlite_store import cache_path, connect
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+EDGE_CACHE_PATH = cache_path("tx_edges.db")
+
+# Newest rows kept; older edges are pruned by the background writer
+EDGE_CACHE_MAX_ROWS = 2_000_000
+# Fetches waiting to be written; further ones are dropped rather than queued
+EDGE_QUEUE_SIZE = 32
+# Highest-value transactions kept per edge from one fetch, matching edge_evidence's default
+EDGE_EVIDENCE_PER_PAIR = 3
+
+# Addresses are stored as 20-byte blobs so the graph loader can use them as-is.
+EDGE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tx_edges (
+    chain TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    src BLOB NOT NULL,
+    dst BLOB NOT NULL,
+    value_ether REAL NOT NULL DEFAULT 0,
+    block_number INTEGER,
+    timestamp INTEGER,
+    PRIMARY KEY (chain, hash)
+);
+CREATE INDEX IF NOT EXISTS idx_tx_edges_pair ON tx_edges (src, dst);
+"""
+
+
+def _edge_rows(chain_results: List[Dict[str, Any]], per_pair: int = EDGE_EVIDENCE_PER_PAIR):
+    """
+    Cache rows for the per_pair highest-value transactions of each (chain, src, dst) edge.
+
+    Path queries only need an edge's existence and its top evidence, so a
+    long history between two wallets costs at most per_pair rows.
+    """
+    kept: Dict[Tuple[str, bytes, bytes], List[Tuple]] = {}
+    for chain_data in chain_results:
+        chain_name = chain_data.get("chain")
+        for tx in chain_data.get("transactions", []):
+            try:
+                src = address_to_bytes(tx["from"])
+                dst = address_to_bytes(tx["to"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if len(src) != ADDRESS_SIZE or len(dst) != ADDRESS_SIZE or not tx.get("hash"):
+                continue
+            value = tx.get("value_ether") or 0.0
+            heap = kept.setdefault((chain_name, src, dst), [])
+            entry = (value, tx["hash"], tx)
+            if len(heap) < per_pair:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+    for (chain_name, src, dst), heap in kept.items():
+        for value, tx_hash, tx in heap:
+            yield (
+                chain_name,
+                tx_hash,
+                src,
+                dst,
+                value,
+                int(tx.get("blockNumber") or 0),
+                int(tx.get("timeStamp") or 0),
+            )
+
+
+def record_transactions(chain_results: List[Dict[str, Any]]) -> int:
+    """
+    Record fetched transactions as graph edges, ignoring ones already cached.
+
+    This writes synchronously; request paths use queue_transactions instead.
+    """
+    conn = connect(EDGE_CACHE_PATH, EDGE_CACHE_SCHEMA)
+    with conn:
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO tx_edges (chain, hash, src, dst, value_ether, block_number, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            _edge_rows(chain_results),
+        )
+    return cursor.rowcount
+
+
+def prune_edges(max_rows: int = EDGE_CACHE_MAX_ROWS) -> int:
+    """
+    Delete all but the max_rows most recently recorded edges.
+    """
+    conn = connect(EDGE_CACHE_PATH, EDGE_CACHE_SCHEMA)
+    with conn:
+        cursor = conn.execute(
+            "DELETE FROM tx_edges WHERE rowid <= (SELECT MAX(rowid) FROM tx_edges) - ?",
+            (max_rows,),
+        )
+    return cursor.rowcount
+
+
+_write_queue: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=EDGE_QUEUE_SIZE)
+_writer_lock = threading.Lock()
+_writer: Optional[threading.Thread] = None
+
+
+def _write_edges() -> None:
+    while True:
+        chain_results = _write_queue.get()
+        try:
+            if record_transactions(chain_results):
+                prune_edges()
+        except Exception as e:
+            logger.error(f"Failed to cache transaction edges: {e}")
+        finally:
+            _write_queue.task_done()
+
+
+def queue_transactions(chain_results: List[Dict[str, Any]]) -> bool:
+    """
+    Hand fetched transactions to the background edge writer without blocking the caller.
+
+    The cache is best effort: when the writer is behind by EDGE_QUEUE_SIZE
+    fetches the batch is dropped and False is returned.
+    """
+    global _writer
+    if not chain_results:
+        return True
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_edges, name="edge-cache-writer", daemon=True)
+            _writer.start()
+    try:
+        _write_queue.put_nowait(chain_results)
+        return True
+    except queue.Full:
+        logger.warning("Edge cache writer is behind; dropping a batch of transaction edges.")
+        return False
+
+
+def load_cached_edges() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load every distinct cached (src, dst) pair as fixed-width address byte arrays.
+    """
+    conn = connect(EDGE_CACHE_PATH, EDGE_CACHE_SCHEMA)
+    rows = conn.execute("SELECT DISTINCT src, dst FROM tx_edges").fetchall()
+    if not rows:
+        empty = np.zeros(0, dtype=f"S{ADDRESS_SIZE}")
+        return empty, empty
+    src, dst = zip(*rows)
+    return np.array(src, dtype=f"S{ADDRESS_SIZE}"), np.array(dst, dtype=f"S{ADDRESS_SIZE}")
+
+
+def last_edge_rowid() -> int:
+    """
+    Rowid of the newest cached edge. It grows with every insert, even when
+    pruning keeps the row count the same, so it tells readers when to reload.
+    """
+    conn = connect(EDGE_CACHE_PATH, EDGE_CACHE_SCHEMA)
+    return conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM tx_edges").fetchone()[0]
+
+
+def edge_evidence(a: str, b: str, limit: int = 3) -> List[Dict[str, Any]]:
+    """
+    Return the highest-value cached transactions between two addresses, in either direction.
+    """
+    conn = connect(EDGE_CACHE_PATH, EDGE_CACHE_SCHEMA)
+    a_raw, b_raw = address_to_bytes(a), address_to_bytes(b)
+    rows = conn.execute(
+        "SELECT chain, hash, src, dst, value_ether, timestamp FROM tx_edges "
+        "WHERE (src = ? AND dst = ?) OR (src = ? AND dst = ?) "
+        "ORDER BY value_ether DESC LIMIT ?",
+        (a_raw, b_raw, b_raw, a_raw, limit),
+    ).fetchall()
+    return [
+        {
+            "chain": chain,
+            "hash": tx_hash,
+            "from": bytes_to_address(src),
+            "to": bytes_to_address(dst),
+            "value_ether": value,
+            "timestamp": timestamp,
+        }
+        for chain, tx_hash, src, dst, value, timestamp in rows
+    ]
@@ -4,8 +4,17 @@ import asyncio
 import httpx
 from httpx import HTTPStatusError
 import re
+import time
+import struct
+import threading
 from dotenv import load_dotenv
 from tqdm import tqdm
+from api.tools.sqlite_store import cache_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: the schedule falls back to per-process
+    fcntl = None
 
 # Load environment variables
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
@@ -53,6 +62,84 @@ API_URL = "https://api.etherscan.io/api"
 # Rate limit settings
 RATE_LIMIT_DELAY = 0.25  # Delay between requests (in seconds)
 
+# Largest txlist page Etherscan returns
+PAGE_SIZE = 10000
+
+# Request schedule shared by every worker process on the host through a locked
+# file holding the next free slot; without fcntl it only spans this process.
+RATE_LIMIT_SCHEDULE_PATH = cache_path("etherscan_schedule")
+_rate_limit_lock = threading.Lock()
+_next_request_at = 0.0
+_schedule_fd = None
+_schedule_pid = None
+
+class RequestBudgetExhausted(Exception):
+    """Raised instead of sending a request once a RequestBudget is used up."""
+
+class EtherscanRequestError(Exception):
+    """Raised when a request still fails after its retries."""
+
+# status "0" messages that mean an empty result rather than a failure
+EMPTY_RESULT_MESSAGES = ("No transactions found", "No records found")
+
+class RequestBudget:
+    """
+    Counts the Etherscan HTTP requests made for one caller, retries and pages included.
+
+    Pass it as `budget` to the fetch functions. With a limit set, a request
+    beyond it raises RequestBudgetExhausted instead of being sent.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.used = 0
+
+    @property
+    def exhausted(self):
+        return self.limit is not None and self.used >= self.limit
+
+    def spend(self):
+        if self.exhausted:
+            raise RequestBudgetExhausted(f"Etherscan request budget of {self.limit} exhausted.")
+        self.used += 1
+
+def _reserve_shared_slot(now):
+    """
+    Take the next slot from the schedule file under an exclusive lock. Call with _rate_limit_lock held.
+    """
+    global _schedule_fd, _schedule_pid
+    if _schedule_pid != os.getpid():
+        # flock is shared by forked copies of a descriptor, so each worker opens its own
+        os.makedirs(os.path.dirname(RATE_LIMIT_SCHEDULE_PATH), exist_ok=True)
+        _schedule_fd = os.open(RATE_LIMIT_SCHEDULE_PATH, os.O_RDWR | os.O_CREAT, 0o644)
+        _schedule_pid = os.getpid()
+    fcntl.flock(_schedule_fd, fcntl.LOCK_EX)
+    try:
+        raw = os.pread(_schedule_fd, 8, 0)
+        slot = max(now, struct.unpack("<d", raw)[0] if len(raw) == 8 else 0.0)
+        os.pwrite(_schedule_fd, struct.pack("<d", slot + RATE_LIMIT_DELAY), 0)
+    finally:
+        fcntl.flock(_schedule_fd, fcntl.LOCK_UN)
+    return slot
+
+async def wait_for_rate_limit():
+    """
+    Reserve the next request slot in the host-wide schedule and sleep until it arrives.
+    """
+    global _next_request_at
+    with _rate_limit_lock:
+        now = time.time()
+        try:
+            if fcntl is None:
+                raise OSError("fcntl is unavailable")
+            slot = _reserve_shared_slot(now)
+        except OSError as e:
+            logger.debug(f"Shared rate limit schedule unavailable, using the process schedule: {e}")
+            slot = max(now, _next_request_at)
+            _next_request_at = slot + RATE_LIMIT_DELAY
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
 def is_valid_ethereum_address(address):
     """Validate Ethereum address format."""
     return bool(re.match(ETHEREUM_ADDRESS_PATTERN, address))
@@ -88,9 +175,11 @@ def clean_transaction_data(transactions):
     cleaned_data.sort(key=lambda x: int(x["timeStamp"]))
     return cleaned_data
 
-async def fetch_transactions(chain_id, wallet_address, startblock=0, endblock=99999999, sort="asc", retries=3, timeout=10):
+async def fetch_transactions(chain_id, wallet_address, startblock=0, endblock=99999999, sort="asc", retries=3, timeout=10, client=None, budget=None):
     """
     Fetch transaction data for a wallet address on a specific chain using Etherscan API.
+    Pass a shared httpx.AsyncClient as `client` to reuse its connection pool across calls,
+    and a RequestBudget as `budget` to count (and cap) the HTTP requests made.
     """
     params = {
         "module": "account",
@@ -103,32 +192,165 @@ async def fetch_transactions(chain_id, wallet_address, startblock=0, endblock=99
         "apikey": ETHERSCAN_API_KEY,
     }
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        for attempt in range(retries):
-            try:
-                logger.info(f"Fetching transactions for {wallet_address} on chain {chain_id} (attempt {attempt + 1})")
-                response = await client.get(API_URL, params=params)
-                response.raise_for_status()
-                data = response.json()
+    if client is None:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            return await _request_transactions(client, params, retries, budget)
+    return await _request_transactions(client, params, retries, budget)
 
-                if data.get("status") == "1":  # Success
-                    return clean_transaction_data(data.get("result", []))
-                else:
-                    logger.warning(f"Etherscan API error: {data.get('message')}")
-                    return []
+async def _request_transactions(client, params, retries, budget=None):
+    return clean_transaction_data(await _request_results(client, params, retries, budget))
 
-            except HTTPStatusError as e:
-                logger.error(f"HTTP error: {e.response.status_code} - {e.response.text}")
-            except Exception as e:
-                logger.error(f"Request failed: {e}")
+async def _request_results(client, params, retries, budget=None):
+    """
+    Raw txlist results for one request, retried with exponential backoff.
+    Every attempt is charged to `budget`, if one is given. Raises
+    EtherscanRequestError once the retries are used up, so a failed fetch is
+    never mistaken for an address without transactions.
+    """
+    wallet_address, chain_id = params["address"], params["chainid"]
+    for attempt in range(retries):
+        if budget is not None:
+            budget.spend()
+        try:
+            logger.info(f"Fetching transactions for {wallet_address} on chain {chain_id} (attempt {attempt + 1})")
+            await wait_for_rate_limit()
+            response = await client.get(API_URL, params=params)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get("status") == "1":  # Success
+                return data.get("result", [])
+            if data.get("message") in EMPTY_RESULT_MESSAGES:
+                return []
+            # Rate limits and other API errors arrive as status "0"; retry them
+            logger.warning(f"Etherscan API error: {data.get('message')} - {data.get('result')}")
+
+        except HTTPStatusError as e:
+            logger.error(f"HTTP error: {e.response.status_code} - {e.response.text}")
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+
+        # Exponential backoff for retries
+        await asyncio.sleep(2 ** attempt * RATE_LIMIT_DELAY)
+
+    raise EtherscanRequestError(f"Failed to fetch transactions for {wallet_address} on chain {chain_id} after {retries} attempts.")
+
+async def _request_value(client, params, retries=3, budget=None):
+    """
+    The `result` of a single-value call (the proxy or block modules), retried like _request_results.
+    """
+    for attempt in range(retries):
+        if budget is not None:
+            budget.spend()
+        try:
+            await wait_for_rate_limit()
+            response = await client.get(API_URL, params=params)
+            response.raise_for_status()
+            data = response.json()
 
-            # Exponential backoff for retries
-            await asyncio.sleep(2 ** attempt * RATE_LIMIT_DELAY)
+            # Proxy calls answer in JSON-RPC form, the other modules with a status flag
+            if data.get("status") == "1" or (data.get("jsonrpc") and "error" not in data):
+                return data.get("result")
+            logger.warning(f"Etherscan API error: {data.get('message') or data.get('error')} - {data.get('result')}")
+
+        except HTTPStatusError as e:
+            logger.error(f"HTTP error: {e.response.status_code} - {e.response.text}")
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+
+        await asyncio.sleep(2 ** attempt * RATE_LIMIT_DELAY)
+
+    raise EtherscanRequestError(f"Etherscan {params.get('module')}.{params.get('action')} failed after {retries} attempts.")
+
+async def _call_chain(chain_name, params, client=None, budget=None):
+    chain_id = SUPPORTED_CHAINS.get(chain_name)
+    if not chain_id:
+        raise ValueError(f"Unsupported chain: {chain_name}")
+    params = {**params, "chainid": chain_id, "apikey": ETHERSCAN_API_KEY}
+    if client is None:
+        async with httpx.AsyncClient(timeout=10) as client:
+            return await _request_value(client, params, budget=budget)
+    return await _request_value(client, params, budget=budget)
+
+async def fetch_transaction_count(chain_name, wallet_address, client=None, budget=None):
+    """
+    Number of transactions the wallet has sent on a chain (its nonce), in one small request.
+
+    Incoming transfers are not included, so this is a lower bound on the
+    length of its txlist.
+    """
+    result = await _call_chain(
+        chain_name,
+        {"module": "proxy", "action": "eth_getTransactionCount", "address": wallet_address, "tag": "latest"},
+        client,
+        budget,
+    )
+    return int(result, 16)
+
+async def fetch_block_by_time(chain_name, timestamp, closest="before", client=None, budget=None):
+    """
+    The block mined closest before (or after) a Unix timestamp on a chain.
+    """
+    result = await _call_chain(
+        chain_name,
+        {"module": "block", "action": "getblocknobytime", "timestamp": int(timestamp), "closest": closest},
+        client,
+        budget,
+    )
+    return int(result)
+
+async def iter_transaction_pages(chain_name, wallet_address, startblock=0, endblock=99999999, page_size=PAGE_SIZE, client=None, budget=None):
+    """
+    Yield a wallet's cleaned transactions on one chain a page at a time, oldest first.
+
+    Etherscan caps page * offset at 10,000 results, so instead of paging deeper
+    each request restarts at the last block seen and drops the transactions of
+    that block already yielded. Only one page is held in memory at a time.
+    """
+    chain_id = SUPPORTED_CHAINS.get(chain_name)
+    if not chain_id:
+        logger.warning(f"Unsupported chain: {chain_name}")
+        return
+
+    if client is None:
+        async with httpx.AsyncClient(timeout=10) as client:
+            async for page in iter_transaction_pages(chain_name, wallet_address, startblock, endblock, page_size, client, budget):
+                yield page
+        return
+
+    params = {
+        "module": "account",
+        "action": "txlist",
+        "address": wallet_address,
+        "endblock": endblock,
+        "page": 1,
+        "offset": page_size,
+        "sort": "asc",
+        "chainid": chain_id,
+        "apikey": ETHERSCAN_API_KEY,
+    }
+    seen_in_block = set()
+    while True:
+        results = await _request_results(client, {**params, "startblock": startblock}, retries=3, budget=budget)
+        fresh = [tx for tx in results if tx.get("hash") not in seen_in_block]
+        if fresh:
+            yield clean_transaction_data(fresh)
+        if len(results) < page_size:
+            return
 
-    logger.error(f"Failed to fetch transactions for {wallet_address} on chain {chain_id} after {retries} attempts.")
-    return []
+        last_block = int(results[-1]["blockNumber"])
+        if last_block == startblock and not fresh:
+            # A single block holds more than a page of transactions; skip past it
+            logger.warning(f"Block {last_block} on {chain_name} exceeds the page size; some transactions were skipped.")
+            last_block += 1
+            seen_in_block = set()
+        else:
+            if last_block != startblock:
+                seen_in_block = set()
+            seen_in_block.update(tx.get("hash") for tx in results if int(tx["blockNumber"]) == last_block)
+        startblock = last_block
 
-async def process_chain_transactions(chain_name, wallet_address):
+async def process_chain_transactions(chain_name, wallet_address, startblock=0, endblock=99999999, client=None, budget=None):
     """
     Process transactions for a given chain by chain name.
     Returns only cleaned transactions for that chain.
@@ -138,10 +360,10 @@ async def process_chain_transactions(chain_name, wallet_address):
         logger.warning(f"Unsupported chain: {chain_name}")
         return []
 
-    transactions = await fetch_transactions(chain_id, wallet_address)
+    transactions = await fetch_transactions(chain_id, wallet_address, startblock, endblock, client=client, budget=budget)
     return transactions
 
-async def get_transaction_data(wallet_address, chains=None, startblock=0, endblock=99999999):
+async def get_transaction_data(wallet_address, chains=None, startblock=0, endblock=99999999, startblocks=None, endblocks=None, client=None, budget=None, raise_errors=False):
     """
     Fetch transaction data across multiple chains and return a list of dictionaries:
     [
@@ -151,6 +373,11 @@ async def get_transaction_data(wallet_address, chains=None, startblock=0, endblo
       },
       ...
     ]
+    `startblocks` and `endblocks` optionally map chain names to their own block bounds, overriding `startblock` and `endblock`,
+    `client` is an optional shared httpx.AsyncClient and `budget` an optional RequestBudget;
+    running out of budget stops the fetch with RequestBudgetExhausted.
+    A chain that fails to fetch is logged and left out, or with `raise_errors`
+    re-raised, for callers that must not read a failure as "no transactions".
     """
     if not is_valid_ethereum_address(wallet_address):
         raise ValueError(f"Invalid Ethereum address: {wallet_address}")
@@ -161,7 +388,9 @@ async def get_transaction_data(wallet_address, chains=None, startblock=0, endblo
     with tqdm(total=len(chains), desc="Processing chains", unit="chain") as pbar:
         for chain_name in chains:
             try:
-                chain_data = await process_chain_transactions(chain_name, wallet_address)
+                chain_startblock = (startblocks or {}).get(chain_name, startblock)
+                chain_endblock = (endblocks or {}).get(chain_name, endblock)
+                chain_data = await process_chain_transactions(chain_name, wallet_address, chain_startblock, chain_endblock, client, budget)
                 if chain_data:
                     results.append({
                         "chain": chain_name,
@@ -169,8 +398,12 @@ async def get_transaction_data(wallet_address, chains=None, startblock=0, endblo
                     })
                 else:
                     logger.warning(f"No relevant transactions found for {wallet_address} on {chain_name}.")
+            except RequestBudgetExhausted:
+                raise
             except Exception as e:
                 logger.error(f"Error processing chain {chain_name}: {e}")
+                if raise_errors:
+                    raise
             pbar.update(1)
 
     return results if results else []
@@ -0,0 +1,161 @@
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from api.tools.address_checker import load_flagged_data, get_unique_addresses
+from api.tools.address_graph import (
+    AddressGraph,
+    AddressLookupTable,
+    build_address_graph,
+    save_lookup_table,
+    sorted_unique,
+    unique_first,
+)
+from api.tools.edge_cache import load_cached_edges
+from api.tools.family_tree_store import DATA_DIR, get_family_tree_store
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+EXPOSURE_INDEX_PATH = os.path.join(DATA_DIR, "exposure_index.npy")
+DEFAULT_MAX_HOPS = 4
+
+
+def multi_source_bfs(graph: AddressGraph, sources: np.ndarray, max_hops: int = DEFAULT_MAX_HOPS):
+    """
+    Level-synchronous BFS from every source at once.
+
+    Returns (hops, nearest_source) arrays over the graph's address ids, with -1
+    for addresses not reached within max_hops.
+    """
+    hops = np.full(len(graph), -1, dtype=np.int16)
+    nearest = np.full(len(graph), -1, dtype=np.int64)
+    frontier = sorted_unique(sources[sources >= 0])
+    hops[frontier] = 0
+    nearest[frontier] = frontier
+
+    depth = 0
+    while frontier.size and depth < max_hops:
+        parents, neighbors = graph.expand(frontier)
+        unseen = hops[neighbors] < 0
+        parents, neighbors = parents[unseen], neighbors[unseen]
+        frontier, first = unique_first(neighbors)
+        depth += 1
+        hops[frontier] = depth
+        nearest[frontier] = nearest[parents[first]]
+    return hops, nearest
+
+
+def build_exposure_index(output_path: str = EXPOSURE_INDEX_PATH, max_hops: int = DEFAULT_MAX_HOPS) -> Dict[str, Any]:
+    """
+    Offline job: compute hop distance to the nearest flagged or family-tree root
+    address for every address reachable in the known graph (family trees,
+    flagged dataset and cached transaction edges), and persist it.
+    """
+    store = get_family_tree_store()
+    flagged_data = load_flagged_data() or []
+    flagged_addresses = get_unique_addresses(flagged_data)
+    graph = build_address_graph(
+        store,
+        trees=flagged_data,
+        extra_addresses=flagged_addresses,
+        transaction_edges=load_cached_edges(),
+    )
+
+    root_addresses = [store.address(root) for root in store.tree_roots]
+    sources = graph.indices_of(list(flagged_addresses) + root_addresses)
+    hops, nearest = multi_source_bfs(graph, sources, max_hops)
+
+    reached = np.flatnonzero(hops >= 0)
+    # Rows are stored in address order, which matches graph ids, so a source's
+    # row is its rank among the reached ids.
+    source_rows = np.searchsorted(reached, nearest[reached]).astype(np.uint32)
+    save_lookup_table(output_path, graph.addresses[reached], {
+        "hops": hops[reached].astype(np.uint8),
+        "source": source_rows,
+    })
+
+    stats = {
+        "addresses": int(len(reached)),
+        "sources": int((hops == 0).sum()),
+        "max_hops": max_hops,
+        "by_hop": {str(h): int(c) for h, c in enumerate(np.bincount(hops[reached]))},
+    }
+    logger.info(f"Wrote exposure index to {output_path}: {stats}")
+    return stats
+
+
+_index_lock = threading.Lock()
+_exposure_index: Optional[AddressLookupTable] = None
+
+
+def get_exposure_index() -> Optional[AddressLookupTable]:
+    """
+    Return the mmap'd exposure index, reloading it when the job rewrites the file.
+    Returns None until the offline job has been run.
+    """
+    global _exposure_index
+    with _index_lock:
+        if not os.path.exists(EXPOSURE_INDEX_PATH):
+            if _exposure_index is None:
+                logger.warning(f"Exposure index not built yet at {EXPOSURE_INDEX_PATH}.")
+            return _exposure_index
+        if _exposure_index is None or os.path.getmtime(EXPOSURE_INDEX_PATH) != _exposure_index.mtime:
+            _exposure_index = AddressLookupTable(EXPOSURE_INDEX_PATH)
+        return _exposure_index
+
+
+def lookup_exposure(address: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the hop distance and nearest flagged source for an address, or None if unreachable.
+    """
+    index = get_exposure_index()
+    if index is None:
+        return None
+    row = int(index.rows_of([address])[0])
+    if row < 0:
+        return None
+    record = index.table[row]
+    return {
+        "hops": int(record["hops"]),
+        "nearest_flagged_source": index.address(int(record["source"])),
+    }
+
+
+def lookup_hops(addresses: Sequence[str]) -> Optional[np.ndarray]:
+    """
+    Hop distance to the nearest flagged source for each address, -1 where none was reached.
+    """
+    index = get_exposure_index()
+    if index is None:
+        return None
+    rows = index.rows_of(addresses)
+    hops = np.full(len(rows), -1, dtype=np.int16)
+    found = rows >= 0
+    hops[found] = np.asarray(index.table["hops"])[rows[found]]
+    return hops
+
+
+def summarize_exposure(addresses: Iterable[str], max_hops: int = 2) -> Optional[Dict[str, int]]:
+    """
+    Count how many of the given addresses sit 0..max_hops hops from a flagged source.
+    """
+    index = get_exposure_index()
+    if index is None:
+        return None
+    rows = index.rows_of(addresses)
+    hops = np.asarray(index.table["hops"])[rows[rows >= 0]]
+    counts = np.bincount(hops[hops <= max_hops], minlength=max_hops + 1)
+    return {str(h): int(counts[h]) for h in range(max_hops + 1)}
+
+
+if __name__ == "__main__":
+    import sys
+
+    max_hops = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MAX_HOPS
+    print(json.dumps(build_exposure_index(max_hops=max_hops), indent=4))
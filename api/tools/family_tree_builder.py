@@ -0,0 +1,188 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from api.tools.etherscanv2 import SUPPORTED_CHAINS, get_transaction_data, is_valid_ethereum_address
+from api.tools.cluster_index import add_family_tree_file
+from api.tools.edge_cache import queue_transactions
+from api.tools.family_tree_store import DATA_DIR, family_tree_filename
+from api.tools.sqlite_store import CACHE_DIR
+from api.tools.taint_crawler import summarize_counterparties
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.path.join(CACHE_DIR, "family_tree_checkpoints")
+
+# Crawl limits
+DEFAULT_MAX_PARENTS = 50
+DEFAULT_MAX_CHILDREN = 100
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BUILD_CHAINS = ["ethereum"]
+
+
+def checkpoint_path_for(root_address: str) -> str:
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    return os.path.join(CHECKPOINT_DIR, f"{root_address.lower()}.json")
+
+
+def write_json_atomic(path: str, payload: Dict[str, Any]) -> None:
+    """
+    Write JSON through a temporary file so a crash never leaves a torn file behind.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def top_counterparties(address: str, chain_results: List[Dict[str, Any]], limit: int) -> List[str]:
+    """
+    The `limit` counterparties an address interacted with most, heaviest value first on ties.
+    """
+    counterparties = summarize_counterparties(address, chain_results)
+    ranked = sorted(
+        counterparties.items(),
+        key=lambda item: (item[1]["tx_count"], item[1]["total_value"]),
+        reverse=True,
+    )
+    return [other for other, _ in ranked[:limit]]
+
+
+class FamilyTreeBuilder:
+    """
+    Expands a root address into the grandfather/parents/children schema.
+
+    Parents are the root's top counterparties and children are each parent's
+    top counterparties. Parent expansions run concurrently up to `concurrency`
+    at a time (all fetches still share the Etherscan rate limit), and the
+    frontier is checkpointed after every expansion so an interrupted crawl
+    resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        root_address: str,
+        chains: Optional[Iterable[str]] = None,
+        max_parents: int = DEFAULT_MAX_PARENTS,
+        max_children: int = DEFAULT_MAX_CHILDREN,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        checkpoint_path: Optional[str] = None,
+        output_dir: str = DATA_DIR,
+    ):
+        if not is_valid_ethereum_address(root_address):
+            raise ValueError(f"Invalid Ethereum address: {root_address}")
+
+        self.root_address = root_address
+        self.chains = [c for c in (chains or DEFAULT_BUILD_CHAINS) if c in SUPPORTED_CHAINS]
+        self.max_parents = max_parents
+        self.max_children = max_children
+        self.concurrency = concurrency
+        self.checkpoint_path = checkpoint_path or checkpoint_path_for(root_address)
+        self.output_dir = output_dir
+        self.state = self._load_checkpoint()
+        self._checkpoint_lock = asyncio.Lock()
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r") as f:
+                state = json.load(f)
+            logger.info(
+                f"Resuming family tree for {self.root_address}: "
+                f"{len(state.get('pending', []))} parents left to expand."
+            )
+            return state
+        return {"root": self.root_address, "chains": self.chains, "parents": None, "children": {}, "pending": []}
+
+    async def _checkpoint(self) -> None:
+        async with self._checkpoint_lock:
+            write_json_atomic(self.checkpoint_path, self.state)
+
+    async def _fetch_top(self, address: str, limit: int) -> List[str]:
+        # A failed chain raises rather than reading as an address without counterparties
+        chain_results = await get_transaction_data(address, self.state["chains"], raise_errors=True)
+        queue_transactions(chain_results)
+        return top_counterparties(address, chain_results, limit)
+
+    async def _expand_parents(self) -> None:
+        if self.state["parents"] is not None:
+            return
+        parents = await self._fetch_top(self.root_address, self.max_parents)
+        self.state["parents"] = parents
+        self.state["pending"] = list(parents)
+        await self._checkpoint()
+        logger.info(f"Found {len(parents)} parents for {self.root_address}.")
+
+    async def _expand_child(self, parent: str, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                children = await self._fetch_top(parent, self.max_children)
+            except Exception as e:
+                # Leave the parent pending so a resumed run retries it.
+                logger.error(f"Failed to expand parent {parent}: {e}")
+                return
+            self.state["children"][parent] = children
+            self.state["pending"].remove(parent)
+            await self._checkpoint()
+
+    def tree(self) -> Dict[str, Any]:
+        parents = self.state["parents"] or []
+        return {
+            "grandfather": self.root_address,
+            "parents": parents,
+            "children": {parent: self.state["children"].get(parent, []) for parent in parents},
+        }
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Crawl (or resume) the tree and write it next to the existing family tree files.
+
+        Nothing is written or indexed unless the root and every parent were fetched.
+        """
+        try:
+            await self._expand_parents()
+        except Exception as e:
+            raise RuntimeError(f"Could not expand root {self.root_address}; no family tree written: {e}") from e
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._expand_child(p, semaphore) for p in list(self.state["pending"])))
+        if self.state["pending"]:
+            raise RuntimeError(
+                f"{len(self.state['pending'])} parents could not be expanded; "
+                f"rerun to resume from {self.checkpoint_path}."
+            )
+
+        output_path = os.path.join(self.output_dir, family_tree_filename(self.root_address))
+        write_json_atomic(output_path, self.tree())
+        os.remove(self.checkpoint_path)
+        add_family_tree_file(output_path)
+
+        logger.info(f"Wrote family tree for {self.root_address} to {output_path}.")
+        return {
+            "root": self.root_address,
+            "path": output_path,
+            "parents": len(self.state["parents"]),
+            "children": sum(len(c) for c in self.state["children"].values()),
+        }
+
+
+async def build_family_tree(root_address: str, **kwargs) -> Dict[str, Any]:
+    return await FamilyTreeBuilder(root_address, **kwargs).run()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m api.tools.family_tree_builder <root_address> [max_parents] [max_children]")
+        sys.exit(1)
+
+    options = {}
+    if len(sys.argv) > 2:
+        options["max_parents"] = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        options["max_children"] = int(sys.argv[3])
+    print(json.dumps(asyncio.run(build_family_tree(sys.argv[1], **options)), indent=4))
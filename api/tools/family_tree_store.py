@@ -0,0 +1,377 @@
+import os
+import glob
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Dynamically calculate paths
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))  # tools/
+API_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))  # api/
+DATA_DIR = os.path.join(API_DIR, "data")
+FAMILY_TREE_GLOB = os.path.join(DATA_DIR, "*_family_tree.json")
+FAMILY_TREE_STORE_PATH = os.path.join(DATA_DIR, "family_trees.bin")
+
+# Binary layout (little-endian):
+#   header        magic, version, reserved, address count, tree count, edge count, reserved
+#   addresses     n_addresses * 20 raw address bytes, sorted ascending
+#   tree_roots    u32[n_trees]       address id of each tree's grandfather
+#   tree_offsets  u32[n_trees + 1]   edge range of each tree
+#   edge_src      u32[n_edges]
+#   edge_dst      u32[n_edges]
+#   edge_kind     u8[n_edges]        EDGE_PARENT (root -> parent) or EDGE_CHILD (parent -> child)
+STORE_MAGIC = b"IDFT"
+STORE_VERSION = 1
+HEADER_FORMAT = "<4sHHIIII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+ADDRESS_SIZE = 20
+
+EDGE_PARENT = 0
+EDGE_CHILD = 1
+
+
+def address_to_bytes(address: str) -> bytes:
+    """
+    Convert a 0x-prefixed hex address into its 20 raw bytes.
+    """
+    return bytes.fromhex(address[2:] if address[:2].lower() == "0x" else address)
+
+
+def bytes_to_address(raw: bytes) -> str:
+    """
+    Convert 20 raw address bytes (possibly null-stripped by numpy) into a lower-cased 0x address.
+    """
+    return "0x" + raw.ljust(ADDRESS_SIZE, b"\0").hex()
+
+
+def family_tree_filename(root_address: str, length: int = 6) -> str:
+    """
+    Build the file name used for a family tree, e.g. 0xF677...76542a_family_tree.json.
+    """
+    return f"{root_address[:length]}...{root_address[-length:]}_family_tree.json"
+
+
+def iter_tree_edges(tree: Dict[str, Any]) -> Iterator[Tuple[str, str, int]]:
+    """
+    Yield normalized (src, dst, kind) edges for a family tree entry.
+
+    Accepts both the family tree schema ("grandfather") and the flagged dataset
+    schema ("grandparent"). Addresses are lower-cased, duplicates are dropped and
+    self-references such as a parent listed among its own children are skipped.
+    """
+    root = (tree.get("grandfather") or tree.get("grandparent") or "").lower()
+    seen = set()
+
+    for parent in tree.get("parents", []):
+        parent = parent.lower()
+        edge = (root, parent, EDGE_PARENT)
+        if root and parent and parent != root and edge not in seen:
+            seen.add(edge)
+            yield edge
+
+    for parent, child_list in tree.get("children", {}).items():
+        parent = parent.lower()
+        for child in child_list:
+            child = child.lower()
+            edge = (parent, child, EDGE_CHILD)
+            if child and child != parent and edge not in seen:
+                seen.add(edge)
+                yield edge
+
+
+def load_family_tree_json(paths: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Load family tree JSON files, defaulting to every *_family_tree.json under api/data.
+    """
+    paths = sorted(glob.glob(FAMILY_TREE_GLOB)) if paths is None else list(paths)
+    trees = []
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                trees.append(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Skipping unreadable family tree {path}: {e}")
+    return trees
+
+
+def convert_family_trees(
+    paths: Optional[Iterable[str]] = None,
+    output_path: str = FAMILY_TREE_STORE_PATH,
+) -> Dict[str, int]:
+    """
+    Convert family tree JSON files into the compact binary store.
+
+    The output is written to a temporary file and atomically swapped in, so
+    workers that already mmap the previous version keep a valid view.
+    """
+    trees = load_family_tree_json(paths)
+
+    tree_roots = []
+    tree_edges = []
+    addresses = set()
+    for tree in trees:
+        root = (tree.get("grandfather") or tree.get("grandparent") or "").lower()
+        if not root:
+            continue
+        edges = list(iter_tree_edges(tree))
+        tree_roots.append(root)
+        tree_edges.append(edges)
+        addresses.add(root)
+        for src, dst, _ in edges:
+            addresses.add(src)
+            addresses.add(dst)
+
+    address_table = np.array(sorted(address_to_bytes(a) for a in addresses), dtype=f"S{ADDRESS_SIZE}")
+
+    def ids_of(values):
+        keys = np.array([address_to_bytes(v) for v in values], dtype=f"S{ADDRESS_SIZE}")
+        return np.searchsorted(address_table, keys).astype("<u4")
+
+    roots = ids_of(tree_roots) if tree_roots else np.zeros(0, dtype="<u4")
+    offsets = np.zeros(len(tree_edges) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(edges) for edges in tree_edges])
+    flat_edges = [edge for edges in tree_edges for edge in edges]
+    if flat_edges:
+        src = ids_of([e[0] for e in flat_edges])
+        dst = ids_of([e[1] for e in flat_edges])
+        kind = np.array([e[2] for e in flat_edges], dtype="u1")
+    else:
+        src = dst = np.zeros(0, dtype="<u4")
+        kind = np.zeros(0, dtype="u1")
+
+    header = struct.pack(
+        HEADER_FORMAT, STORE_MAGIC, STORE_VERSION, 0,
+        len(address_table), len(roots), len(flat_edges), 0,
+    )
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for section in (address_table, roots, offsets, src, dst, kind):
+            f.write(section.tobytes())
+    os.replace(tmp_path, output_path)
+
+    stats = {"trees": len(roots), "addresses": len(address_table), "edges": len(flat_edges)}
+    logger.info(f"Wrote family tree store to {output_path}: {stats}")
+    return stats
+
+
+class FamilyTreeStore:
+    """
+    Read-only, memory-mapped view over the binary family tree store.
+
+    Opening a store only parses the fixed-size header; every section is exposed
+    as a zero-copy numpy view over the mapping. The mapping keeps its own file
+    descriptor, so a store that is no longer referenced releases everything
+    when it is garbage collected.
+    """
+
+    def __init__(self, path: str = FAMILY_TREE_STORE_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, n_addresses, n_trees, n_edges, _ = struct.unpack_from(HEADER_FORMAT, self._mm, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported family tree store format in {path}")
+
+        offset = HEADER_SIZE
+        self.addresses = np.frombuffer(self._mm, dtype=f"S{ADDRESS_SIZE}", count=n_addresses, offset=offset)
+        offset += n_addresses * ADDRESS_SIZE
+        self.tree_roots = np.frombuffer(self._mm, dtype="<u4", count=n_trees, offset=offset)
+        offset += n_trees * 4
+        self.tree_offsets = np.frombuffer(self._mm, dtype="<u4", count=n_trees + 1, offset=offset)
+        offset += (n_trees + 1) * 4
+        self.edge_src = np.frombuffer(self._mm, dtype="<u4", count=n_edges, offset=offset)
+        offset += n_edges * 4
+        self.edge_dst = np.frombuffer(self._mm, dtype="<u4", count=n_edges, offset=offset)
+        offset += n_edges * 4
+        self.edge_kind = np.frombuffer(self._mm, dtype="u1", count=n_edges, offset=offset)
+
+    def __len__(self) -> int:
+        return len(self.tree_roots)
+
+    @property
+    def num_addresses(self) -> int:
+        return len(self.addresses)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_src)
+
+    def address(self, address_id: int) -> str:
+        """
+        Return the lower-cased address for an address id.
+        """
+        start = HEADER_SIZE + int(address_id) * ADDRESS_SIZE
+        return "0x" + self._mm[start:start + ADDRESS_SIZE].hex()
+
+    def index_of(self, address: str) -> int:
+        """
+        Return the address id for an address, or -1 when it is not in the store.
+        """
+        try:
+            key = address_to_bytes(address)
+        except (AttributeError, TypeError, ValueError):
+            return -1
+        if len(key) != ADDRESS_SIZE:
+            return -1
+        pos = int(np.searchsorted(self.addresses, key))
+        if pos < len(self.addresses) and self.addresses[pos] == key.rstrip(b"\0"):
+            return pos
+        return -1
+
+    def tree(self, tree_id: int) -> Dict[str, Any]:
+        """
+        Rebuild a single tree in the grandfather/parents/children schema.
+        """
+        start, end = int(self.tree_offsets[tree_id]), int(self.tree_offsets[tree_id + 1])
+        parents = []
+        children = {}
+        for src, dst, kind in zip(self.edge_src[start:end], self.edge_dst[start:end], self.edge_kind[start:end]):
+            if kind == EDGE_PARENT:
+                parent = self.address(dst)
+                parents.append(parent)
+                children.setdefault(parent, [])
+            else:
+                children.setdefault(self.address(src), []).append(self.address(dst))
+        return {
+            "grandfather": self.address(self.tree_roots[tree_id]),
+            "parents": parents,
+            "children": children,
+        }
+
+    def trees_containing(self, address: str) -> List[int]:
+        """
+        Return the ids of every tree in which the address appears.
+        """
+        address_id = self.index_of(address)
+        if address_id < 0:
+            return []
+        hits = np.flatnonzero((self.edge_src == address_id) | (self.edge_dst == address_id))
+        tree_ids = set(np.searchsorted(self.tree_offsets, hits, side="right") - 1)
+        tree_ids.update(np.flatnonzero(self.tree_roots == address_id))
+        return sorted(int(t) for t in tree_ids)
+
+    def close(self) -> None:
+        self.addresses = self.tree_roots = self.tree_offsets = None
+        self.edge_src = self.edge_dst = self.edge_kind = None
+        try:
+            self._mm.close()
+        except BufferError:
+            # Views handed out to callers still reference the mapping; it is
+            # released once they are garbage collected.
+            pass
+
+
+def is_store_stale(store_path: str = FAMILY_TREE_STORE_PATH, pattern: str = FAMILY_TREE_GLOB) -> bool:
+    """
+    Check whether the binary store is missing or older than any family tree JSON file.
+    """
+    if not os.path.exists(store_path):
+        return True
+    store_mtime = os.path.getmtime(store_path)
+    return any(os.path.getmtime(p) > store_mtime for p in glob.glob(pattern))
+
+
+def load_family_tree_store(path: str = FAMILY_TREE_STORE_PATH, rebuild_if_stale: bool = True) -> FamilyTreeStore:
+    """
+    Open the binary family tree store, converting the JSON files first if needed.
+    """
+    if rebuild_if_stale and path == FAMILY_TREE_STORE_PATH and is_store_stale(path):
+        logger.info("Family tree store missing or stale, converting JSON files.")
+        convert_family_trees(output_path=path)
+    return FamilyTreeStore(path)
+
+
+_store_lock = threading.Lock()
+_store: Optional[FamilyTreeStore] = None
+_store_mtime: Optional[float] = None
+
+
+def get_family_tree_store() -> FamilyTreeStore:
+    """
+    Return the process-wide family tree store, reopening it when the file changes.
+
+    The previous store is not closed: indexes and batch jobs may still read
+    through it, and its mapping is released once the last of them drops it.
+    """
+    global _store, _store_mtime
+    with _store_lock:
+        if _store is None or is_store_stale() or os.path.getmtime(FAMILY_TREE_STORE_PATH) != _store_mtime:
+            _store = load_family_tree_store()
+            _store_mtime = os.path.getmtime(FAMILY_TREE_STORE_PATH)
+        return _store
+
+
+def benchmark(paths: Optional[List[str]] = None, repeat: int = 20) -> Dict[str, float]:
+    """
+    Compare worker start cost of json.load over the family tree files with opening the mmap store.
+    """
+    paths = sorted(glob.glob(FAMILY_TREE_GLOB)) if paths is None else paths
+    store_path = os.path.join(DATA_DIR, "family_trees.bench.bin")
+    stats = convert_family_trees(paths, store_path)
+
+    def best_of(fn):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def json_load_all():
+        for path in paths:
+            with open(path, "r") as f:
+                json.load(f)
+
+    def json_load_and_index():
+        addresses = set()
+        for tree in load_family_tree_json(paths):
+            for src, dst, _ in iter_tree_edges(tree):
+                addresses.add(src)
+                addresses.add(dst)
+
+    def open_store():
+        FamilyTreeStore(store_path).close()
+
+    def open_store_and_lookup():
+        store = FamilyTreeStore(store_path)
+        store.index_of(store.address(store.tree_roots[0]))
+        store.close()
+
+    try:
+        results = {
+            "json_load_ms": best_of(json_load_all) * 1000,
+            "json_load_and_index_ms": best_of(json_load_and_index) * 1000,
+            "mmap_open_ms": best_of(open_store) * 1000,
+            "mmap_open_and_lookup_ms": best_of(open_store_and_lookup) * 1000,
+            "json_bytes": sum(os.path.getsize(p) for p in paths),
+            "store_bytes": os.path.getsize(store_path),
+        }
+        results.update(stats)
+    finally:
+        os.remove(store_path)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "convert"
+    if command == "convert":
+        print(json.dumps(convert_family_trees(), indent=4))
+    elif command == "bench":
+        print(json.dumps(benchmark(), indent=4))
+    else:
+        print("Usage: python -m api.tools.family_tree_store [convert|bench]")
+        sys.exit(1)
@@ -0,0 +1,196 @@
+import os
+import csv
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from api.tools.family_tree_store import ADDRESS_SIZE, address_to_bytes, bytes_to_address
+from api.tools.sqlite_store import cache_path, chunked, connect
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+LABEL_STORE_PATH = cache_path("address_labels.db")
+
+# Chain of labels that apply on every chain; imported entries that name no chain get it
+ANY_CHAIN = "*"
+DEFAULT_LABEL_CHAINS = (ANY_CHAIN,)
+
+# One row per (chain, address); each row remembers the source list and the
+# import version that last wrote it, so re-importing a source can drop the
+# labels that disappeared from it. There is deliberately no (source, version)
+# index: imports are rare and it would slow every upsert down by half.
+LABEL_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS address_labels (
+    address BLOB NOT NULL,
+    chain TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (address, chain)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS label_sources (
+    source TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    labels INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    imported_at INTEGER NOT NULL
+);
+"""
+
+
+def _connect():
+    return connect(LABEL_STORE_PATH, LABEL_STORE_SCHEMA)
+
+
+def _label_rows(labels: Iterable[Dict[str, Any]], source: str, version: int, digest) -> Iterator[Tuple]:
+    """
+    Expand label entries into one row per chain, feeding every entry into the checksum.
+    """
+    for label in labels:
+        if not isinstance(label, dict):
+            digest.update(repr(label).encode())
+            continue
+        digest.update(repr((label.get("address"), label.get("name"), label.get("type"), label.get("chains") or label.get("chain"))).encode())
+        # Malformed entries (non-string addresses, unparseable hex) are skipped rather than failing the import
+        address = label.get("address")
+        if not isinstance(address, str):
+            continue
+        try:
+            address = address_to_bytes(address.strip())
+        except ValueError:
+            continue
+        if len(address) != ADDRESS_SIZE:
+            continue
+        chains = label.get("chains") or label.get("chain") or DEFAULT_LABEL_CHAINS
+        if isinstance(chains, str):
+            chains = [c.strip() for c in chains.split(",") if c.strip()]
+        elif not isinstance(chains, (list, tuple)):
+            continue
+        for chain in chains:
+            yield (address, chain, label.get("name") or "Unknown", label.get("type") or "Unknown", source, version)
+
+
+def import_labels(source: str, labels: Iterable[Dict[str, Any]], checksum: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replace the labels of one source list with `labels`, as a new version of that source.
+
+    Entries are dicts with address, name, type and an optional chain or chains
+    list. They are streamed into SQLite, so memory does not grow with the list
+    size. Rows from older versions of the source that were not rewritten are
+    removed in the same transaction. When `checksum` matches the stored one the
+    import is skipped.
+    """
+    conn = _connect()
+    stored = conn.execute("SELECT version, checksum FROM label_sources WHERE source = ?", (source,)).fetchone()
+    if stored and checksum is not None and stored[1] == checksum:
+        return {"source": source, "version": stored[0], "imported": 0, "skipped": True}
+
+    version = (stored[0] if stored else 0) + 1
+    digest = hashlib.sha256()
+    with conn:
+        conn.executemany(
+            "INSERT INTO address_labels (address, chain, name, type, source, version) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (address, chain) DO UPDATE SET "
+            "name = excluded.name, type = excluded.type, source = excluded.source, version = excluded.version",
+            _label_rows(labels, source, version, digest),
+        )
+        conn.execute("DELETE FROM address_labels WHERE source = ? AND version < ?", (source, version))
+        count = conn.execute("SELECT COUNT(*) FROM address_labels WHERE source = ?", (source,)).fetchone()[0]
+        conn.execute(
+            "INSERT INTO label_sources (source, version, labels, checksum, imported_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (source) DO UPDATE SET version = excluded.version, labels = excluded.labels, "
+            "checksum = excluded.checksum, imported_at = excluded.imported_at",
+            (source, version, count, checksum or digest.hexdigest(), int(time.time())),
+        )
+    logger.info(f"Imported {count} labels from {source} as version {version}.")
+    return {"source": source, "version": version, "imported": count, "skipped": False}
+
+
+def file_checksum(path: str) -> str:
+    """
+    Checksum of a label file and of how its unannotated entries expand, so
+    changing DEFAULT_LABEL_CHAINS re-imports unchanged files.
+    """
+    digest = hashlib.sha256(repr(DEFAULT_LABEL_CHAINS).encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_label_file(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream label entries from a JSON list or a CSV file with address,name,type[,chain] columns.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, "r") as f:
+            yield from json.load(f)
+
+
+def import_label_file(path: str, source: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Import a label list file, skipping it when it is unchanged since its last import.
+    """
+    source = source or os.path.splitext(os.path.basename(path))[0]
+    return import_labels(source, read_label_file(path), checksum=file_checksum(path))
+
+
+def lookup_labels(addresses: Iterable[str], chains: Optional[Sequence[str]] = None) -> Dict[str, Dict[str, Dict[str, str]]]:
+    """
+    Labels of many addresses at once: address -> chain -> {name, type, source}.
+
+    Labels stored under ANY_CHAIN pass every `chains` filter and keep that
+    chain key, so callers can tell them apart from chain-specific ones.
+    Addresses are resolved with batched WHERE address IN (...) queries against
+    the primary key, one query per MAX_SQL_PARAMS addresses.
+    """
+    keys = []
+    for address in dict.fromkeys(addresses):
+        try:
+            raw = address_to_bytes(address)
+        except (TypeError, ValueError):
+            continue
+        if len(raw) == ADDRESS_SIZE:
+            keys.append(raw)
+
+    chain_filter = set(chains) if chains else None
+    conn = _connect()
+    labels: Dict[str, Dict[str, Dict[str, str]]] = {}
+    for batch in chunked(keys):
+        placeholders = ", ".join("?" for _ in batch)
+        for raw, chain, name, label_type, source in conn.execute(
+            f"SELECT address, chain, name, type, source FROM address_labels WHERE address IN ({placeholders})",
+            batch,
+        ):
+            if chain_filter is None or chain in chain_filter or chain == ANY_CHAIN:
+                labels.setdefault(bytes_to_address(raw), {})[chain] = {"name": name, "type": label_type, "source": source}
+    return labels
+
+
+def label_sources() -> List[Dict[str, Any]]:
+    rows = _connect().execute(
+        "SELECT source, version, labels, checksum, imported_at FROM label_sources ORDER BY source"
+    ).fetchall()
+    return [
+        {"source": source, "version": version, "labels": labels, "checksum": checksum, "imported_at": imported_at}
+        for source, version, labels, checksum, imported_at in rows
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3 or sys.argv[1] != "import":
+        print("Usage: python -m api.tools.label_store import <labels.json|labels.csv> [source]")
+        sys.exit(1)
+
+    print(json.dumps(import_label_file(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None), indent=4))
+    print(json.dumps(label_sources(), indent=4))
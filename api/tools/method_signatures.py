@@ -0,0 +1,241 @@
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Transactions without a functionName are plain value transfers
+NATIVE_TRANSFER = "(native transfer)"
+
+SIGNATURE_CACHE_SIZE = 65536
+DEFAULT_TOP_METHODS = 10
+VALUE_DECIMALS = 9
+
+
+class MethodSignature(NamedTuple):
+    name: str
+    signature: str
+
+
+def _split_arguments(arguments: str) -> List[str]:
+    """
+    Split an argument list on top-level commas, keeping tuple arguments together.
+    """
+    parts, depth, current = [], 0, []
+    for ch in arguments:
+        if ch == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        current.append(ch)
+    parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _argument_type(argument: str) -> str:
+    """
+    The type of one declared argument, dropping its name: "address[] path" -> "address[]".
+    """
+    if argument.startswith("("):
+        close = argument.rfind(")")
+        inner = ",".join(_argument_type(a) for a in _split_arguments(argument[1:close]))
+        return f"({inner}){argument[close + 1:].split(' ')[0]}"
+    return argument.split(" ")[0]
+
+
+@lru_cache(maxsize=SIGNATURE_CACHE_SIZE)
+def parse_signature(function_name: str) -> MethodSignature:
+    """
+    Canonical form of an Etherscan functionName, parsed once per distinct string.
+
+    "swapExactETHForTokens(uint256 amountOutMin, address[] path, address to, uint256 deadline)"
+    becomes swapExactETHForTokens(uint256,address[],address,uint256); every
+    transaction with that functionName shares the one cached result.
+    """
+    function_name = (function_name or "").strip()
+    if not function_name:
+        return MethodSignature(NATIVE_TRANSFER, NATIVE_TRANSFER)
+    open_paren = function_name.find("(")
+    if open_paren < 0:
+        return MethodSignature(function_name, f"{function_name}()")
+    name = function_name[:open_paren].strip()
+    close_paren = function_name.rfind(")")
+    arguments = function_name[open_paren + 1:close_paren if close_paren > open_paren else len(function_name)]
+    types = ",".join(_argument_type(a) for a in _split_arguments(arguments))
+    return MethodSignature(name, f"{name}({types})")
+
+
+class MethodTable:
+    """
+    Request-scoped interning of method signatures to small integer codes.
+
+    Raw functionName strings are resolved through the shared parse cache, and
+    spellings that differ only in argument names share a code.
+    """
+
+    def __init__(self):
+        self.signatures: List[MethodSignature] = []
+        self._codes: Dict[str, int] = {}
+        self._by_raw: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def intern(self, parsed: MethodSignature) -> int:
+        code = self._codes.get(parsed.signature)
+        if code is None:
+            code = self._codes[parsed.signature] = len(self.signatures)
+            self.signatures.append(parsed)
+        return code
+
+    def code(self, function_name: str) -> int:
+        code = self._by_raw.get(function_name)
+        if code is None:
+            code = self._by_raw[function_name] = self.intern(parse_signature(function_name or ""))
+        return code
+
+    def codes(self, transactions: Sequence[Dict[str, Any]]) -> np.ndarray:
+        code = self.code
+        return np.fromiter(
+            (code(tx.get("functionName") or "") for tx in transactions),
+            dtype=np.int32,
+            count=len(transactions),
+        )
+
+
+class MethodStats:
+    """
+    Streaming per-method call counts and value totals, keyed by MethodTable code.
+
+    The table may be shared with other consumers, so codes can arrive out of
+    order and the lists grow to the table's size.
+    """
+
+    def __init__(self, table: Optional[MethodTable] = None):
+        self.table = table or MethodTable()
+        self.calls: List[int] = []
+        self.values: List[float] = []
+
+    def add(self, function_name: str, value: float, calls: int = 1) -> None:
+        self._add(self.table.code(function_name), value, calls)
+
+    def add_signature(self, signature: MethodSignature, value: float, calls: int = 1) -> None:
+        """
+        Count an already parsed signature, e.g. one read back from stored totals.
+        """
+        self._add(self.table.intern(signature), value, calls)
+
+    def _add(self, code: int, value: float, calls: int) -> None:
+        if code >= len(self.calls):
+            missing = len(self.table) - len(self.calls)
+            self.calls.extend([0] * missing)
+            self.values.extend([0.0] * missing)
+        self.calls[code] += calls
+        self.values[code] += value
+
+    def summary(self, top_n: int = DEFAULT_TOP_METHODS) -> Dict[str, Any]:
+        return summarize_methods(
+            self.table.signatures,
+            np.array(self.calls, dtype=np.int64),
+            np.array(self.values, dtype=np.float64),
+            top_n,
+        )
+
+
+def method_totals(codes: np.ndarray, values: np.ndarray, num_methods: int):
+    """
+    Calls and value per method code, via bincount over the code column.
+    """
+    calls = np.bincount(codes, minlength=num_methods)
+    totals = np.bincount(codes, weights=values, minlength=num_methods)
+    return calls, totals
+
+
+def summarize_methods(
+    signatures: Sequence[MethodSignature],
+    calls: np.ndarray,
+    values: np.ndarray,
+    top_n: int = DEFAULT_TOP_METHODS,
+) -> Dict[str, Any]:
+    """
+    Distinct method count and the top_n methods by call count, with their value totals.
+    """
+    used = np.flatnonzero(calls)
+    top = used[np.argsort(-calls[used], kind="stable")][:top_n]
+    return {
+        "distinctMethods": len(used),
+        "methods": [
+            {
+                "method": signatures[i].signature,
+                "name": signatures[i].name,
+                "calls": int(calls[i]),
+                "totalValue": round(float(values[i]), VALUE_DECIMALS),
+            }
+            for i in top.tolist()
+        ],
+    }
+
+
+def summarize_method_totals(totals: Dict[MethodSignature, List[float]], top_n: int = DEFAULT_TOP_METHODS) -> Dict[str, Any]:
+    """
+    summarize_methods over a signature -> [calls, value] map.
+    """
+    entries = np.array(list(totals.values()), dtype=np.float64).reshape(-1, 2)
+    return summarize_methods(list(totals), entries[:, 0].astype(np.int64), entries[:, 1], top_n)
+
+
+def merge_method_totals(totals: Iterable[Dict[MethodSignature, List[float]]]) -> Dict[MethodSignature, List[float]]:
+    """
+    Sum several signature -> [calls, value] maps, e.g. one per chain.
+    """
+    merged: Dict[MethodSignature, List[float]] = {}
+    for entries in totals:
+        for signature, (calls, value) in entries.items():
+            entry = merged.get(signature)
+            if entry is None:
+                merged[signature] = [calls, value]
+            else:
+                entry[0] += calls
+                entry[1] += value
+    return merged
+
+
+if __name__ == "__main__":
+    import json
+    import random
+    import time
+
+    rng = random.Random(7)
+    names = [
+        "",
+        "transfer(address _to, uint256 _value)",
+        "approve(address spender, uint256 amount)",
+        "swapExactETHForTokens(uint256 amountOutMin, address[] path, address to, uint256 deadline)",
+        "multicall(uint256 deadline, bytes[] data)",
+        "execute(bytes commands, bytes[] inputs, uint256 deadline)",
+    ] + [f"method{i}(uint256 a{i}, (address,uint256)[] orders)" for i in range(200)]
+    transactions = [{"functionName": rng.choice(names[:6] * 20 + names), "value_ether": rng.random()} for _ in range(300_000)]
+
+    parse_signature.cache_clear()
+    started = time.perf_counter()
+    table = MethodTable()
+    codes = table.codes(transactions)
+    values = np.array([tx["value_ether"] for tx in transactions])
+    calls, totals = method_totals(codes, values, len(table))
+    summary = summarize_methods(table.signatures, calls, totals, 5)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "transactions": len(transactions),
+        "distinct_methods": summary["distinctMethods"],
+        "parse_cache": parse_signature.cache_info()._asdict(),
+        "aggregate_ms": round(elapsed * 1000, 3),
+        "top": summary["methods"][:3],
+    }, indent=4))
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import heapq
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from api.tools.address_checker import load_flagged_data, get_unique_addresses
+from api.tools.address_graph import EDGE_ORIGIN_TREE, AddressGraph, build_address_graph, sorted_unique, unique_first
+from api.tools.edge_cache import edge_evidence, last_edge_rowid, load_cached_edges
+from api.tools.family_tree_store import get_family_tree_store
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_K = 3
+DEFAULT_MAX_HOPS = 6
+GRAPH_REFRESH_SECONDS = 300
+
+UNVISITED = -2
+ROOT = -1
+
+
+def _pair_keys(a: np.ndarray, b: np.ndarray, n: int) -> np.ndarray:
+    """
+    Encode undirected node pairs as single integers for fast membership tests.
+    """
+    return np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b)
+
+
+def bidirectional_bfs(
+    graph: AddressGraph,
+    source: int,
+    target: int,
+    max_hops: int = DEFAULT_MAX_HOPS,
+    blocked_nodes: Optional[np.ndarray] = None,
+    blocked_edges: Optional[np.ndarray] = None,
+) -> Optional[List[int]]:
+    """
+    Shortest unweighted path between two address ids, or None.
+
+    Both searches advance one full level at a time, always growing the side
+    whose frontier is cheaper to expand, and stop at the first level where they
+    meet. `blocked_nodes` is a boolean mask and `blocked_edges` a sorted array of
+    pair keys; both are used by the k-shortest-paths search.
+    """
+    if source == target:
+        return [source]
+
+    n = len(graph)
+    parents = {
+        True: np.full(n, UNVISITED, dtype=np.int64),
+        False: np.full(n, UNVISITED, dtype=np.int64),
+    }
+    parents[True][source] = ROOT
+    parents[False][target] = ROOT
+    frontiers = {True: np.array([source]), False: np.array([target])}
+    hops = 0
+
+    while frontiers[True].size and frontiers[False].size and hops < max_hops:
+        cost_forward = int((graph.indptr[frontiers[True] + 1] - graph.indptr[frontiers[True]]).sum())
+        cost_backward = int((graph.indptr[frontiers[False] + 1] - graph.indptr[frontiers[False]]).sum())
+        forward = cost_forward <= cost_backward
+        own, other = parents[forward], parents[not forward]
+
+        origins, neighbors = graph.expand(frontiers[forward])
+        keep = own[neighbors] == UNVISITED
+        if blocked_nodes is not None:
+            keep &= ~blocked_nodes[neighbors]
+        if blocked_edges is not None and len(blocked_edges):
+            keep &= ~np.isin(_pair_keys(origins, neighbors, n), blocked_edges)
+        origins, neighbors = origins[keep], neighbors[keep]
+        neighbors, first = unique_first(neighbors)
+        own[neighbors] = origins[first]
+        frontiers[forward] = neighbors
+        hops += 1
+
+        meeting = neighbors[other[neighbors] != UNVISITED]
+        if meeting.size:
+            middle = int(meeting[0])
+            head = []
+            node = middle
+            while node != ROOT:
+                head.append(node)
+                node = int(parents[True][node])
+            tail = []
+            node = int(parents[False][middle])
+            while node != ROOT:
+                tail.append(node)
+                node = int(parents[False][node])
+            return head[::-1] + tail
+    return None
+
+
+def k_shortest_paths(
+    graph: AddressGraph,
+    source: int,
+    target: int,
+    k: int = DEFAULT_K,
+    max_hops: int = DEFAULT_MAX_HOPS,
+) -> List[List[int]]:
+    """
+    Yen's algorithm over bidirectional BFS: the k shortest loop-free paths.
+    """
+    first = bidirectional_bfs(graph, source, target, max_hops)
+    if first is None:
+        return []
+
+    n = len(graph)
+    accepted = [first]
+    candidates: List[Tuple[int, List[int]]] = []
+    seen: Set[Tuple[int, ...]] = {tuple(first)}
+
+    while len(accepted) < k:
+        previous = accepted[-1]
+        for i in range(len(previous) - 1):
+            spur = previous[i]
+            root_path = previous[:i + 1]
+
+            removed = [p[i + 1] for p in accepted if len(p) > i + 1 and p[:i + 1] == root_path]
+            blocked_edges = sorted_unique(_pair_keys(np.full(len(removed), spur), np.array(removed, dtype=np.int64), n))
+            blocked_nodes = np.zeros(n, dtype=bool)
+            blocked_nodes[root_path[:-1]] = True
+
+            spur_path = bidirectional_bfs(graph, spur, target, max_hops - i, blocked_nodes, blocked_edges)
+            if spur_path is None:
+                continue
+            path = root_path[:-1] + spur_path
+            if tuple(path) not in seen:
+                seen.add(tuple(path))
+                heapq.heappush(candidates, (len(path), path))
+
+        if not candidates:
+            break
+        accepted.append(heapq.heappop(candidates)[1])
+
+    return accepted
+
+
+class PathGraph:
+    """
+    The family-tree, flagged and cached-transaction graph used for path queries,
+    with a sorted index of family-tree pairs for labelling edges.
+    """
+
+    def __init__(self, graph: AddressGraph, store_mtime: float, edge_rowid: int):
+        self.graph = graph
+        self.store_mtime = store_mtime
+        self.edge_rowid = edge_rowid
+        self.built_at = time.monotonic()
+        tree = graph.origin == EDGE_ORIGIN_TREE
+        self.tree_pairs = sorted_unique(_pair_keys(graph.src[tree], graph.dst[tree], len(graph)))
+
+    def is_tree_edge(self, a: int, b: int) -> bool:
+        key = _pair_keys(np.array([a]), np.array([b]), len(self.graph))[0]
+        pos = np.searchsorted(self.tree_pairs, key)
+        return bool(pos < len(self.tree_pairs) and self.tree_pairs[pos] == key)
+
+
+def build_path_graph() -> PathGraph:
+    store = get_family_tree_store()
+    # Read before the edges so an edge cached meanwhile triggers the next refresh
+    edge_rowid = last_edge_rowid()
+    flagged_data = load_flagged_data() or []
+    graph = build_address_graph(
+        store,
+        trees=flagged_data,
+        extra_addresses=get_unique_addresses(flagged_data),
+        transaction_edges=load_cached_edges(),
+    )
+    return PathGraph(graph, os.path.getmtime(store.path), edge_rowid)
+
+
+_graph_lock = threading.Lock()
+_path_graph: Optional[PathGraph] = None
+
+
+def get_path_graph() -> PathGraph:
+    """
+    Return the shared path graph, rebuilding it when the family trees change or,
+    at most every GRAPH_REFRESH_SECONDS, when new transaction edges were cached.
+    """
+    global _path_graph
+    with _graph_lock:
+        stale = _path_graph is None
+        if not stale:
+            store = get_family_tree_store()
+            stale = os.path.getmtime(store.path) != _path_graph.store_mtime
+        if not stale and time.monotonic() - _path_graph.built_at > GRAPH_REFRESH_SECONDS:
+            stale = last_edge_rowid() != _path_graph.edge_rowid
+            _path_graph.built_at = time.monotonic()
+        if stale:
+            _path_graph = build_path_graph()
+        return _path_graph
+
+
+def find_paths(source: str, target: str, k: int = DEFAULT_K, max_hops: int = DEFAULT_MAX_HOPS) -> Dict[str, Any]:
+    """
+    Find the k shortest paths between two addresses with evidence for every edge.
+    """
+    path_graph = get_path_graph()
+    graph = path_graph.graph
+    source_id, target_id = (int(i) for i in graph.indices_of([source, target]))
+
+    missing = [a for a, i in ((source, source_id), (target, target_id)) if i < 0]
+    if missing:
+        return {"source": source, "target": target, "paths": [], "missing_addresses": missing}
+
+    paths = []
+    for path in k_shortest_paths(graph, source_id, target_id, k, max_hops):
+        addresses = [graph.address(i) for i in path]
+        edges = []
+        for a, b, a_addr, b_addr in zip(path, path[1:], addresses, addresses[1:]):
+            edges.append({
+                "from": a_addr,
+                "to": b_addr,
+                "family_tree": path_graph.is_tree_edge(a, b),
+                "transactions": edge_evidence(a_addr, b_addr),
+            })
+        paths.append({"hops": len(path) - 1, "addresses": addresses, "edges": edges})
+
+    return {"source": source, "target": target, "paths": paths, "missing_addresses": []}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Usage: python -m api.tools.path_finder <source> <target> [k]")
+        sys.exit(1)
+
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_K
+    print(json.dumps(find_paths(sys.argv[1], sys.argv[2], k), indent=4))
@@ -0,0 +1,153 @@
+import time
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from api.tools.address_graph import encode_addresses, sorted_unique
+from api.tools.sqlite_store import cache_path, chunked, connect
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+SIMILARITY_INDEX_PATH = cache_path("wallet_similarity.db")
+
+# 32 bands of 4 rows: pairs with Jaccard ~0.4 collide in at least one band ~55%
+# of the time, pairs above ~0.6 almost always.
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+HASH_CHUNK = 8192
+
+# Multiply-shift hash family: h(x) = ((a * x + b) mod 2^64) >> 32 with odd a.
+_rng = np.random.RandomState(0x1DEF1)
+PERMUTATION_A = _rng.randint(0, 1 << 62, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+PERMUTATION_B = _rng.randint(0, 1 << 62, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+SIMILARITY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallet_signatures (
+    wallet TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    counterparties INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    wallet TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, wallet)
+);
+CREATE INDEX IF NOT EXISTS idx_lsh_buckets_wallet ON lsh_buckets (wallet);
+"""
+
+
+def hash_addresses(addresses: Iterable[str]) -> np.ndarray:
+    """
+    Fold each 20-byte address into a distinct 64-bit token for the permutation hashes.
+    """
+    keys, valid = encode_addresses(addresses)
+    raw = np.frombuffer(keys[valid].tobytes(), dtype=np.uint8).reshape(-1, 20)
+    words = np.zeros((len(raw), 24), dtype=np.uint8)
+    words[:, :20] = raw
+    words = words.view("<u8")
+    folded = words[:, 0] ^ (words[:, 1] * np.uint64(0x9E3779B97F4A7C15)) ^ words[:, 2]
+    return sorted_unique(folded)
+
+
+def minhash_signature(addresses: Iterable[str]) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a counterparty set, or None for an empty set.
+    """
+    tokens = hash_addresses(addresses)
+    if tokens.size == 0:
+        return None
+    signature = np.full(NUM_PERMUTATIONS, np.iinfo(np.uint32).max, dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        for start in range(0, len(tokens), HASH_CHUNK):
+            chunk = tokens[start:start + HASH_CHUNK]
+            hashed = (PERMUTATION_A[:, None] * chunk[None, :] + PERMUTATION_B[:, None]) >> np.uint64(32)
+            np.minimum(signature, hashed.min(axis=1).astype(np.uint32), out=signature)
+    return signature
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """
+    Hash each band of the signature into a signed 64-bit bucket id.
+    """
+    bands = signature.reshape(LSH_BANDS, LSH_ROWS)
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in bands
+    ]
+
+
+def update_wallet_signature(wallet_address: str, counterparties: Iterable[str]) -> bool:
+    """
+    Index (or re-index) a wallet's counterparty set. Called whenever a wallet is analyzed.
+    """
+    wallet = wallet_address.lower()
+    counterparties = list(counterparties)
+    signature = minhash_signature(counterparties)
+    if signature is None:
+        return False
+
+    conn = connect(SIMILARITY_INDEX_PATH, SIMILARITY_SCHEMA)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO wallet_signatures (wallet, signature, counterparties, updated_at) VALUES (?, ?, ?, ?)",
+            (wallet, signature.tobytes(), len(counterparties), int(time.time())),
+        )
+        conn.execute("DELETE FROM lsh_buckets WHERE wallet = ?", (wallet,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO lsh_buckets (band, bucket, wallet) VALUES (?, ?, ?)",
+            [(band, bucket, wallet) for band, bucket in enumerate(band_buckets(signature))],
+        )
+    return True
+
+
+def _load_signature(conn, wallet: str) -> Optional[np.ndarray]:
+    row = conn.execute("SELECT signature FROM wallet_signatures WHERE wallet = ?", (wallet,)).fetchone()
+    return np.frombuffer(row[0], dtype=np.uint32) if row else None
+
+
+def find_similar_wallets(
+    wallet_address: str,
+    k: int = 10,
+    counterparties: Optional[Iterable[str]] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Top-k wallets by estimated Jaccard similarity of counterparty sets.
+
+    Only wallets sharing at least one LSH band bucket are scored, so the cost
+    depends on the number of candidates rather than the number of indexed
+    wallets. Returns None if the wallet has not been indexed and no
+    counterparties were given.
+    """
+    wallet = wallet_address.lower()
+    conn = connect(SIMILARITY_INDEX_PATH, SIMILARITY_SCHEMA)
+    signature = minhash_signature(counterparties) if counterparties is not None else _load_signature(conn, wallet)
+    if signature is None:
+        return None
+
+    clauses = " OR ".join(["(band = ? AND bucket = ?)"] * LSH_BANDS)
+    params = [value for pair in enumerate(band_buckets(signature)) for value in pair]
+    candidates = [
+        row[0] for row in conn.execute(f"SELECT DISTINCT wallet FROM lsh_buckets WHERE {clauses}", params)
+        if row[0] != wallet
+    ]
+
+    scored = []
+    for batch in chunked(candidates):
+        placeholders = ",".join("?" * len(batch))
+        rows = conn.execute(
+            f"SELECT wallet, signature, counterparties FROM wallet_signatures WHERE wallet IN ({placeholders})",
+            batch,
+        ).fetchall()
+        for other, raw, count in rows:
+            similarity = float(np.mean(np.frombuffer(raw, dtype=np.uint32) == signature))
+            scored.append({"wallet": other, "estimated_jaccard": round(similarity, 4), "counterparties": count})
+
+    scored.sort(key=lambda item: item["estimated_jaccard"], reverse=True)
+    return scored[:k]
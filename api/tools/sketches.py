@@ -0,0 +1,232 @@
+import math
+import heapq
+import random
+import hashlib
+import logging
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Default sizes: together well under 1 MB however long the stream is
+DEFAULT_HLL_PRECISION = 14
+DEFAULT_CMS_WIDTH = 4096
+DEFAULT_CMS_DEPTH = 4
+DEFAULT_HEAVY_HITTERS = 1000
+DEFAULT_RESERVOIR_SIZE = 20
+
+_MASK64 = (1 << 64) - 1
+
+
+def hash_item(item: str) -> Tuple[int, int]:
+    """
+    Two independent 64-bit hashes of an item, stable across processes (unlike hash()).
+    """
+    digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class HyperLogLog:
+    """
+    Distinct-count estimate in 2^precision one-byte registers.
+
+    The standard error is about 1.04 / sqrt(2^precision), 0.8% at the default precision.
+    """
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18.")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.size)
+
+    def add_hash(self, h: int) -> None:
+        index = h >> (64 - self.precision)
+        rest = (h << self.precision) & _MASK64
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, item: str) -> None:
+        self.add_hash(hash_item(item)[0])
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision.")
+        self.registers = bytearray(np.maximum(np.frombuffer(self.registers, np.uint8), np.frombuffer(other.registers, np.uint8)).tobytes())
+
+    def estimate(self) -> int:
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class CountMinSketch:
+    """
+    Frequency estimates that never undercount, within epsilon * N of the truth with probability 1 - delta.
+    """
+
+    def __init__(self, width: int = DEFAULT_CMS_WIDTH, depth: int = DEFAULT_CMS_DEPTH):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _columns(self, hashes: Tuple[int, int]) -> List[int]:
+        h1, h2 = hashes
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add_hash(self, hashes: Tuple[int, int], count: int = 1) -> None:
+        self.table[np.arange(self.depth), self._columns(hashes)] += count
+        self.total += count
+
+    def add_hashes(self, hashes: Iterable[Tuple[int, int]], counts: Optional[Iterable[int]] = None) -> None:
+        """
+        Add many items in one vectorized update, one occurrence each unless `counts` is given.
+        """
+        columns = np.array([self._columns(h) for h in hashes], dtype=np.int64).reshape(-1, self.depth)
+        weights = None if counts is None else np.fromiter(counts, dtype=np.int64, count=len(columns))
+        for row in range(self.depth):
+            self.table[row] += np.bincount(columns[:, row], weights=weights, minlength=self.width).astype(np.int64)
+        self.total += len(columns) if weights is None else int(weights.sum())
+
+    def estimate_hash(self, hashes: Tuple[int, int]) -> int:
+        return int(self.table[np.arange(self.depth), self._columns(hashes)].min())
+
+    def estimate(self, item: str) -> int:
+        return self.estimate_hash(hash_item(item))
+
+
+class SpaceSaving:
+    """
+    Top-k heavy hitters in `capacity` counters (Metwally et al.).
+
+    Every item seen more than N / capacity times is tracked. A tracked count
+    overestimates the truth by at most its recorded error.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HEAVY_HITTERS):
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # Min-heap of (count, item); entries go stale as counts grow and are skipped lazily
+        self._heap: List[Tuple[int, Hashable]] = []
+
+    def add(self, item: Hashable, count: int = 1) -> None:
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (count, item))
+        else:
+            floor, evicted = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+            heapq.heappush(self._heap, (floor + count, item))
+
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[int, Hashable]:
+        while True:
+            count, item = heapq.heappop(self._heap)
+            current = self.counts.get(item)
+            if current == count:
+                return count, item
+            if current is not None:
+                heapq.heappush(self._heap, (current, item))
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Hashable, int, int]]:
+        """
+        (item, estimated count, guaranteed minimum count), highest estimate first.
+        """
+        ranked = sorted(self.counts.items(), key=lambda entry: entry[1], reverse=True)[:n]
+        return [(item, count, count - self.errors[item]) for item, count in ranked]
+
+
+class Reservoir:
+    """
+    Uniform sample of `size` items from a stream of unknown length (Algorithm R).
+    """
+
+    def __init__(self, size: int = DEFAULT_RESERVOIR_SIZE, seed: Optional[int] = None):
+        self.size = size
+        self.items: List[Any] = []
+        self.seen = 0
+        self._random = random.Random(seed)
+
+    def add(self, item: Any) -> None:
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        slot = self._random.randrange(self.seen)
+        if slot < self.size:
+            self.items[slot] = item
+
+
+if __name__ == "__main__":
+    import json
+    import time
+    import tracemalloc
+    from collections import Counter
+
+    # Zipf-like stream: a few very active counterparties and a long tail
+    rng = random.Random(7)
+    stream = [f"0x{int(rng.paretovariate(1.1) * 1000):040x}" for _ in range(500_000)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    hll, cms, top, sample = HyperLogLog(), CountMinSketch(), SpaceSaving(), Reservoir(seed=7)
+    for offset in range(0, len(stream), 10_000):
+        # Pre-aggregate each page so every sketch sees one update per distinct item
+        page = stream[offset:offset + 10_000]
+        page_counts = Counter(page)
+        hashes = [hash_item(item) for item in page_counts]
+        for item, h in zip(page_counts, hashes):
+            hll.add_hash(h[0])
+            top.add(item, page_counts[item])
+        cms.add_hashes(hashes, page_counts.values())
+        for item in page:
+            sample.add(item)
+        del page, page_counts, hashes
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    exact = Counter(stream)
+    heavy = exact.most_common(10)
+    print(json.dumps({
+        "items": len(stream),
+        "distinct_exact": len(exact),
+        "distinct_estimate": hll.estimate(),
+        "top10_recall": len({i for i, _ in heavy} & {i for i, _, _ in top.top(10)}) / 10,
+        "cms_max_overcount": max(cms.estimate(i) - c for i, c in heavy),
+        "sketch_seconds": round(elapsed, 3),
+        "sketch_peak_kb": round(peak / 1024, 1),
+    }, indent=4))
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import logging
+import threading
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Dynamically calculate paths
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))  # tools/
+API_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))  # api/
+CACHE_DIR = os.getenv("IDEFI_CACHE_DIR", os.path.join(API_DIR, "cache"))
+
+# SQLite caps bound parameters per statement; stay well under the limit
+MAX_SQL_PARAMS = 900
+
+_local = threading.local()
+
+
+def cache_path(filename):
+    """
+    Resolve a database file inside the cache directory; connect() creates the directory on first use.
+    """
+    return os.path.join(CACHE_DIR, filename)
+
+
+def connect(path, schema=None):
+    """
+    Return this thread's connection to a SQLite database, applying the schema on first use.
+
+    Connections are cached per thread because sqlite3 connections must not be
+    shared across threads; WAL mode lets gunicorn workers read while another writes.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if schema:
+            conn.executescript(schema)
+            conn.commit()
+        connections[path] = conn
+        logger.debug(f"Opened SQLite database at {path}")
+    return conn
+
+
+def chunked(values, size=MAX_SQL_PARAMS):
+    """
+    Split a sequence into lists small enough for a single IN (...) clause.
+    """
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
@@ -0,0 +1,223 @@
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from api.tools.etherscanv2 import (
+    SUPPORTED_CHAINS,
+    RequestBudget,
+    RequestBudgetExhausted,
+    get_transaction_data,
+    is_valid_ethereum_address,
+)
+from api.tools.address_checker import load_flagged_data, get_unique_addresses
+from api.tools.edge_cache import queue_transactions
+from api.tools.exposure_index import lookup_exposure
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Per-request crawl budget defaults
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_API_CALLS = 60
+DEFAULT_MAX_NODES = 2000
+DEFAULT_CRAWL_CHAINS = ["ethereum"]
+
+
+def summarize_counterparties(address: str, chain_results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Collapse a wallet's transactions into one entry per counterparty with the
+    total transferred value and the largest transaction as edge evidence.
+    """
+    address = address.lower()
+    counterparties = {}
+    for chain_data in chain_results:
+        chain_name = chain_data.get("chain")
+        for tx in chain_data.get("transactions", []):
+            from_addr = (tx.get("from") or "").lower()
+            to_addr = (tx.get("to") or "").lower()
+            other = to_addr if from_addr == address else from_addr
+            if not other or other == address:
+                continue
+
+            value = tx.get("value_ether") or 0.0
+            entry = counterparties.get(other)
+            if entry is None:
+                entry = counterparties[other] = {"total_value": 0.0, "tx_count": 0, "evidence": None, "best_value": -1.0}
+            entry["total_value"] += value
+            entry["tx_count"] += 1
+            if value > entry["best_value"]:
+                entry["best_value"] = value
+                entry["evidence"] = {
+                    "hash": tx.get("hash"),
+                    "chain": chain_name,
+                    "from": from_addr,
+                    "to": to_addr,
+                    "value_ether": value,
+                }
+    return counterparties
+
+
+def build_taint_path(target: str, parents: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Walk BFS parent pointers back from a flagged address to the crawl root.
+    """
+    path = [target]
+    edges = []
+    node = target
+    while parents.get(node) is not None:
+        link = parents[node]
+        edges.append(link["evidence"])
+        node = link["parent"]
+        path.append(node)
+    path.reverse()
+    edges.reverse()
+    return {"flagged_address": target, "hops": len(edges), "path": path, "edges": edges}
+
+
+async def crawl_taint(
+    root_address: str,
+    chains: Optional[Iterable[str]] = None,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+    max_api_calls: int = DEFAULT_MAX_API_CALLS,
+    max_nodes: int = DEFAULT_MAX_NODES,
+    flagged_addresses: Optional[Set[str]] = None,
+    use_exposure_index: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Expand counterparties hop by hop until a flagged address is reached or the budget runs out.
+
+    Yields progress events after every expansion and a final "result" event.
+    Each level is expanded in descending order of the value transferred along
+    its discovering edge, so a limited budget is spent on the heaviest flows
+    first. Every fetch goes through get_transaction_data and therefore the
+    shared Etherscan rate limit. `max_api_calls` caps the HTTP requests
+    actually sent, retries included; an expansion cut short by it is dropped.
+    """
+    if not is_valid_ethereum_address(root_address):
+        raise ValueError(f"Invalid Ethereum address: {root_address}")
+
+    root = root_address.lower()
+    chains = [c for c in (chains or DEFAULT_CRAWL_CHAINS) if c in SUPPORTED_CHAINS]
+    if not chains:
+        raise ValueError("No supported chains requested.")
+
+    if use_exposure_index:
+        exposure = lookup_exposure(root)
+        if exposure is not None and exposure["hops"] <= max_depth:
+            yield {
+                "event": "result",
+                "address": root_address,
+                "source": "exposure_index",
+                "tainted": True,
+                "paths": [{
+                    "flagged_address": exposure["nearest_flagged_source"],
+                    "hops": exposure["hops"],
+                    "path": None,
+                    "edges": None,
+                }],
+                "api_calls": 0,
+                "nodes_visited": 0,
+                "depth_reached": 0,
+                "budget_exhausted": False,
+            }
+            return
+
+    if flagged_addresses is None:
+        flagged_addresses = get_unique_addresses(load_flagged_data() or [])
+
+    parents: Dict[str, Optional[Dict[str, Any]]] = {root: None}
+    found: List[str] = [root] if root in flagged_addresses else []
+    frontier = {root: 0.0}
+    budget = RequestBudget(max_api_calls)
+    depth = 0
+    budget_exhausted = False
+
+    while frontier and not found and depth < max_depth:
+        depth += 1
+        next_frontier: Dict[str, float] = {}
+        ordered = sorted(frontier.items(), key=lambda item: item[1], reverse=True)
+
+        for node, _ in ordered:
+            if budget.exhausted or len(parents) >= max_nodes:
+                budget_exhausted = True
+                break
+
+            try:
+                chain_results = await get_transaction_data(node, chains, budget=budget)
+            except RequestBudgetExhausted:
+                budget_exhausted = True
+                break
+            except Exception as e:
+                logger.error(f"Taint crawl failed to fetch {node}: {e}")
+                chain_results = []
+            queue_transactions(chain_results)
+
+            counterparties = summarize_counterparties(node, chain_results)
+            for other, entry in sorted(counterparties.items(), key=lambda item: item[1]["total_value"], reverse=True):
+                if other in parents:
+                    continue
+                if len(parents) >= max_nodes:
+                    budget_exhausted = True
+                    break
+                parents[other] = {"parent": node, "evidence": entry["evidence"]}
+                next_frontier[other] = entry["total_value"]
+                if other in flagged_addresses:
+                    found.append(other)
+
+            yield {
+                "event": "progress",
+                "address": root_address,
+                "depth": depth,
+                "expanded": node,
+                "api_calls": budget.used,
+                "nodes_visited": len(parents),
+                "frontier": len(next_frontier),
+                "flagged_found": len(found),
+            }
+            if found:
+                break
+
+        if budget_exhausted:
+            break
+        frontier = next_frontier
+
+    paths = sorted((build_taint_path(target, parents) for target in found), key=lambda p: p["hops"])
+    yield {
+        "event": "result",
+        "address": root_address,
+        "source": "crawl",
+        "tainted": bool(paths),
+        "paths": paths,
+        "api_calls": budget.used,
+        "nodes_visited": len(parents),
+        "depth_reached": depth,
+        "budget_exhausted": budget_exhausted,
+    }
+
+
+async def find_taint_paths(root_address: str, **kwargs) -> Dict[str, Any]:
+    """
+    Run a taint crawl to completion and return only the final result.
+    """
+    result = {}
+    async for event in crawl_taint(root_address, **kwargs):
+        if event["event"] == "result":
+            result = event
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m api.tools.taint_crawler <wallet_address> [max_depth]")
+        sys.exit(1)
+
+    async def run():
+        depth = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_DEPTH
+        async for event in crawl_taint(sys.argv[1], max_depth=depth):
+            print(json.dumps(event))
+
+    asyncio.run(run())
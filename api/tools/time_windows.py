@@ -0,0 +1,106 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Logging setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+# Rolling windows reported alongside time-scoped metrics, widest first
+ROLLING_WINDOWS = {"90d": 90, "30d": 30, "7d": 7}
+
+
+def parse_time_bound(value: Union[str, int, float, None], end_of_day: bool = False) -> Optional[int]:
+    """
+    Parse a from/to bound given as Unix seconds, an ISO date (YYYY-MM-DD) or an ISO datetime.
+
+    A bare date used as an upper bound covers the whole day. Naive datetimes are taken as UTC.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid date: {value}. Use Unix seconds or ISO 8601 (YYYY-MM-DD).")
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    text = str(value).strip()
+    if text.isdigit():
+        return int(text)
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}. Use Unix seconds or ISO 8601 (YYYY-MM-DD).")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    timestamp = int(parsed.timestamp())
+    if end_of_day and len(text) == 10:
+        timestamp += SECONDS_PER_DAY - 1
+    return timestamp
+
+
+def parse_time_range(start: Any, end: Any) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse a from/to pair into inclusive Unix-second bounds, rejecting inverted ranges.
+    """
+    start_ts = parse_time_bound(start)
+    end_ts = parse_time_bound(end, end_of_day=True)
+    if start_ts is not None and end_ts is not None and start_ts > end_ts:
+        raise ValueError("'from' must not be after 'to'.")
+    return start_ts, end_ts
+
+
+def format_time_bound(timestamp: Optional[int]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _bisect_timestamp(transactions: List[Dict[str, Any]], timestamp: int, right: bool) -> int:
+    """
+    First index whose timeStamp is >= timestamp (or > timestamp if `right`), in O(log n).
+    """
+    lo, hi = 0, len(transactions)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        mid_ts = int(transactions[mid].get("timeStamp") or 0)
+        if mid_ts < timestamp or (right and mid_ts == timestamp):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def find_time_slice(transactions: List[Dict[str, Any]], start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+    """
+    Index range of the transactions with start <= timeStamp <= end.
+
+    Relies on the ascending timeStamp order produced by clean_transaction_data.
+    """
+    lo = _bisect_timestamp(transactions, start, right=False) if start is not None else 0
+    hi = _bisect_timestamp(transactions, end, right=True) if end is not None else len(transactions)
+    return lo, max(lo, hi)
+
+
+def slice_chain_results(
+    chain_results: List[Dict[str, Any]],
+    start: Optional[int],
+    end: Optional[int],
+) -> List[Dict[str, Any]]:
+    """
+    Restrict get_transaction_data output to a time range without scanning the transactions.
+
+    Chains with no transactions in range are dropped, as get_transaction_data does for empty chains.
+    """
+    if start is None and end is None:
+        return chain_results
+
+    sliced = []
+    for chain_data in chain_results:
+        transactions = chain_data.get("transactions", [])
+        lo, hi = find_time_slice(transactions, start, end)
+        if hi > lo:
+            sliced.append({**chain_data, "transactions": transactions[lo:hi]})
+    return sliced
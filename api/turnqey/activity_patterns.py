@@ -0,0 +1,283 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.tools.time_windows import SECONDS_PER_DAY, format_time_bound
+from api.turnqey.metrics_engine import FLOW_DECIMALS, MISSING, TransactionColumns
+
+# Logging configuration
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_HOUR = 3600
+
+# Burst: an hour holding BURST_FACTOR times the wallet's average hourly rate, and at least BURST_MIN_TRANSACTIONS
+BURST_WINDOW = SECONDS_PER_HOUR
+BURST_FACTOR = 10
+BURST_MIN_TRANSACTIONS = 10
+
+# Dormancy: a gap of DORMANCY_DAYS, reactivated by REACTIVATION_MIN_TRANSACTIONS within REACTIVATION_DAYS
+DORMANCY_DAYS = 90
+REACTIVATION_DAYS = 7
+REACTIVATION_MIN_TRANSACTIONS = 3
+
+# Fan-out: outgoing transfers to FAN_OUT_MIN_COUNTERPARTIES distinct addresses within FAN_OUT_WINDOW
+FAN_OUT_WINDOW = SECONDS_PER_HOUR
+FAN_OUT_MIN_COUNTERPARTIES = 10
+
+MAX_REPORTED_EPISODES = 5
+
+
+class ActivityTimeline:
+    """
+    A wallet's transactions across chains as parallel arrays in ascending time order.
+
+    `peers` holds an integer id of each transaction's recipient (any stable
+    encoding works; only equality is used), `outgoing` marks transfers the
+    wallet sent to someone else and `errors` marks failed transactions.
+    """
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        values: np.ndarray,
+        peers: np.ndarray,
+        outgoing: np.ndarray,
+        errors: Optional[np.ndarray] = None,
+    ):
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamps = timestamps[order]
+        self.values = values[order]
+        self.peers = peers[order]
+        self.outgoing = outgoing[order]
+        self.errors = np.zeros(len(order), dtype=bool) if errors is None else errors[order]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def from_columns(cls, columns: TransactionColumns, wallet_address: str) -> "ActivityTimeline":
+        outgoing = np.zeros(len(columns.counterparty_codes), dtype=bool)
+        outgoing[columns.wallet_rows(wallet_address)[1]] = True
+        return cls(
+            columns.timestamps(),
+            columns.field("value_ether"),
+            columns.counterparty_codes.astype(np.int64),
+            outgoing,
+            columns.field("isError", int, np.int64) != 0,
+        )
+
+
+def _merge_intervals(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge sorted [start, end) index intervals that overlap. Intervals that
+    merely touch stay apart: they can be far apart in time.
+    """
+    if not len(starts):
+        return starts, ends
+    reach = np.maximum.accumulate(ends)
+    new_run = np.concatenate(([True], starts[1:] >= reach[:-1]))
+    first = np.flatnonzero(new_run)
+    last = np.concatenate((first[1:], [len(starts)])) - 1
+    return starts[first], reach[last]
+
+
+def _largest(sizes: np.ndarray) -> List[int]:
+    return np.argsort(-sizes, kind="stable")[:MAX_REPORTED_EPISODES].tolist()
+
+
+def detect_bursts(timeline: ActivityTimeline) -> Dict[str, Any]:
+    """
+    Episodes where some BURST_WINDOW holds far more transactions than the wallet's average rate.
+
+    Every transaction's window count comes from one searchsorted, and
+    overlapping burst windows are merged into episodes.
+    """
+    ts, n = timeline.timestamps, len(timeline)
+    span = max(int(ts[-1] - ts[0]), BURST_WINDOW)
+    baseline = n * BURST_WINDOW / span
+    threshold = max(BURST_MIN_TRANSACTIONS, BURST_FACTOR * baseline)
+
+    window_ends = np.searchsorted(ts, ts + BURST_WINDOW, side="left")
+    counts = window_ends - np.arange(n)
+    hits = np.flatnonzero(counts >= threshold)
+    starts, ends = _merge_intervals(hits, window_ends[hits])
+
+    cumulative = np.concatenate(([0.0], np.cumsum(timeline.values)))
+    sizes = ends - starts
+    episodes = [
+        {
+            "start": format_time_bound(int(ts[starts[i]])),
+            "end": format_time_bound(int(ts[ends[i] - 1])),
+            "transactions": int(sizes[i]),
+            "valueMoved": round(float(cumulative[ends[i]] - cumulative[starts[i]]), FLOW_DECIMALS),
+            "peakHourlyTransactions": int(counts[starts[i]:ends[i]].max()),
+        }
+        for i in _largest(sizes)
+    ]
+    return {
+        "count": len(starts),
+        "baselineHourlyTransactions": round(baseline, 4),
+        "episodes": episodes,
+    }
+
+
+def detect_dormancy(timeline: ActivityTimeline) -> Dict[str, Any]:
+    """
+    Gaps of at least DORMANCY_DAYS, and whether activity resumed in earnest after them.
+    """
+    ts = timeline.timestamps
+    gaps = np.diff(ts)
+    dormant = np.flatnonzero(gaps >= DORMANCY_DAYS * SECONDS_PER_DAY)
+    resumed_at = dormant + 1
+
+    burst_ends = np.searchsorted(ts, ts[resumed_at] + REACTIVATION_DAYS * SECONDS_PER_DAY, side="right")
+    after = burst_ends - resumed_at
+    cumulative = np.concatenate(([0.0], np.cumsum(timeline.values)))
+    reactivated = after >= REACTIVATION_MIN_TRANSACTIONS
+
+    periods = [
+        {
+            "dormantFrom": format_time_bound(int(ts[dormant[i]])),
+            "dormantUntil": format_time_bound(int(ts[resumed_at[i]])),
+            "gapDays": round(float(gaps[dormant[i]]) / SECONDS_PER_DAY, 1),
+            "transactionsAfter": int(after[i]),
+            "valueAfter": round(float(cumulative[burst_ends[i]] - cumulative[resumed_at[i]]), FLOW_DECIMALS),
+            "reactivated": bool(reactivated[i]),
+        }
+        for i in _largest(gaps[dormant])
+    ]
+    return {
+        "count": len(dormant),
+        "reactivations": int(np.count_nonzero(reactivated)),
+        "longestGapDays": round(float(gaps.max()) / SECONDS_PER_DAY, 1) if len(gaps) else 0.0,
+        "periods": periods,
+    }
+
+
+def _distinct_per_bucket(buckets: np.ndarray, peer_codes: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (bucket, distinct peers) for every non-empty bucket, via one sort of combined keys.
+    """
+    keys = np.sort(buckets * width + peer_codes)
+    first = np.concatenate(([True], keys[1:] != keys[:-1]))
+    bucket_of_pair = keys[first] // width
+    boundaries = np.concatenate(([True], bucket_of_pair[1:] != bucket_of_pair[:-1]))
+    counts = np.diff(np.concatenate((np.flatnonzero(boundaries), [len(bucket_of_pair)])))
+    return bucket_of_pair[boundaries], counts
+
+
+def detect_fan_out(timeline: ActivityTimeline) -> Dict[str, Any]:
+    """
+    Episodes where the wallet sent to many distinct counterparties within FAN_OUT_WINDOW.
+
+    Distinct counts are taken over fixed windows at two offsets half a window
+    apart, so any burst of fan-out at least a window long is caught by one of
+    them; qualifying windows are then merged and measured exactly.
+    """
+    sent = timeline.outgoing & (timeline.peers != MISSING)
+    ts, peers, values = timeline.timestamps[sent], timeline.peers[sent], timeline.values[sent]
+    if not len(ts):
+        return {"count": 0, "episodes": []}
+
+    _, peer_codes = np.unique(peers, return_inverse=True)
+    width = int(peer_codes.max()) + 1
+    intervals = []
+    for offset in (0, FAN_OUT_WINDOW // 2):
+        buckets, distinct = _distinct_per_bucket((ts - ts[0] + offset) // FAN_OUT_WINDOW, peer_codes, width)
+        window_starts = buckets[distinct >= FAN_OUT_MIN_COUNTERPARTIES] * FAN_OUT_WINDOW - offset + ts[0]
+        intervals.append(window_starts)
+    window_starts = np.sort(np.concatenate(intervals))
+    if not len(window_starts):
+        return {"count": 0, "episodes": []}
+
+    # Merge overlapping windows into episodes, then measure each on the outgoing slice
+    new_episode = np.concatenate(([True], window_starts[1:] > window_starts[:-1] + FAN_OUT_WINDOW))
+    episode_starts = window_starts[new_episode]
+    episode_ends = np.maximum.reduceat(window_starts, np.flatnonzero(new_episode)) + FAN_OUT_WINDOW
+    lo = np.searchsorted(ts, episode_starts, side="left")
+    hi = np.searchsorted(ts, episode_ends, side="left")
+
+    sizes = hi - lo
+    episodes = []
+    for i in _largest(sizes):
+        episodes.append({
+            "start": format_time_bound(int(ts[lo[i]])),
+            "end": format_time_bound(int(ts[hi[i] - 1])),
+            "counterparties": int(len(np.unique(peers[lo[i]:hi[i]]))),
+            "transactions": int(sizes[i]),
+            "valueOut": round(float(values[lo[i]:hi[i]].sum()), FLOW_DECIMALS),
+        })
+    return {"count": len(episode_starts), "episodes": episodes}
+
+
+def analyze_activity(timeline: ActivityTimeline) -> Dict[str, Any]:
+    """
+    Burst, dormancy and fan-out patterns over a wallet's merged timeline.
+    """
+    if not len(timeline):
+        return {"transactionsAnalyzed": 0, "flags": [], "bursts": None, "dormancy": None, "fanOut": None}
+
+    bursts = detect_bursts(timeline)
+    dormancy = detect_dormancy(timeline)
+    fan_out = detect_fan_out(timeline)
+
+    flags = []
+    if bursts["count"]:
+        flags.append("activity_burst")
+    if dormancy["reactivations"]:
+        flags.append("dormant_reactivation")
+    if fan_out["count"]:
+        flags.append("rapid_fan_out")
+
+    return {
+        "transactionsAnalyzed": len(timeline),
+        "firstActivity": format_time_bound(int(timeline.timestamps[0])),
+        "lastActivity": format_time_bound(int(timeline.timestamps[-1])),
+        "flags": flags,
+        "bursts": bursts,
+        "dormancy": dormancy,
+        "fanOut": fan_out,
+    }
+
+
+def synthetic_timeline(num_transactions: int = 200_000, seed: int = 7) -> ActivityTimeline:
+    """
+    Two years of steady activity with a planted burst, a dormant stretch and a fan-out.
+    """
+    rng = np.random.default_rng(seed)
+    start = 1_600_000_000
+    timestamps = np.sort(rng.integers(start, start + 730 * SECONDS_PER_DAY, num_transactions))
+    # Dormant for 120 days in the middle
+    gap_from, gap_to = start + 300 * SECONDS_PER_DAY, start + 420 * SECONDS_PER_DAY
+    timestamps = timestamps[(timestamps < gap_from) | (timestamps >= gap_to)]
+    burst = start + 500 * SECONDS_PER_DAY + rng.integers(0, 1800, 2_000)
+    fan_out = start + 600 * SECONDS_PER_DAY + rng.integers(0, 1800, 50)
+    timestamps = np.concatenate([timestamps, burst, fan_out])
+
+    n = len(timestamps)
+    peers = rng.integers(0, 50, n)
+    peers[-50:] = np.arange(1_000, 1_050)
+    outgoing = rng.random(n) < 0.5
+    outgoing[-50:] = True
+    return ActivityTimeline(timestamps.astype(np.int64), rng.random(n), peers, outgoing)
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    timeline = synthetic_timeline()
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        result = analyze_activity(timeline)
+        timings.append(time.perf_counter() - started)
+    print(json.dumps({
+        "transactions": len(timeline),
+        "analyze_ms": round(min(timings) * 1000, 3),
+        "flags": result["flags"],
+        "bursts": result["bursts"]["count"],
+        "dormant_periods": result["dormancy"]["count"],
+        "fan_out": result["fanOut"]["episodes"][:1],
+    }, indent=4))
@@ -1,9 +1,48 @@
 import asyncio
 import os
 import json
-from collections import Counter
-from api.tools.etherscanv2 import get_transaction_data, SUPPORTED_CHAINS
+import time
+import logging
+import httpx
+import numpy as np
+from api.tools.etherscanv2 import (
+    SUPPORTED_CHAINS,
+    fetch_block_by_time,
+    fetch_transaction_count,
+    get_transaction_data,
+    iter_transaction_pages,
+)
 from api.tools.address_checker import load_flagged_data
+from api.tools.exposure_index import lookup_exposure, lookup_hops, summarize_exposure
+from api.tools.centrality import lookup_centrality, rank_by_centrality
+from api.tools.method_signatures import merge_method_totals, summarize_method_totals
+from api.tools.similarity_index import update_wallet_signature
+from api.tools.time_windows import ROLLING_WINDOWS, SECONDS_PER_DAY, find_time_slice, format_time_bound, slice_chain_results
+from api.turnqey.metrics_engine import (
+    TransactionColumns,
+    aggregate_flows,
+    aggregate_methods,
+    compute_financial_metrics,
+    flag_counterparties,
+    rolling_window_metrics,
+)
+from api.turnqey.activity_patterns import ActivityTimeline, analyze_activity
+from api.turnqey.metrics_sketch import APPROXIMATE_THRESHOLD, METRICS_MODES, WalletSketch
+from api.turnqey.metrics_state import (
+    load_wallet_aggregates,
+    merge_chain_page,
+    refresh_wallet_aggregates,
+)
+from api.turnqey.risk_scoring import score_counterparties, timeline_stats
+
+# Logging configuration
+logger = logging.getLogger(__name__)
+
+# Batch metrics: wallets analyzed at once; Etherscan pacing is still the shared rate limit
+DEFAULT_BATCH_CONCURRENCY = 8
+
+# Nonce lookups spent sizing up a wallet on its first request, whatever the number of chains
+MAX_ESTIMATE_PROBES = 3
 
 # Path to flagged.json
 FLAGGED_JSON_PATH = os.path.join(os.path.dirname(__file__), "unique", "flagged.json")
@@ -54,11 +93,11 @@ def categorize_chains_by_layer(chains):
 
     return list(l1_chains), list(l2_chains)
 
-async def fetch_transactions(wallet_address, chains):
+async def fetch_transactions(wallet_address, chains, client=None, startblocks=None, endblocks=None):
     """
-    Fetch transactions for a wallet across the specified chains.
+    Fetch transactions for a wallet across the specified chains, optionally within per-chain block bounds.
     """
-    return await get_transaction_data(wallet_address, chains)
+    return await get_transaction_data(wallet_address, chains, startblocks=startblocks, endblocks=endblocks, client=client)
 
 def load_and_validate_flagged_data():
     """
@@ -84,80 +123,318 @@ def load_and_validate_flagged_data():
     
     return unique_addresses
 
-def calculate_fraud_risk_summary(interacting_wallets, flagged_addresses):
+def calculate_exposure_summary(wallet_address, counterparties):
+    """
+    Report 1- and 2-hop exposure to flagged addresses using the precomputed exposure index.
+    """
+    counterparties_by_hop = summarize_exposure(counterparties, max_hops=2)
+    if counterparties_by_hop is None:
+        return {"available": False}
+
+    wallet_exposure = lookup_exposure(wallet_address) or {}
+    return {
+        "available": True,
+        "walletHops": wallet_exposure.get("hops"),
+        "nearestFlaggedSource": wallet_exposure.get("nearest_flagged_source"),
+        "counterpartiesByHop": counterparties_by_hop,
+    }
+
+def calculate_network_importance(wallet_address, counterparties, top_n=5):
+    """
+    Rank the wallet and its counterparties by precomputed graph centrality.
+    """
+    top_counterparties = rank_by_centrality(counterparties, top_n)
+    if top_counterparties is None:
+        return {"available": False}
+
+    return {
+        "available": True,
+        "wallet": lookup_centrality(wallet_address),
+        "topCounterparties": top_counterparties,
+    }
+
+def calculate_risk_scoring(counterparties, counts, flagged, values, first_seen, errors, now, risk_model=None):
+    """
+    Score every counterparty on flagged membership, hop distance, value share, age and error rate.
+    """
+    hops = lookup_hops(counterparties) if len(counterparties) else None
+    return score_counterparties(counterparties, counts, flagged, hops, values, first_seen, errors, now, risk_model)
+
+async def calculate_window_metrics(wallet_address, chains, flagged_addresses, client=None, start=None, end=None, risk_model=None):
+    """
+    Metrics restricted to [start, end] plus trailing 7d/30d/90d windows ending at `end` (or now).
+
+    Only the blocks spanning the requested range and the widest rolling
+    window are fetched, so the cost follows the window rather than the
+    wallet's history; an open `start` still reaches back to the first block.
+    Each chain's transactions are sorted by timestamp, so both ranges are then
+    cut out by binary search and only the slices are aggregated.
+    """
+    l1_chains, l2_chains = categorize_chains_by_layer(chains)
+    anchor = end if end is not None else int(time.time())
+    widest = max(ROLLING_WINDOWS.values()) * SECONDS_PER_DAY
+    fetch_start = None if start is None else min(start, anchor - widest)
+    startblocks, endblocks = await window_blocks(chains, fetch_start, end, client)
+    transaction_results = await fetch_transactions(wallet_address, chains, client, startblocks, endblocks)
+
+    columns = TransactionColumns.from_chain_results(slice_chain_results(transaction_results, start, end))
+    financial_metrics = compute_financial_metrics(columns, flagged_addresses, l1_chains, l2_chains)
+    flows = aggregate_flows(columns, wallet_address)
+    financial_metrics["flows"] = flows.summary()
+    financial_metrics["methods"] = summarize_method_totals(merge_method_totals(aggregate_methods(columns).values()))
+    timeline = ActivityTimeline.from_columns(columns, wallet_address)
+    financial_metrics["activityPatterns"] = analyze_activity(timeline)
+    counterparties = columns.counterparty_list()
+    first_seen, errors = timeline_stats(timeline, np.arange(len(counterparties)))
+    financial_metrics["riskScoring"] = calculate_risk_scoring(
+        counterparties,
+        columns.counterparty_counts(),
+        columns.flagged_mask(flagged_addresses),
+        # Flow address ids start with the recipients, in counterparty order
+        flows.value_by_address()[:len(counterparties)],
+        first_seen,
+        errors,
+        end if end is not None else int(time.time()),
+        risk_model,
+    )
+    financial_metrics["exposure"] = calculate_exposure_summary(wallet_address, counterparties)
+    financial_metrics["networkImportance"] = calculate_network_importance(wallet_address, counterparties)
+    financial_metrics["window"] = {"from": format_time_bound(start), "to": format_time_bound(end)}
+
+    rolling_columns = TransactionColumns.from_chain_results(
+        slice_chain_results(transaction_results, anchor - widest, anchor), prefetch=()
+    )
+    financial_metrics["rollingWindows"] = rolling_window_metrics(
+        rolling_columns, anchor, ROLLING_WINDOWS, flagged_addresses, l1_chains, l2_chains
+    )
+
+    return {
+        "wallet_address": wallet_address,
+        "financialMetrics": financial_metrics,
+    }
+
+async def window_blocks(chains, start=None, end=None, client=None):
     """
-    Summarize fraud risk by counting Low, Moderate, High-risk wallets and cross-reference flagged addresses.
+    Per-chain start and end blocks covering [start, end], so streaming skips
+    the history before `start`. A failed lookup leaves that bound open; pages
+    are still cut to the range by timestamp.
     """
-    risk_summary = {"Low": 0, "Moderate": 0, "High": 0, "Flagged": 0}
-    for wallet, count in interacting_wallets.items():
-        if wallet in flagged_addresses:
-            risk_summary["Flagged"] += 1
-        elif count > 100:
-            risk_summary["Low"] += 1
-        elif count > 20:
-            risk_summary["Moderate"] += 1
-        else:
-            risk_summary["High"] += 1
-    return risk_summary
+    startblocks, endblocks = {}, {}
+    for chain_name in chains:
+        try:
+            if start is not None:
+                startblocks[chain_name] = await fetch_block_by_time(chain_name, start, "after", client)
+            if end is not None:
+                endblocks[chain_name] = await fetch_block_by_time(chain_name, end, "before", client)
+        except Exception as e:
+            logger.warning(f"Could not map the time window to blocks on {chain_name}: {e}")
+    return startblocks, endblocks
 
-async def calculate_metrics(wallet_address, chains=None):
+async def calculate_approximate_metrics(wallet_address, chains, flagged_addresses, client=None, start=None, end=None):
+    """
+    Metrics for very large wallets from sketches built while streaming transaction pages.
+
+    Memory stays bounded by one page plus the fixed-size sketches, whatever the
+    wallet's history length. Lifetime requests start the sketches from the
+    wallet's stored metrics state, stream only the blocks after it and merge
+    every page back into the state. Time-scoped requests stream from the block
+    at `start` to the block at `end`. Exposure and network importance are
+    computed over the tracked heavy-hitter counterparties. Chains whose stream
+    failed part-way are listed in streamingErrors and `complete` is False.
+    """
+    l1_chains, l2_chains = categorize_chains_by_layer(chains)
+    sketch = WalletSketch(wallet_address, flagged_addresses)
+    aggregates = None
+    if start is not None or end is not None:
+        startblocks, endblocks = await window_blocks(chains, start, end, client)
+    else:
+        aggregates = load_wallet_aggregates(wallet_address)
+        sketch.add_aggregates(aggregates, chains)
+        startblocks, endblocks = aggregates.startblocks(chains), {}
+
+    errors = []
+    for chain_name in chains:
+        pages = iter_transaction_pages(
+            chain_name, wallet_address, startblocks.get(chain_name, 0), endblocks.get(chain_name, 99999999), client=client
+        )
+        held = []
+        try:
+            async for page in pages:
+                lo, hi = find_time_slice(page, start, end)
+                if hi > lo:
+                    sketch.update(chain_name, page[lo:hi])
+                if aggregates is not None:
+                    held = merge_chain_page(aggregates, chain_name, held + page)
+                if hi < len(page):
+                    # Pages are in ascending time order, so nothing later can be in range
+                    break
+            if aggregates is not None:
+                merge_chain_page(aggregates, chain_name, held, final=True)
+        except Exception as e:
+            logger.error(f"Error streaming {chain_name} transactions for {wallet_address}: {e}")
+            errors.append({"chain": chain_name, "error": str(e)})
+        finally:
+            await pages.aclose()
+
+    financial_metrics = sketch.summary(l1_chains, l2_chains)
+    counterparties = list(sketch.heavy_hitters.counts)
+    financial_metrics["exposure"] = calculate_exposure_summary(wallet_address, counterparties)
+    financial_metrics["networkImportance"] = calculate_network_importance(wallet_address, counterparties)
+    if start is not None or end is not None:
+        financial_metrics["window"] = {"from": format_time_bound(start), "to": format_time_bound(end)}
+    financial_metrics["complete"] = not errors
+    financial_metrics["streamingErrors"] = errors
+
+    return {
+        "wallet_address": wallet_address,
+        "financialMetrics": financial_metrics,
+    }
+
+async def estimate_transaction_count(wallet_address, chains, client=None):
+    """
+    A cheap lower estimate of the wallet's transaction count, made before anything is fetched in full.
+
+    Chains in the metrics state count their stored transactions. On a
+    wallet's first request the first MAX_ESTIMATE_PROBES chains are probed
+    with one nonce lookup each, stopping once APPROXIMATE_THRESHOLD is reached.
+    """
+    aggregates = load_wallet_aggregates(wallet_address)
+    estimate = sum(aggregates.chains[c].tx_count for c in chains if c in aggregates.chains)
+    if aggregates.chains:
+        return estimate
+    for chain_name in chains[:MAX_ESTIMATE_PROBES]:
+        if estimate >= APPROXIMATE_THRESHOLD:
+            break
+        try:
+            estimate += await fetch_transaction_count(chain_name, wallet_address, client)
+        except Exception as e:
+            logger.warning(f"Could not estimate {wallet_address}'s transactions on {chain_name}: {e}")
+    return estimate
+
+async def select_metrics_mode(wallet_address, chains, mode="auto", rolling=False, client=None):
+    """
+    Resolve "auto" to "approximate" for wallets estimated to hold at least APPROXIMATE_THRESHOLD transactions.
+    """
+    if mode not in METRICS_MODES:
+        raise ValueError(f"Invalid mode: {mode}. Use one of {', '.join(METRICS_MODES)}.")
+    if mode == "approximate" and rolling:
+        raise ValueError("Rolling windows are only available in exact mode.")
+    if mode == "auto":
+        large = not rolling and await estimate_transaction_count(wallet_address, chains, client) >= APPROXIMATE_THRESHOLD
+        return "approximate" if large else "exact"
+    return mode
+
+async def calculate_metrics(
+    wallet_address,
+    chains=None,
+    flagged_addresses=None,
+    client=None,
+    start=None,
+    end=None,
+    rolling=False,
+    mode="auto",
+    risk_model=None,
+):
     """
     Fetch transaction data and calculate metrics for a wallet with L1/L2 breakdowns and fraud risk analysis.
+    Batch callers pass a shared flagged address snapshot and httpx client. Passing a
+    start/end (Unix seconds) or `rolling` switches to time-scoped metrics, and
+    `mode` picks exact counters, streaming sketches ("approximate") or either by wallet size ("auto").
+    `risk_model` names the counterparty scoring model registered in risk_scoring.
     """
     if not wallet_address:
         raise ValueError("Wallet address is required.")
+    chains = list(chains or SUPPORTED_CHAINS.keys())
+    mode = await select_metrics_mode(wallet_address, chains, mode, rolling, client)
 
-    chains = chains or SUPPORTED_CHAINS.keys()
     l1_chains, l2_chains = categorize_chains_by_layer(chains)
 
     # Load flagged addresses for fraud risk analysis
-    flagged_addresses = load_and_validate_flagged_data()
+    if flagged_addresses is None:
+        flagged_addresses = load_and_validate_flagged_data()
 
-    transaction_results = await fetch_transactions(wallet_address, chains)
-    interacting_wallets = Counter()
-    transactions_by_chain = {}
-    transactions_by_layer = {"Layer1": 0, "Layer2": 0}
-    total_transactions = 0
+    if mode == "approximate":
+        metrics = await calculate_approximate_metrics(wallet_address, chains, flagged_addresses, client, start, end)
+        metrics["financialMetrics"]["mode"] = mode
+        return metrics
 
-    for chain_data in transaction_results:
-        chain_name = chain_data.get("chain", "Unknown")
-        transactions = chain_data.get("transactions", [])
-        transaction_count = len(transactions)
+    if start is not None or end is not None or rolling:
+        metrics = await calculate_window_metrics(wallet_address, chains, flagged_addresses, client, start, end, risk_model)
+        metrics["financialMetrics"]["mode"] = mode
+        return metrics
 
-        transactions_by_chain[chain_name] = transaction_count
-        total_transactions += transaction_count
+    # Stored per-chain aggregates, updated from transactions newer than the last processed block
+    aggregates = await refresh_wallet_aggregates(wallet_address, chains, client=client)
+    financial_metrics = aggregates.financial_summary(chains, flagged_addresses, l1_chains, l2_chains)
+    financial_metrics["flows"] = aggregates.flow_summary(chains)
+    financial_metrics["methods"] = aggregates.method_summary(chains)
+    financial_metrics["activityPatterns"] = aggregates.activity_patterns(chains)
 
-        # Categorize transactions by Layer 1 or Layer 2
-        if chain_name in l1_chains:
-            transactions_by_layer["Layer1"] += transaction_count
-        elif chain_name in l2_chains:
-            transactions_by_layer["Layer2"] += transaction_count
+    # Risk scoring, similarity, exposure and centrality look at every counterparty
+    counterparties, counts, moved, first_seen, errors = aggregates.counterparty_totals(chains)
+    financial_metrics["riskScoring"] = calculate_risk_scoring(
+        counterparties,
+        counts,
+        flag_counterparties(counterparties, flagged_addresses),
+        moved,
+        first_seen,
+        errors,
+        int(time.time()),
+        risk_model,
+    )
 
-        for tx in transactions:
-            to_address = tx.get("to")
-            if to_address:
-                interacting_wallets[to_address.lower()] += 1
+    # Keep the counterparty similarity index current for every analyzed wallet
+    try:
+        update_wallet_signature(wallet_address, counterparties)
+    except Exception as e:
+        logger.error(f"Failed to update similarity index for {wallet_address}: {e}")
 
-    fraud_risk_summary = calculate_fraud_risk_summary(interacting_wallets, flagged_addresses)
-    inter_txn_total = sum(interacting_wallets.values())
-    most_active_wallet = interacting_wallets.most_common(1)[0] if interacting_wallets else ("None", 0)
+    financial_metrics["exposure"] = calculate_exposure_summary(wallet_address, counterparties)
+    financial_metrics["networkImportance"] = calculate_network_importance(wallet_address, counterparties)
+    financial_metrics["mode"] = mode
 
     return {
         "wallet_address": wallet_address,
-        "financialMetrics": {
-            "totalTransactions": total_transactions,
-            "transactionsByChain": transactions_by_chain,
-            "transactionsByLayer": transactions_by_layer,
-            "interactingWallets": len(interacting_wallets),
-            "interactingWalletTransactions": inter_txn_total,
-            "mostActiveWallet": {
-                "address": most_active_wallet[0],
-                "transactionCount": most_active_wallet[1],
-            },
-            "fraudRiskSummary": fraud_risk_summary,
-        },
+        "financialMetrics": financial_metrics,
     }
 
+async def calculate_batch_metrics(wallet_addresses, chains=None, concurrency=DEFAULT_BATCH_CONCURRENCY, mode="auto"):
+    """
+    Calculate metrics for many wallets, yielding each wallet's result as soon as it completes.
+
+    All wallets share one flagged address snapshot and one HTTP connection pool;
+    at most `concurrency` wallets are in flight and every Etherscan request is
+    paced by the process-wide rate limiter.
+    """
+    flagged_addresses = load_and_validate_flagged_data()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_connections=concurrency)) as client:
+
+        async def run_one(wallet_address):
+            async with semaphore:
+                try:
+                    metrics = await calculate_metrics(wallet_address, chains, flagged_addresses, client, mode=mode)
+                    return {"event": "result", "wallet_address": wallet_address, "metrics": metrics}
+                except Exception as e:
+                    logger.error(f"Batch metrics failed for {wallet_address}: {e}")
+                    return {"event": "error", "wallet_address": wallet_address, "error": str(e)}
+
+        tasks = [asyncio.ensure_future(run_one(wallet_address)) for wallet_address in wallet_addresses]
+        completed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                completed += 1
+                result = await next_done
+                result["completed"] = completed
+                result["total"] = len(tasks)
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    yield {"event": "done", "total": len(tasks)}
+
 def generate_metrics(wallet_address, chains=None):
     """
     Wrapper function to calculate metrics synchronously for integration with full_report.py.
@@ -0,0 +1,658 @@
+import logging
+from typing import Any, Collection, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from api.tools.method_signatures import MethodSignature, MethodTable
+from api.tools.time_windows import SECONDS_PER_DAY, format_time_bound
+
+# Logging configuration
+logger = logging.getLogger(__name__)
+
+ADDRESS_LENGTH = 42
+ADDRESS_DTYPE = f"S{ADDRESS_LENGTH}"
+MISSING = -1
+
+# Risk buckets by number of transactions with a counterparty; flagged counterparties are counted apart
+LOW_RISK_MIN_TRANSACTIONS = 100
+MODERATE_RISK_MIN_TRANSACTIONS = 20
+RISK_BUCKETS = ("Low", "Moderate", "High")
+
+# Flow aggregation output
+DEFAULT_TOP_COUNTERPARTIES = 10
+FLOW_DECIMALS = 9
+
+_FOLD_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Read in the same walk over the transactions as the recipients, for the flow aggregates
+PREFETCHED_FIELDS = ("from", "value_ether", "gasUsed", "gasPrice")
+
+
+def _intern_with_dict(addresses: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Slow path for columns with missing or malformed addresses.
+    """
+    lookup: Dict[str, int] = {}
+    codes = np.fromiter(
+        (lookup.setdefault(a.lower(), len(lookup)) if a else MISSING for a in addresses),
+        dtype=np.int64,
+        count=len(addresses),
+    )
+    return np.array(list(lookup), dtype=object), codes
+
+
+def address_column(addresses: Sequence[Optional[str]]) -> Optional[np.ndarray]:
+    """
+    The lower-cased addresses as one fixed-width byte array, built without a
+    per-address Python loop, or None if any address is missing or malformed.
+    """
+    n = len(addresses)
+    if not all(addresses):
+        return None
+    try:
+        raw = "".join(addresses).encode("ascii").lower()
+    except UnicodeEncodeError:
+        return None
+    if len(raw) != n * ADDRESS_LENGTH:
+        return None
+    if not (np.frombuffer(raw, dtype=np.uint8)[1::ADDRESS_LENGTH] == ord("x")).all():
+        return None
+    return np.frombuffer(raw, dtype=ADDRESS_DTYPE)
+
+
+def _intern_column(column: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    intern_addresses over an address_column: the addresses are folded into
+    64-bit keys and grouped by sorting, then neighbours within each group are
+    compared byte for byte. Returns None if two addresses ever share a key.
+    """
+    n = len(column)
+    rows = np.ascontiguousarray(column).view(np.uint8).reshape(n, ADDRESS_LENGTH)
+    words = np.ascontiguousarray(rows[:, 2:]).view("<u8")
+    keys = words[:, 0].copy()
+    with np.errstate(over="ignore"):
+        for i in range(1, words.shape[1]):
+            keys *= _FOLD_MULTIPLIER
+            keys ^= words[:, i]
+
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    boundaries = np.empty(n, dtype=bool)
+    boundaries[0] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=boundaries[1:])
+    starts = np.flatnonzero(boundaries)
+
+    # Relabel groups in order of first appearance
+    first_seen = np.minimum.reduceat(order, starts)
+    by_first_seen = np.argsort(first_seen)
+    relabel = np.empty(len(starts), dtype=np.int64)
+    relabel[by_first_seen] = np.arange(len(starts))
+    codes = np.empty(n, dtype=np.int64)
+    codes[order] = relabel[np.cumsum(boundaries) - 1]
+
+    grouped = words[order]
+    differs = grouped[1:, 0] != grouped[:-1, 0]
+    for i in range(1, words.shape[1]):
+        differs |= grouped[1:, i] != grouped[:-1, i]
+    if (differs & ~boundaries[1:]).any():
+        logger.warning("Address key collision while interning; falling back to dict interning.")
+        return None
+    return column[first_seen[by_first_seen]], codes
+
+
+def intern_addresses(addresses: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map each address (case-insensitively) to an integer code.
+
+    Returns (uniques, codes) with uniques ordered by first appearance, like the
+    keys of a Counter, and MISSING codes for empty entries. Well-formed columns
+    take the vectorized _intern_column path; anything else, or a key
+    collision, falls back to a dict.
+    """
+    if len(addresses) == 0:
+        return np.zeros(0, dtype=ADDRESS_DTYPE), np.zeros(0, dtype=np.int64)
+    column = address_column(addresses)
+    interned = _intern_column(column) if column is not None else None
+    return interned if interned is not None else _intern_with_dict(addresses)
+
+
+class TransactionColumns:
+    """
+    Columnar view of the per-chain transaction lists returned by get_transaction_data.
+
+    Built once per metrics request; every aggregate is then computed over
+    integer code arrays instead of the transaction dicts.
+    """
+
+    def __init__(
+        self,
+        chains: List[str],
+        chain_codes: np.ndarray,
+        counterparties: np.ndarray,
+        counterparty_codes: np.ndarray,
+        chain_results: Optional[List[Dict[str, Any]]] = None,
+        raw_fields: Optional[Dict[str, list]] = None,
+    ):
+        self.chains = chains
+        self.chain_codes = chain_codes
+        self.counterparties = counterparties
+        self.counterparty_codes = counterparty_codes
+        self.chain_results = chain_results
+        self._raw_fields = raw_fields or {}
+        self._sender_column: Optional[Tuple[Optional[np.ndarray]]] = None
+        self._counterparty_list: Optional[List[str]] = None
+        self._fields: Dict[str, np.ndarray] = {}
+        self._flat: Optional[List[Dict[str, Any]]] = None
+        self._wallet_rows: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._methods: Optional[Tuple[MethodTable, np.ndarray]] = None
+
+    @classmethod
+    def from_chain_results(
+        cls,
+        chain_results: List[Dict[str, Any]],
+        prefetch: Sequence[str] = PREFETCHED_FIELDS,
+    ) -> "TransactionColumns":
+        """
+        Intern the recipients and read the `prefetch` fields in the same walk
+        over the chain results. One comprehension per field beats building a
+        tuple per transaction, so the walk is per chain rather than per row.
+        Callers that never aggregate flows pass prefetch=().
+        """
+        chains = []
+        chain_lengths = []
+        to_addresses: List[Optional[str]] = []
+        raw_fields: Dict[str, list] = {name: [] for name in prefetch}
+        for chain_data in chain_results:
+            transactions = chain_data.get("transactions", [])
+            chains.append(chain_data.get("chain", "Unknown"))
+            chain_lengths.append(len(transactions))
+            to_addresses.extend([tx.get("to") for tx in transactions])
+            for name, values in raw_fields.items():
+                values.extend([tx.get(name) for tx in transactions])
+
+        chain_codes = np.repeat(np.arange(len(chains), dtype=np.int32), chain_lengths)
+        counterparties, counterparty_codes = intern_addresses(to_addresses)
+        return cls(chains, chain_codes, counterparties, counterparty_codes, chain_results, raw_fields)
+
+    def __len__(self) -> int:
+        return len(self.chain_codes)
+
+    def counterparty(self, code: int) -> str:
+        value = self.counterparties[code]
+        return value.decode("ascii") if isinstance(value, bytes) else value
+
+    def counterparty_list(self) -> List[str]:
+        if self._counterparty_list is None:
+            self._counterparty_list = _decode_addresses(self.counterparties)
+        return self._counterparty_list
+
+    def transactions(self) -> List[Dict[str, Any]]:
+        """
+        The transaction dicts in column order.
+        """
+        if self._flat is None:
+            self._flat = [tx for chain_data in self.chain_results or [] for tx in chain_data.get("transactions", [])]
+        return self._flat
+
+    def raw_field(self, name: str, rows: Optional[np.ndarray] = None) -> list:
+        """
+        One transaction field as a list, from the prefetched lists when available.
+        """
+        raw = self._raw_fields.get(name)
+        if raw is None:
+            transactions = self.transactions()
+            if rows is None:
+                return [tx.get(name) for tx in transactions]
+            return [transactions[i].get(name) for i in rows.tolist()]
+        return raw if rows is None else [raw[i] for i in rows.tolist()]
+
+    def sender_column(self) -> Optional[np.ndarray]:
+        """
+        The senders as an address_column, built on first use; None if any sender is malformed.
+        """
+        if self._sender_column is None:
+            self._sender_column = (address_column(self.raw_field("from")),)
+        return self._sender_column[0]
+
+    def field(self, name: str, parse=float, dtype=np.float64, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        One numeric transaction field as an array, for every transaction or only `rows`.
+        Full columns are extracted on first use and cached.
+        """
+        if rows is not None and name in self._raw_fields:
+            # Parsing the whole prefetched list once is cheaper than gathering rows from it
+            return self.field(name, parse, dtype)[rows]
+        values = self._fields.get(name) if rows is None else None
+        if values is not None:
+            return values
+
+        raw = self.raw_field(name, rows)
+        try:
+            # NumPy parses numeric strings itself; missing floats come back as NaN
+            values = np.array(raw, dtype=dtype)
+            if values.dtype.kind == "f":
+                np.nan_to_num(values, copy=False)
+        except (TypeError, ValueError):
+            values = np.fromiter((parse(v or 0) for v in raw), dtype=dtype, count=len(raw))
+        if rows is None:
+            self._fields[name] = values
+        return values
+
+    def wallet_rows(self, wallet_address: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows received by the wallet (self-transfers included) and rows it sent to someone else.
+
+        Recipients are already interned, so only the remaining rows need their
+        sender compared, as fixed-width bytes when the sender column allows it.
+        """
+        wallet = wallet_address.lower()
+        cached = self._wallet_rows.get(wallet)
+        if cached is not None:
+            return cached
+
+        index = {address: i for i, address in enumerate(self.counterparty_list())}
+        receiving = self.counterparty_codes == index.get(wallet, MISSING - 1)
+        other_rows = np.flatnonzero(~receiving)
+        senders = self.sender_column()
+        if senders is not None:
+            sent = senders[other_rows] == wallet.encode("ascii", "replace")
+        else:
+            sent = np.fromiter(
+                ((sender or "").lower() == wallet for sender in self.raw_field("from", other_rows)),
+                dtype=bool,
+                count=len(other_rows),
+            )
+        cached = self._wallet_rows[wallet] = (np.flatnonzero(receiving), other_rows[sent])
+        return cached
+
+    def intern_senders(self, rows: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """
+        Codes of the senders of `rows` in one address space with the recipients.
+
+        Returns (addresses, codes) where addresses starts with counterparty_list()
+        and continues with senders that never receive. Interning the sender
+        bytes behind the (distinct) recipients keeps the recipient codes as they are.
+        """
+        senders = self.sender_column()
+        if senders is not None and self.counterparties.dtype != object:
+            interned = _intern_column(np.concatenate([self.counterparties, senders[rows]]))
+            if interned is not None:
+                uniques, codes = interned
+                known = len(self.counterparties)
+                return self.counterparty_list() + _decode_addresses(uniques[known:]), codes[known:]
+
+        index = {address: i for i, address in enumerate(self.counterparty_list())}
+        sender_uniques, sender_codes = intern_addresses(self.raw_field("from", rows))
+        sender_map = np.array([index.setdefault(a, len(index)) for a in _decode_addresses(sender_uniques)], dtype=np.int64)
+        codes = np.full(len(rows), MISSING, dtype=np.int64)
+        known = sender_codes != MISSING
+        codes[known] = sender_map[sender_codes[known]]
+        return list(index), codes
+
+    def method_codes(self) -> Tuple[MethodTable, np.ndarray]:
+        """
+        The interned method signatures and each transaction's signature code, computed once.
+        """
+        if self._methods is None:
+            table = MethodTable()
+            self._methods = (table, table.codes(self.transactions()))
+        return self._methods
+
+    def timestamps(self) -> np.ndarray:
+        return self.field("timeStamp", int, np.int64)
+
+    def counterparty_counts(self) -> np.ndarray:
+        codes = self.counterparty_codes
+        return np.bincount(codes[codes != MISSING], minlength=len(self.counterparties))
+
+    def chain_counts(self) -> np.ndarray:
+        return np.bincount(self.chain_codes, minlength=len(self.chains))
+
+    def flagged_mask(self, flagged_addresses: Collection[str]) -> np.ndarray:
+        return flag_counterparties(self.counterparty_list(), flagged_addresses)
+
+
+def flag_counterparties(counterparties: Sequence[str], flagged_addresses: Collection[str]) -> np.ndarray:
+    """
+    Boolean mask over counterparties that appear in the (lower-cased) flagged set.
+    """
+    if not flagged_addresses:
+        return np.zeros(len(counterparties), dtype=bool)
+    return np.fromiter((c in flagged_addresses for c in counterparties), dtype=bool, count=len(counterparties))
+
+
+def fraud_risk_buckets(counts: np.ndarray) -> np.ndarray:
+    """
+    Index into RISK_BUCKETS of each count, ignoring flagged status.
+    """
+    return np.where(counts > LOW_RISK_MIN_TRANSACTIONS, 0, np.where(counts > MODERATE_RISK_MIN_TRANSACTIONS, 1, 2))
+
+
+def bucket_fraud_risk(counts: np.ndarray, flagged: np.ndarray) -> Dict[str, int]:
+    """
+    fraudRiskSummary buckets over per-counterparty counts: Low above LOW_RISK_MIN_TRANSACTIONS,
+    Moderate above MODERATE_RISK_MIN_TRANSACTIONS, High otherwise, with flagged ones counted apart.
+    """
+    sizes = np.bincount(fraud_risk_buckets(counts[~flagged]), minlength=len(RISK_BUCKETS))
+    summary = dict(zip(RISK_BUCKETS, sizes.tolist()))
+    summary["Flagged"] = int(np.count_nonzero(flagged))
+    return summary
+
+
+def financial_counters(
+    chains: Sequence[str],
+    chain_counts: Sequence[int],
+    interacting_wallets: int,
+    interacting_transactions: int,
+    most_active_wallet: Tuple[str, int],
+    fraud_risk_summary: Dict[str, int],
+    l1_chains: Iterable[str],
+    l2_chains: Iterable[str],
+) -> Dict[str, Any]:
+    """
+    Lay out the financialMetrics counters from totals computed elsewhere.
+    """
+    l1_chains, l2_chains = set(l1_chains), set(l2_chains)
+
+    transactions_by_chain = {}
+    transactions_by_layer = {"Layer1": 0, "Layer2": 0}
+    for chain_name, count in zip(chains, chain_counts):
+        transactions_by_chain[chain_name] = count
+        if chain_name in l1_chains:
+            transactions_by_layer["Layer1"] += count
+        elif chain_name in l2_chains:
+            transactions_by_layer["Layer2"] += count
+
+    return {
+        "totalTransactions": int(sum(chain_counts)),
+        "transactionsByChain": transactions_by_chain,
+        "transactionsByLayer": transactions_by_layer,
+        "interactingWallets": interacting_wallets,
+        "interactingWalletTransactions": interacting_transactions,
+        "mostActiveWallet": {
+            "address": most_active_wallet[0],
+            "transactionCount": most_active_wallet[1],
+        },
+        "fraudRiskSummary": fraud_risk_summary,
+    }
+
+
+def summarize_financial_counts(
+    chains: Sequence[str],
+    chain_counts: Sequence[int],
+    counterparties: Sequence[str],
+    counts: np.ndarray,
+    flagged: np.ndarray,
+    l1_chains: Iterable[str],
+    l2_chains: Iterable[str],
+) -> Dict[str, Any]:
+    """
+    Build the financialMetrics counters from per-chain and per-counterparty totals.
+
+    `counterparties` must be in first-seen order so that argmax breaks ties the
+    way Counter.most_common did.
+    """
+    if len(counts):
+        top = int(np.argmax(counts))
+        most_active_wallet = (counterparties[top], int(counts[top]))
+    else:
+        most_active_wallet = ("None", 0)
+    return financial_counters(
+        chains,
+        chain_counts,
+        len(counts),
+        int(counts.sum()),
+        most_active_wallet,
+        bucket_fraud_risk(counts, flagged),
+        l1_chains,
+        l2_chains,
+    )
+
+
+def compute_financial_metrics(
+    columns: TransactionColumns,
+    flagged_addresses: Collection[str],
+    l1_chains: Iterable[str],
+    l2_chains: Iterable[str],
+) -> Dict[str, Any]:
+    """
+    Transaction, counterparty and fraud risk aggregates of calculate_metrics over prebuilt columns.
+    """
+    return summarize_financial_counts(
+        columns.chains,
+        columns.chain_counts().tolist(),
+        columns.counterparty_list(),
+        columns.counterparty_counts(),
+        columns.flagged_mask(flagged_addresses),
+        l1_chains,
+        l2_chains,
+    )
+
+
+def _decode_addresses(uniques: np.ndarray) -> List[str]:
+    if uniques.dtype == object:
+        return uniques.tolist()
+    return uniques.astype(f"U{ADDRESS_LENGTH}").tolist()
+
+
+class FlowAggregates:
+    """
+    Value and transaction totals per (chain, counterparty) group, plus gas spent per chain.
+
+    Direction is relative to the analyzed wallet: value it sent to a
+    counterparty is outflow, value it received is inflow. Gas is paid by the
+    sender, so only outgoing transactions count towards gas spend.
+    """
+
+    def __init__(self, chains, gas_by_chain, addresses, group_chains, group_addresses, value_in, value_out, tx_in, tx_out):
+        self.chains = chains
+        self.gas_by_chain = gas_by_chain
+        self.addresses = addresses
+        self.group_chains = group_chains
+        self.group_addresses = group_addresses
+        self.value_in = value_in
+        self.value_out = value_out
+        self.tx_in = tx_in
+        self.tx_out = tx_out
+
+    def rows(self):
+        """
+        (chain, counterparty, value_in, value_out, tx_in, tx_out) per group, for persisting.
+        """
+        return zip(
+            [self.chains[c] for c in self.group_chains.tolist()],
+            [self.addresses[a] for a in self.group_addresses.tolist()],
+            self.value_in.tolist(),
+            self.value_out.tolist(),
+            self.tx_in.tolist(),
+            self.tx_out.tolist(),
+        )
+
+    def value_by_address(self) -> np.ndarray:
+        """
+        Value moved in either direction per address id, summed over chains.
+        """
+        return np.bincount(self.group_addresses, weights=self.value_in + self.value_out, minlength=len(self.addresses))
+
+    def summary(self, top_n: int = DEFAULT_TOP_COUNTERPARTIES) -> Dict[str, Any]:
+        codes, inverse = np.unique(self.group_addresses, return_inverse=True)
+        collapse = lambda weights: np.bincount(inverse, weights=weights, minlength=len(codes))
+        return summarize_flows(
+            [self.addresses[c] for c in codes.tolist()],
+            collapse(self.value_in),
+            collapse(self.value_out),
+            collapse(self.tx_in).astype(np.int64),
+            collapse(self.tx_out).astype(np.int64),
+            dict(zip(self.chains, self.gas_by_chain.tolist())),
+            top_n,
+        )
+
+
+def aggregate_flows(columns: TransactionColumns, wallet_address: str) -> FlowAggregates:
+    """
+    Group-by over the transaction columns: in/out value and counts per (chain, counterparty).
+
+    Senders, values and gas fields come from the lists read with the columns,
+    and only the senders of incoming transfers are interned.
+    """
+    wallet = wallet_address.lower()
+    recipients = columns.counterparty_codes
+    incoming_rows, outgoing_rows = columns.wallet_rows(wallet)
+
+    # One address space for recipients and the senders of incoming transfers
+    addresses, senders = columns.intern_senders(incoming_rows)
+    try:
+        wallet_code = addresses.index(wallet)
+    except ValueError:
+        wallet_code = MISSING - 1
+    self_transfer = senders == wallet_code
+
+    # Gas is paid by the sender, including on transfers to itself
+    payer_rows = np.concatenate([outgoing_rows, incoming_rows[self_transfer]])
+    gas = columns.field("gasUsed", rows=payer_rows) * columns.field("gasPrice", rows=payer_rows)
+    gas_by_chain = np.bincount(columns.chain_codes[payer_rows], weights=gas, minlength=len(columns.chains))
+
+    inflow = ~self_transfer & (senders != MISSING)
+    outflow = recipients[outgoing_rows] != MISSING
+    rows = np.concatenate([incoming_rows[inflow], outgoing_rows[outflow]])
+    others = np.concatenate([senders[inflow], recipients[outgoing_rows][outflow]])
+    incoming = np.arange(len(rows)) < int(inflow.sum())
+    values = columns.field("value_ether", rows=rows)
+
+    width = max(len(addresses), 1)
+    keys, inverse = np.unique(columns.chain_codes[rows].astype(np.int64) * width + others, return_inverse=True)
+    tx_in = np.bincount(inverse[incoming], minlength=len(keys))
+
+    return FlowAggregates(
+        columns.chains,
+        gas_by_chain,
+        addresses,
+        keys // width,
+        keys % width,
+        np.bincount(inverse[incoming], weights=values[incoming], minlength=len(keys)),
+        np.bincount(inverse[~incoming], weights=values[~incoming], minlength=len(keys)),
+        tx_in,
+        np.bincount(inverse, minlength=len(keys)) - tx_in,
+    )
+
+
+def aggregate_methods(columns: TransactionColumns) -> Dict[str, Dict[MethodSignature, List[float]]]:
+    """
+    Calls and value per chain and method signature: chain -> signature -> [calls, value].
+
+    Grouped over the (chain, method code) integer keys, so signature strings
+    are only touched once per distinct method.
+    """
+    table, codes = columns.method_codes()
+    if not len(codes):
+        return {}
+    width = max(len(table), 1)
+    keys, inverse = np.unique(columns.chain_codes.astype(np.int64) * width + codes, return_inverse=True)
+    calls = np.bincount(inverse, minlength=len(keys))
+    values = np.bincount(inverse, weights=columns.field("value_ether"), minlength=len(keys))
+
+    totals: Dict[str, Dict[MethodSignature, List[float]]] = {}
+    for key, count, value in zip(keys.tolist(), calls.tolist(), values.tolist()):
+        totals.setdefault(columns.chains[key // width], {})[table.signatures[key % width]] = [count, value]
+    return totals
+
+
+def summarize_flows(
+    addresses: Sequence[str],
+    value_in: np.ndarray,
+    value_out: np.ndarray,
+    tx_in: np.ndarray,
+    tx_out: np.ndarray,
+    gas_by_chain: Dict[str, float],
+    top_n: int = DEFAULT_TOP_COUNTERPARTIES,
+) -> Dict[str, Any]:
+    """
+    Wallet-level flow totals and the top_n counterparties by value moved in either direction.
+    """
+    total_in, total_out = float(value_in.sum()), float(value_out.sum())
+    top = np.argsort(-(value_in + value_out), kind="stable")[:top_n]
+    return {
+        "totalValueIn": round(total_in, FLOW_DECIMALS),
+        "totalValueOut": round(total_out, FLOW_DECIMALS),
+        "netFlow": round(total_in - total_out, FLOW_DECIMALS),
+        "gasSpentByChain": {chain: round(gas, FLOW_DECIMALS) for chain, gas in gas_by_chain.items() if gas},
+        "totalGasSpent": round(sum(gas_by_chain.values()), FLOW_DECIMALS),
+        "counterparties": len(addresses),
+        "topCounterpartiesByValue": [
+            {
+                "address": addresses[i],
+                "valueIn": round(float(value_in[i]), FLOW_DECIMALS),
+                "valueOut": round(float(value_out[i]), FLOW_DECIMALS),
+                "netFlow": round(float(value_in[i] - value_out[i]), FLOW_DECIMALS),
+                "transactionsIn": int(tx_in[i]),
+                "transactionsOut": int(tx_out[i]),
+            }
+            for i in top.tolist()
+        ],
+    }
+
+
+def rolling_window_metrics(
+    columns: TransactionColumns,
+    anchor: int,
+    windows: Dict[str, int],
+    flagged_addresses: Collection[str],
+    l1_chains: Iterable[str],
+    l2_chains: Iterable[str],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    financialMetrics counters for several trailing windows ending at `anchor`, in one pass.
+
+    `windows` maps labels to lengths in days. Because the windows are nested,
+    every transaction gets the index of the narrowest window containing it;
+    one bincount over (counterparty, tier) then gives every window's counts by
+    a reverse cumulative sum, and first appearances (for most-active
+    tie-breaking) come from a reverse cumulative minimum in the same way.
+    Columns are expected to cover at least the widest window.
+    """
+    labels = sorted(windows, key=lambda label: windows[label], reverse=True)
+    starts = np.array([anchor - windows[label] * SECONDS_PER_DAY for label in labels], dtype=np.int64)
+    num_windows = len(labels)
+
+    timestamps = columns.timestamps()
+    tiers = np.searchsorted(starts, timestamps, side="right") - 1
+    keep = (tiers >= 0) & (timestamps <= anchor)
+    positions = np.flatnonzero(keep)
+    tiers = tiers[keep]
+
+    chain_totals = np.bincount(
+        columns.chain_codes[keep] * num_windows + tiers, minlength=len(columns.chains) * num_windows
+    ).reshape(len(columns.chains), num_windows)
+    chain_totals = np.cumsum(chain_totals[:, ::-1], axis=1)[:, ::-1]
+
+    codes = columns.counterparty_codes[keep]
+    present = codes != MISSING
+    codes, tiers_present, positions_present = codes[present], tiers[present], positions[present]
+    uniques, inverse = np.unique(codes, return_inverse=True)
+    cells = inverse * num_windows + tiers_present
+
+    counts = np.bincount(cells, minlength=len(uniques) * num_windows).reshape(len(uniques), num_windows)
+    counts = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    first_seen = np.full(len(uniques) * num_windows, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first_seen, cells, positions_present)
+    first_seen = np.minimum.accumulate(first_seen.reshape(len(uniques), num_windows)[:, ::-1], axis=1)[:, ::-1]
+
+    all_counterparties = columns.counterparty_list()
+    results = {}
+    for w, label in enumerate(labels):
+        active = np.flatnonzero(counts[:, w] > 0)
+        active = active[np.argsort(first_seen[active, w], kind="stable")]
+        counterparties = [all_counterparties[c] for c in uniques[active].tolist()]
+        active_chains = np.flatnonzero(chain_totals[:, w] > 0)
+        window_metrics = summarize_financial_counts(
+            [columns.chains[c] for c in active_chains],
+            chain_totals[active_chains, w].tolist(),
+            counterparties,
+            counts[active, w],
+            flag_counterparties(counterparties, flagged_addresses),
+            l1_chains,
+            l2_chains,
+        )
+        window_metrics["window"] = {"from": format_time_bound(int(starts[w])), "to": format_time_bound(anchor)}
+        results[label] = window_metrics
+    return results
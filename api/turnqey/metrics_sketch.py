@@ -0,0 +1,213 @@
+import logging
+from collections import Counter
+from typing import Any, Collection, Dict, Iterable, List, Optional
+
+from api.tools.method_signatures import MethodStats
+from api.tools.sketches import (
+    DEFAULT_HEAVY_HITTERS,
+    DEFAULT_HLL_PRECISION,
+    DEFAULT_RESERVOIR_SIZE,
+    CountMinSketch,
+    HyperLogLog,
+    Reservoir,
+    SpaceSaving,
+    hash_item,
+)
+from api.turnqey.metrics_engine import (
+    DEFAULT_TOP_COUNTERPARTIES,
+    FLOW_DECIMALS,
+    LOW_RISK_MIN_TRANSACTIONS,
+    MODERATE_RISK_MIN_TRANSACTIONS,
+)
+
+# Logging configuration
+logger = logging.getLogger(__name__)
+
+METRICS_MODES = ("exact", "approximate", "auto")
+
+# In auto mode, wallets estimated to hold at least this many transactions are summarized with sketches
+APPROXIMATE_THRESHOLD = 100_000
+
+SAMPLE_FIELDS = ("hash", "blockNumber", "timeStamp", "from", "to", "value_ether", "functionName")
+
+
+class WalletSketch:
+    """
+    Bounded-memory replacement for the per-counterparty Counter of calculate_metrics.
+
+    Transactions are folded in a page at a time and never kept: chain totals and
+    value flows are exact scalars, distinct counterparties come from a
+    HyperLogLog, the most active counterparties from Space-Saving (tightened by
+    a Count-Min sketch), and example transactions from a reservoir. Flagged
+    counterparties are counted exactly, since they are bounded by the flagged list.
+    """
+
+    def __init__(
+        self,
+        wallet_address: str,
+        flagged_addresses: Collection[str],
+        capacity: int = DEFAULT_HEAVY_HITTERS,
+        precision: int = DEFAULT_HLL_PRECISION,
+        sample_size: int = DEFAULT_RESERVOIR_SIZE,
+        seed: Optional[int] = None,
+    ):
+        self.wallet = wallet_address.lower()
+        self.flagged_addresses = flagged_addresses
+        self.chain_counts: Dict[str, int] = {}
+        self.gas_by_chain: Dict[str, float] = {}
+        self.value_in = 0.0
+        self.value_out = 0.0
+        self.interacting_transactions = 0
+        self.flagged_seen = set()
+        self.distinct = HyperLogLog(precision)
+        self.frequencies = CountMinSketch()
+        self.heavy_hitters = SpaceSaving(capacity)
+        self.samples = Reservoir(sample_size, seed)
+        # Exact: bounded by the number of distinct method signatures, not transactions
+        self.methods = MethodStats()
+
+    def update(self, chain_name: str, transactions: List[Dict[str, Any]]) -> None:
+        self.chain_counts[chain_name] = self.chain_counts.get(chain_name, 0) + len(transactions)
+
+        page_counts = Counter()
+        for tx in transactions:
+            sender = (tx.get("from") or "").lower()
+            recipient = (tx.get("to") or "").lower()
+            if recipient:
+                page_counts[recipient] += 1
+            if sender == self.wallet:
+                gas = float(tx.get("gasUsed") or 0) * float(tx.get("gasPrice") or 0)
+                self.gas_by_chain[chain_name] = self.gas_by_chain.get(chain_name, 0.0) + gas
+            if (sender == self.wallet) != (recipient == self.wallet):
+                if recipient == self.wallet:
+                    self.value_in += float(tx.get("value_ether") or 0)
+                else:
+                    self.value_out += float(tx.get("value_ether") or 0)
+            self.methods.add(tx.get("functionName") or "", float(tx.get("value_ether") or 0))
+            self.samples.add((chain_name, tx))
+
+        self.add_counterparties(page_counts)
+
+    def add_counterparties(self, counts: Dict[str, int]) -> None:
+        """
+        Fold lower-cased counterparty -> transaction count pairs into the sketches, one update per counterparty.
+        """
+        hashes = [hash_item(address) for address in counts]
+        for (address, count), h in zip(counts.items(), hashes):
+            self.distinct.add_hash(h[0])
+            self.heavy_hitters.add(address, count)
+            if address in self.flagged_addresses:
+                self.flagged_seen.add(address)
+        self.frequencies.add_hashes(hashes, counts.values())
+        self.interacting_transactions += sum(counts.values())
+
+    def add_aggregates(self, aggregates, chains: Iterable[str]) -> None:
+        """
+        Start from a wallet's stored metrics state (metrics_state.WalletAggregates)
+        so only transactions after it need to be streamed.
+
+        Totals are exact; counterparties enter the sketches with their stored
+        counts, streamed from the state in batches so memory stays bounded.
+        Sample transactions only come from the streamed pages.
+        """
+        chains = aggregates.active_chains(chains)
+        for chain_name in chains:
+            aggregate = aggregates.chains[chain_name]
+            self.chain_counts[chain_name] = self.chain_counts.get(chain_name, 0) + aggregate.tx_count
+            self.gas_by_chain[chain_name] = self.gas_by_chain.get(chain_name, 0.0) + aggregate.gas_spent
+        flows = aggregates.flow_summary(chains, top_n=0)
+        self.value_in += flows["totalValueIn"]
+        self.value_out += flows["totalValueOut"]
+        for counts in aggregates.iter_counterparty_counts(chains):
+            self.add_counterparties(counts)
+        for signature, (calls, value) in aggregates.method_totals(chains).items():
+            self.methods.add_signature(signature, value, calls)
+
+    def top_counterparties(self, top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Most active counterparties with an upper estimate and a guaranteed lower bound on their count.
+        """
+        ranked = []
+        for address, upper, lower in self.heavy_hitters.top():
+            # Both sketches only overcount, so the smaller estimate is the tighter one
+            estimate = min(upper, self.frequencies.estimate(address))
+            ranked.append({"address": address, "transactionCount": estimate, "minTransactionCount": lower})
+        ranked.sort(key=lambda entry: entry["transactionCount"], reverse=True)
+        return ranked[:top_n]
+
+    def fraud_risk_summary(self, interacting_wallets: int) -> Dict[str, int]:
+        """
+        Approximate fraudRiskSummary buckets, using the thresholds of bucket_fraud_risk.
+
+        Only tracked heavy hitters can reach the Low/Moderate thresholds, so the
+        remaining distinct counterparties are counted as High.
+        """
+        low = moderate = 0
+        for entry in self.top_counterparties():
+            if entry["address"] in self.flagged_seen:
+                continue
+            if entry["transactionCount"] > LOW_RISK_MIN_TRANSACTIONS:
+                low += 1
+            elif entry["transactionCount"] > MODERATE_RISK_MIN_TRANSACTIONS:
+                moderate += 1
+        flagged = len(self.flagged_seen)
+        return {
+            "Low": low,
+            "Moderate": moderate,
+            "High": max(interacting_wallets - low - moderate - flagged, 0),
+            "Flagged": flagged,
+        }
+
+    def summary(
+        self,
+        l1_chains: Iterable[str],
+        l2_chains: Iterable[str],
+        top_n: int = DEFAULT_TOP_COUNTERPARTIES,
+    ) -> Dict[str, Any]:
+        """
+        financialMetrics in the shape of the exact path, with estimates and their error bounds.
+        """
+        l1_chains, l2_chains = set(l1_chains), set(l2_chains)
+        transactions_by_layer = {"Layer1": 0, "Layer2": 0}
+        for chain_name, count in self.chain_counts.items():
+            if chain_name in l1_chains:
+                transactions_by_layer["Layer1"] += count
+            elif chain_name in l2_chains:
+                transactions_by_layer["Layer2"] += count
+
+        # The HyperLogLog can undershoot counterparties we know exist
+        top = self.top_counterparties(top_n)
+        interacting_wallets = max(self.distinct.estimate(), len(self.heavy_hitters.counts)) if self.interacting_transactions else 0
+        most_active = top[0] if top else {"address": "None", "transactionCount": 0}
+
+        return {
+            "totalTransactions": sum(self.chain_counts.values()),
+            "transactionsByChain": dict(self.chain_counts),
+            "transactionsByLayer": transactions_by_layer,
+            "interactingWallets": interacting_wallets,
+            "interactingWalletTransactions": self.interacting_transactions,
+            "mostActiveWallet": {
+                "address": most_active["address"],
+                "transactionCount": most_active["transactionCount"],
+            },
+            "fraudRiskSummary": self.fraud_risk_summary(interacting_wallets),
+            "topCounterparties": top,
+            "flows": {
+                "totalValueIn": round(self.value_in, FLOW_DECIMALS),
+                "totalValueOut": round(self.value_out, FLOW_DECIMALS),
+                "netFlow": round(self.value_in - self.value_out, FLOW_DECIMALS),
+                "gasSpentByChain": {c: round(g, FLOW_DECIMALS) for c, g in self.gas_by_chain.items() if g},
+                "totalGasSpent": round(sum(self.gas_by_chain.values()), FLOW_DECIMALS),
+            },
+            "methods": self.methods.summary(),
+            "sampleTransactions": [
+                {"chain": chain_name, **{field: tx.get(field) for field in SAMPLE_FIELDS}}
+                for chain_name, tx in self.samples.items
+            ],
+            "accuracy": {
+                "interactingWalletsRelativeError": round(self.distinct.relative_error, 4),
+                "transactionCountMaxOvercount": int(self.frequencies.epsilon * self.frequencies.total),
+                "transactionCountConfidence": round(1 - self.frequencies.delta, 4),
+                "trackedCounterparties": self.heavy_hitters.capacity,
+            },
+        }
@@ -0,0 +1,781 @@
+import json
+import time
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from api.tools.etherscanv2 import (
+    PAGE_SIZE,
+    SUPPORTED_CHAINS,
+    is_valid_ethereum_address,
+    iter_transaction_pages,
+)
+from api.tools.method_signatures import DEFAULT_TOP_METHODS, MethodSignature, summarize_method_totals
+from api.tools.sqlite_store import cache_path, chunked, connect
+from api.turnqey.activity_patterns import ActivityTimeline, analyze_activity
+from api.turnqey.metrics_engine import (
+    DEFAULT_TOP_COUNTERPARTIES,
+    FLOW_DECIMALS,
+    MISSING,
+    RISK_BUCKETS,
+    TransactionColumns,
+    aggregate_flows,
+    aggregate_methods,
+    financial_counters,
+    flag_counterparties,
+    fraud_risk_buckets,
+    summarize_financial_counts,
+    summarize_flows,
+)
+
+# Logging configuration
+logger = logging.getLogger(__name__)
+
+METRICS_STATE_PATH = cache_path("metrics_state.db")
+
+# Bump when the stored aggregates change shape; older state is dropped and rebuilt from a full fetch.
+METRICS_STATE_VERSION = 8
+
+# Timeline chunks per wallet and chain before they are compacted into one
+TIMELINE_MAX_CHUNKS = 16
+
+# Counterparties read per batch when streaming them out of the state
+COUNTERPARTY_BATCH_SIZE = 10_000
+
+# Wallet-wide first-seen keys order chains as SUPPORTED_CHAINS does, then by position within the chain
+CHAIN_RANKS = {chain_name: rank for rank, chain_name in enumerate(SUPPORTED_CHAINS)}
+CHAIN_RANK_STRIDE = 1 << 40
+
+# Mergeable aggregates per wallet and chain. first_seen is the position of a
+# counterparty's first transaction within the chain's history, which keeps
+# most-active tie-breaking identical to a full recomputation; first_timestamp
+# and errors feed the risk scoring features. wallet_timeline keeps each merged
+# delta as packed NumPy columns for activity pattern analysis, and
+# wallet_methods the calls and value per canonical method signature and its name.
+# wallet_totals sums the histogram over all chains and wallet_summary keeps
+# its size and risk bucket counts, both maintained as deltas are merged.
+# wallet_activity caches the activity analysis of a chain set at the
+# last_blocks it was computed from.
+METRICS_STATE_TABLES = (
+    "wallet_chain_state",
+    "wallet_counterparties",
+    "wallet_flows",
+    "wallet_timeline",
+    "wallet_methods",
+    "wallet_totals",
+    "wallet_summary",
+    "wallet_activity",
+)
+METRICS_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallet_chain_state (
+    wallet TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    last_block INTEGER NOT NULL,
+    tx_count INTEGER NOT NULL,
+    gas_spent REAL NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (wallet, chain)
+);
+CREATE TABLE IF NOT EXISTS wallet_counterparties (
+    wallet TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    counterparty TEXT NOT NULL,
+    tx_count INTEGER NOT NULL,
+    first_seen INTEGER NOT NULL,
+    first_timestamp INTEGER NOT NULL,
+    errors INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (wallet, chain, counterparty)
+);
+CREATE TABLE IF NOT EXISTS wallet_flows (
+    wallet TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    counterparty TEXT NOT NULL,
+    value_in REAL NOT NULL,
+    value_out REAL NOT NULL,
+    tx_in INTEGER NOT NULL,
+    tx_out INTEGER NOT NULL,
+    PRIMARY KEY (wallet, chain, counterparty)
+);
+CREATE TABLE IF NOT EXISTS wallet_timeline (
+    wallet TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    last_block INTEGER NOT NULL,
+    timestamps BLOB NOT NULL,
+    amounts BLOB NOT NULL,
+    peers BLOB NOT NULL,
+    outgoing BLOB NOT NULL,
+    errors BLOB NOT NULL,
+    PRIMARY KEY (wallet, chain, last_block)
+);
+CREATE TABLE IF NOT EXISTS wallet_methods (
+    wallet TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    method TEXT NOT NULL,
+    name TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    value_total REAL NOT NULL,
+    PRIMARY KEY (wallet, chain, method)
+);
+CREATE TABLE IF NOT EXISTS wallet_totals (
+    wallet TEXT NOT NULL,
+    counterparty TEXT NOT NULL,
+    tx_count INTEGER NOT NULL,
+    first_seen INTEGER NOT NULL,
+    first_timestamp INTEGER NOT NULL,
+    errors INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (wallet, counterparty)
+);
+CREATE INDEX IF NOT EXISTS idx_wallet_totals_count ON wallet_totals (wallet, tx_count DESC, first_seen);
+CREATE TABLE IF NOT EXISTS wallet_summary (
+    wallet TEXT PRIMARY KEY,
+    counterparties INTEGER NOT NULL,
+    transactions INTEGER NOT NULL,
+    low INTEGER NOT NULL,
+    moderate INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wallet_activity (
+    wallet TEXT NOT NULL,
+    chains TEXT NOT NULL,
+    last_blocks TEXT NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (wallet, chains)
+);
+"""
+
+
+def _connect():
+    conn = connect(METRICS_STATE_PATH)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != METRICS_STATE_VERSION:
+        _reset_state(conn)
+    return conn
+
+
+def _reset_state(conn) -> None:
+    """
+    Recreate the state tables for the current layout. The write lock makes
+    sure only one worker performs the reset.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != METRICS_STATE_VERSION:
+            logger.info(f"Resetting metrics state to layout version {METRICS_STATE_VERSION}.")
+            for table in METRICS_STATE_TABLES:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in METRICS_STATE_SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {METRICS_STATE_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+class ChainAggregate:
+    """
+    Transaction count, gas spent and last processed block of one wallet on one chain.
+    """
+
+    def __init__(self, chain: str, last_block: int = -1, tx_count: int = 0, gas_spent: float = 0.0):
+        self.chain = chain
+        self.last_block = last_block
+        self.tx_count = tx_count
+        self.gas_spent = gas_spent
+
+
+def _chain_filter(chains: List[str]):
+    """
+    SQL fragments restricting to `chains` and ranking them in SUPPORTED_CHAINS order, with their parameters.
+    """
+    placeholders = ", ".join("?" for _ in chains)
+    ranks = " ".join("WHEN ? THEN ?" for _ in chains)
+    rank_params = [value for chain_name in chains for value in (chain_name, CHAIN_RANKS.get(chain_name, len(CHAIN_RANKS)))]
+    return f"chain IN ({placeholders})", list(chains), f"CASE chain {ranks} END", rank_params
+
+
+class WalletAggregates:
+    """
+    A wallet's per-chain state. Histograms, flows and methods stay in the state
+    database and are aggregated there on demand, so loading is independent of
+    the number of counterparties.
+    """
+
+    def __init__(self, wallet_address: str, chains: Dict[str, ChainAggregate]):
+        self.wallet_address = wallet_address
+        self.chains = chains
+
+    def chain(self, chain_name: str) -> ChainAggregate:
+        aggregate = self.chains.get(chain_name)
+        if aggregate is None:
+            aggregate = self.chains[chain_name] = ChainAggregate(chain_name)
+        return aggregate
+
+    def startblocks(self, chains: Iterable[str]) -> Dict[str, int]:
+        return {chain_name: self.chain(chain_name).last_block + 1 for chain_name in chains}
+
+    def active_chains(self, chains: Iterable[str]) -> List[str]:
+        return [c for c in chains if c in self.chains and self.chains[c].tx_count]
+
+    def covers(self, chains: Iterable[str]) -> bool:
+        """
+        Whether `chains` includes every chain with stored transactions, so the wallet-wide totals apply.
+        """
+        return set(self.active_chains(self.chains)) <= set(chains)
+
+    def counterparty_totals(self, chains: Iterable[str]):
+        """
+        Transactions, value moved, first-seen timestamp and failed transactions
+        per counterparty over the requested chains.
+
+        Returns (counterparties, counts, moved, first_seen, errors) in
+        first-seen order, chains taken in SUPPORTED_CHAINS order, summed by
+        SQLite in one pass.
+        """
+        wallet = self.wallet_address.lower()
+        chains = self.active_chains(chains)
+        if not chains:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0)
+        if self.covers(chains):
+            rows = _connect().execute(
+                "SELECT t.counterparty, t.tx_count, COALESCE(f.moved, 0), t.first_timestamp, t.errors FROM wallet_totals t "
+                "LEFT JOIN (SELECT counterparty, SUM(value_in + value_out) AS moved FROM wallet_flows "
+                "WHERE wallet = ? GROUP BY counterparty) f ON f.counterparty = t.counterparty "
+                "WHERE t.wallet = ? ORDER BY t.first_seen",
+                (wallet, wallet),
+            ).fetchall()
+        else:
+            chain_clause, chain_params, rank, rank_params = _chain_filter(chains)
+            rows = _connect().execute(
+                f"SELECT c.counterparty, c.tx_count, COALESCE(f.moved, 0), c.first_timestamp, c.errors FROM "
+                f"(SELECT counterparty, SUM(tx_count) AS tx_count, MIN({rank} * {CHAIN_RANK_STRIDE} + first_seen) AS first_seen, "
+                f"MIN(first_timestamp) AS first_timestamp, SUM(errors) AS errors "
+                f"FROM wallet_counterparties WHERE wallet = ? AND {chain_clause} GROUP BY counterparty) c "
+                f"LEFT JOIN (SELECT counterparty, SUM(value_in + value_out) AS moved FROM wallet_flows "
+                f"WHERE wallet = ? AND {chain_clause} GROUP BY counterparty) f ON f.counterparty = c.counterparty "
+                f"ORDER BY c.first_seen",
+                rank_params + [wallet] + chain_params + [wallet] + chain_params,
+            ).fetchall()
+        if not rows:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros(0)
+        counterparties, counts, moved, first_seen, errors = zip(*rows)
+        return (
+            list(counterparties),
+            np.array(counts, dtype=np.int64),
+            np.array(moved, dtype=np.float64),
+            np.array(first_seen, dtype=np.int64),
+            np.array(errors, dtype=np.float64),
+        )
+
+    def iter_counterparty_counts(self, chains: Iterable[str], batch_size: int = COUNTERPARTY_BATCH_SIZE) -> Iterator[Dict[str, int]]:
+        """
+        Counterparty -> transaction count over the requested chains, read from
+        a cursor in batches of `batch_size` so callers never hold every
+        counterparty at once.
+        """
+        wallet = self.wallet_address.lower()
+        chains = self.active_chains(chains)
+        if not chains:
+            return
+        if self.covers(chains):
+            cursor = _connect().execute("SELECT counterparty, tx_count FROM wallet_totals WHERE wallet = ?", (wallet,))
+        else:
+            chain_clause, chain_params = _chain_filter(chains)[:2]
+            cursor = _connect().execute(
+                f"SELECT counterparty, SUM(tx_count) FROM wallet_counterparties "
+                f"WHERE wallet = ? AND {chain_clause} GROUP BY counterparty",
+                [wallet] + chain_params,
+            )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield dict(rows)
+        finally:
+            cursor.close()
+
+    def _flagged_totals(self, flagged_addresses) -> np.ndarray:
+        """
+        Wallet-wide transaction counts of the flagged counterparties, probing
+        whichever of the flagged set and the counterparty list is smaller.
+        """
+        wallet = self.wallet_address.lower()
+        conn = _connect()
+        interacting = conn.execute("SELECT counterparties FROM wallet_summary WHERE wallet = ?", (wallet,)).fetchone()
+        if not flagged_addresses or not interacting:
+            return np.zeros(0, dtype=np.int64)
+        if len(flagged_addresses) < interacting[0]:
+            counts = []
+            for chunk in chunked(flagged_addresses):
+                placeholders = ", ".join("?" for _ in chunk)
+                counts.extend(row[0] for row in conn.execute(
+                    f"SELECT tx_count FROM wallet_totals WHERE wallet = ? AND counterparty IN ({placeholders})",
+                    [wallet] + chunk,
+                ))
+        else:
+            counts = [
+                count for counterparty, count in conn.execute(
+                    "SELECT counterparty, tx_count FROM wallet_totals WHERE wallet = ?", (wallet,)
+                )
+                if counterparty in flagged_addresses
+            ]
+        return np.array(counts, dtype=np.int64)
+
+    def financial_summary(self, chains: Iterable[str], flagged_addresses, l1_chains, l2_chains) -> Dict[str, Any]:
+        """
+        The financialMetrics counters over the requested chains.
+
+        When the request covers every stored chain, the counterparty and risk
+        bucket counts come from the persisted wallet_summary counters and
+        mostActiveWallet from the wallet_totals index, so nothing scales with
+        the counterparty count except the flagged probe. Other chain subsets
+        aggregate the per-chain histogram in SQLite.
+        """
+        chains = list(chains)
+        active = self.active_chains(chains)
+        chain_counts = [self.chains[c].tx_count for c in active]
+        if not self.covers(chains):
+            counterparties, counts = self.counterparty_totals(active)[:2]
+            flagged = flag_counterparties(counterparties, flagged_addresses)
+            return summarize_financial_counts(active, chain_counts, counterparties, counts, flagged, l1_chains, l2_chains)
+
+        wallet = self.wallet_address.lower()
+        conn = _connect()
+        row = conn.execute(
+            "SELECT counterparties, transactions, low, moderate FROM wallet_summary WHERE wallet = ?", (wallet,)
+        ).fetchone()
+        interacting, transactions, low, moderate = row or (0, 0, 0, 0)
+        top = conn.execute(
+            "SELECT counterparty, tx_count FROM wallet_totals WHERE wallet = ? "
+            "ORDER BY tx_count DESC, first_seen LIMIT 1",
+            (wallet,),
+        ).fetchone()
+
+        # Flagged counterparties leave their count bucket for the Flagged one
+        flagged = np.bincount(fraud_risk_buckets(self._flagged_totals(flagged_addresses)), minlength=len(RISK_BUCKETS))
+        buckets = np.array([low, moderate, interacting - low - moderate]) - flagged
+        fraud_risk = dict(zip(RISK_BUCKETS, buckets.tolist()))
+        fraud_risk["Flagged"] = int(flagged.sum())
+        return financial_counters(
+            active,
+            chain_counts,
+            interacting,
+            transactions,
+            tuple(top) if top else ("None", 0),
+            fraud_risk,
+            l1_chains,
+            l2_chains,
+        )
+
+    def flow_summary(self, chains: Iterable[str], top_n: int = DEFAULT_TOP_COUNTERPARTIES) -> Dict[str, Any]:
+        """
+        Merge the per-chain value flows of the requested chains into one summary.
+
+        Totals and the top_n counterparties by value moved are computed by
+        SQLite with GROUP BY ... ORDER BY ... LIMIT.
+        """
+        wallet = self.wallet_address.lower()
+        chains = [c for c in chains if c in self.chains]
+        gas_by_chain = {c: self.chains[c].gas_spent for c in chains}
+        if not chains:
+            return summarize_flows([], np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0), gas_by_chain, top_n)
+        chain_clause, chain_params, _, _ = _chain_filter(chains)
+        conn = _connect()
+        total_in, total_out, counterparties = conn.execute(
+            f"SELECT COALESCE(SUM(value_in), 0), COALESCE(SUM(value_out), 0), COUNT(DISTINCT counterparty) "
+            f"FROM wallet_flows WHERE wallet = ? AND {chain_clause}",
+            [wallet] + chain_params,
+        ).fetchone()
+        top = conn.execute(
+            f"SELECT counterparty, SUM(value_in), SUM(value_out), SUM(tx_in), SUM(tx_out) FROM wallet_flows "
+            f"WHERE wallet = ? AND {chain_clause} GROUP BY counterparty "
+            f"ORDER BY SUM(value_in + value_out) DESC, MIN(rowid) LIMIT ?",
+            [wallet] + chain_params + [top_n],
+        ).fetchall()
+
+        summary = summarize_flows(
+            [row[0] for row in top],
+            np.array([row[1] for row in top], dtype=np.float64),
+            np.array([row[2] for row in top], dtype=np.float64),
+            np.array([row[3] for row in top], dtype=np.int64),
+            np.array([row[4] for row in top], dtype=np.int64),
+            gas_by_chain,
+            top_n,
+        )
+        summary["totalValueIn"] = round(total_in, FLOW_DECIMALS)
+        summary["totalValueOut"] = round(total_out, FLOW_DECIMALS)
+        summary["netFlow"] = round(total_in - total_out, FLOW_DECIMALS)
+        summary["counterparties"] = counterparties
+        return summary
+
+    def method_totals(self, chains: Iterable[str]) -> Dict[MethodSignature, List[float]]:
+        """
+        Signature -> [calls, value] over the requested chains.
+        """
+        chains = [c for c in chains if c in self.chains]
+        if not chains:
+            return {}
+        chain_clause, chain_params, _, _ = _chain_filter(chains)
+        return {
+            MethodSignature(name, method): [calls, value]
+            for method, name, calls, value in _connect().execute(
+                f"SELECT method, MIN(name), SUM(calls), SUM(value_total) FROM wallet_methods "
+                f"WHERE wallet = ? AND {chain_clause} GROUP BY method ORDER BY MIN(rowid)",
+                [self.wallet_address.lower()] + chain_params,
+            )
+        }
+
+    def method_summary(self, chains: Iterable[str], top_n: int = DEFAULT_TOP_METHODS) -> Dict[str, Any]:
+        """
+        Merge the per-chain method calls of the requested chains into one summary.
+        """
+        return summarize_method_totals(self.method_totals(chains), top_n)
+
+    def activity_patterns(self, chains: Iterable[str]) -> Dict[str, Any]:
+        """
+        analyze_activity over the stored timeline of the requested chains,
+        cached until one of them merges a newer block.
+
+        Bursts are measured against the wallet's lifetime average rate, so a
+        delta can move any episode; a changed last_block re-analyzes the
+        timeline rather than patching the cached result. The key and the
+        timeline are read in one transaction so they always match.
+        """
+        wallet = self.wallet_address.lower()
+        chains = self.active_chains(chains)
+        if not chains:
+            return analyze_activity(ActivityTimeline(*_unpack_chunks([])))
+        chain_key = ",".join(sorted(chains))
+        conn = _connect()
+        conn.execute("BEGIN")
+        try:
+            chain_clause, chain_params, _, _ = _chain_filter(chains)
+            last_blocks = ",".join(
+                str(last_block)
+                for _, last_block in conn.execute(
+                    f"SELECT chain, last_block FROM wallet_chain_state WHERE wallet = ? AND {chain_clause} ORDER BY chain",
+                    [wallet] + chain_params,
+                )
+            )
+            cached = conn.execute(
+                "SELECT result FROM wallet_activity WHERE wallet = ? AND chains = ? AND last_blocks = ?",
+                (wallet, chain_key, last_blocks),
+            ).fetchone()
+            timeline = None if cached else _load_timeline(conn, wallet, chains)
+        finally:
+            conn.rollback()
+        if cached:
+            return json.loads(cached[0])
+
+        result = analyze_activity(timeline)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO wallet_activity (wallet, chains, last_blocks, result) VALUES (?, ?, ?, ?)",
+                (wallet, chain_key, last_blocks, json.dumps(result)),
+            )
+        return result
+
+
+def load_wallet_aggregates(wallet_address: str) -> WalletAggregates:
+    wallet = wallet_address.lower()
+    chains = {
+        chain_name: ChainAggregate(chain_name, last_block, tx_count, gas_spent)
+        for chain_name, last_block, tx_count, gas_spent in _connect().execute(
+            "SELECT chain, last_block, tx_count, gas_spent FROM wallet_chain_state WHERE wallet = ?", (wallet,)
+        )
+    }
+    return WalletAggregates(wallet_address, chains)
+
+
+def peer_ids(counterparties: List[str], codes: np.ndarray) -> np.ndarray:
+    """
+    Stable integer ids for recipients: the first 60 bits of the address, MISSING when there is none.
+    """
+    ids = np.array([int(address[2:17], 16) for address in counterparties], dtype=np.int64)
+    peers = np.full(len(codes), MISSING, dtype=np.int64)
+    present = codes != MISSING
+    peers[present] = ids[codes[present]]
+    return peers
+
+
+def _timeline_chunk(columns: TransactionColumns, wallet: str, rows: np.ndarray, timestamps: np.ndarray, errors: np.ndarray) -> tuple:
+    outgoing = np.zeros(len(columns.counterparty_codes), dtype=bool)
+    outgoing[columns.wallet_rows(wallet)[1]] = True
+    return (
+        timestamps[rows].tobytes(),
+        columns.field("value_ether")[rows].tobytes(),
+        peer_ids(columns.counterparty_list(), columns.counterparty_codes[rows]).tobytes(),
+        outgoing[rows].tobytes(),
+        errors[rows].tobytes(),
+    )
+
+
+def _unpack_chunks(chunks: List[tuple]) -> List[np.ndarray]:
+    return [
+        np.concatenate([np.frombuffer(chunk[i], dtype=dtype) for chunk in chunks]) if chunks else np.empty(0, dtype)
+        for i, dtype in enumerate((np.int64, np.float64, np.int64, np.bool_, np.bool_))
+    ]
+
+
+def _compact_timeline(conn, wallet: str, chain_name: str) -> None:
+    """
+    Fold a chain's timeline chunks into one row once too many deltas have accumulated.
+    """
+    count = conn.execute(
+        "SELECT COUNT(*) FROM wallet_timeline WHERE wallet = ? AND chain = ?", (wallet, chain_name)
+    ).fetchone()[0]
+    if count <= TIMELINE_MAX_CHUNKS:
+        return
+    chunks = conn.execute(
+        "SELECT last_block, timestamps, amounts, peers, outgoing, errors FROM wallet_timeline "
+        "WHERE wallet = ? AND chain = ? ORDER BY last_block",
+        (wallet, chain_name),
+    ).fetchall()
+    columns = _unpack_chunks([chunk[1:] for chunk in chunks])
+    conn.execute("DELETE FROM wallet_timeline WHERE wallet = ? AND chain = ?", (wallet, chain_name))
+    conn.execute(
+        "INSERT INTO wallet_timeline (wallet, chain, last_block, timestamps, amounts, peers, outgoing, errors) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (wallet, chain_name, chunks[-1][0]) + tuple(column.tobytes() for column in columns),
+    )
+
+
+def _load_timeline(conn, wallet: str, chains: List[str]) -> ActivityTimeline:
+    placeholders = ", ".join("?" for _ in chains)
+    chunks = conn.execute(
+        f"SELECT timestamps, amounts, peers, outgoing, errors FROM wallet_timeline "
+        f"WHERE wallet = ? AND chain IN ({placeholders})",
+        [wallet] + chains,
+    ).fetchall()
+    return ActivityTimeline(*_unpack_chunks(chunks))
+
+
+def load_wallet_timeline(wallet_address: str, chains: Iterable[str]) -> ActivityTimeline:
+    """
+    The wallet's merged transaction timeline across `chains`, straight from the packed chunks.
+    """
+    return _load_timeline(_connect(), wallet_address.lower(), list(chains))
+
+
+def _merge_totals(conn, wallet: str, chain_name: str, rows: List[tuple]) -> None:
+    """
+    Add one chain's histogram delta to wallet_totals and move the affected
+    counterparties between the wallet_summary risk bucket counters.
+
+    Runs inside the merge transaction, after its write to wallet_chain_state,
+    so concurrent merges of the same wallet are serialized.
+    """
+    if not rows:
+        return
+    counterparties = [row[2] for row in rows]
+    previous: Dict[str, int] = {}
+    for chunk in chunked(counterparties):
+        placeholders = ", ".join("?" for _ in chunk)
+        previous.update(conn.execute(
+            f"SELECT counterparty, tx_count FROM wallet_totals WHERE wallet = ? AND counterparty IN ({placeholders})",
+            [wallet] + chunk,
+        ))
+    before = np.array([previous.get(c, 0) for c in counterparties], dtype=np.int64)
+    added = np.array([row[3] for row in rows], dtype=np.int64)
+    known = before > 0
+    shift = np.bincount(fraud_risk_buckets(before + added), minlength=len(RISK_BUCKETS))
+    shift -= np.bincount(fraud_risk_buckets(before[known]), minlength=len(RISK_BUCKETS))
+
+    rank = CHAIN_RANKS.get(chain_name, len(CHAIN_RANKS)) * CHAIN_RANK_STRIDE
+    conn.executemany(
+        "INSERT INTO wallet_totals (wallet, counterparty, tx_count, first_seen, first_timestamp, errors) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (wallet, counterparty) DO UPDATE SET "
+        "tx_count = tx_count + excluded.tx_count, first_seen = MIN(first_seen, excluded.first_seen), "
+        "first_timestamp = MIN(first_timestamp, excluded.first_timestamp), errors = errors + excluded.errors",
+        [
+            (wallet, counterparty, count, rank + first_seen, first_timestamp, failed)
+            for _, _, counterparty, count, first_seen, first_timestamp, failed in rows
+        ],
+    )
+    conn.execute(
+        "INSERT INTO wallet_summary (wallet, counterparties, transactions, low, moderate) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (wallet) DO UPDATE SET "
+        "counterparties = counterparties + excluded.counterparties, transactions = transactions + excluded.transactions, "
+        "low = low + excluded.low, moderate = moderate + excluded.moderate",
+        (wallet, int(np.count_nonzero(~known)), int(added.sum()), int(shift[0]), int(shift[1])),
+    )
+
+
+def merge_transactions(aggregates: WalletAggregates, chain_results: List[Dict[str, Any]]) -> int:
+    """
+    Fold newly fetched transactions into the wallet's aggregates and persist the changes.
+
+    Each chain's update only applies if the stored last_block is still the one
+    this delta was fetched from, so concurrent refreshes of the same wallet
+    cannot count a transaction twice. Returns the number of merged transactions.
+    """
+    wallet = aggregates.wallet_address.lower()
+    columns = TransactionColumns.from_chain_results(chain_results)
+    counterparties = columns.counterparty_list()
+    flows = aggregate_flows(columns, wallet)
+    methods = aggregate_methods(columns)
+    timestamps = columns.timestamps()
+    errors = columns.field("isError", int, np.int64) != 0
+    flow_rows: Dict[str, List[tuple]] = {}
+    for row in flows.rows():
+        flow_rows.setdefault(row[0], []).append(row)
+    conn = _connect()
+    merged: List[tuple] = []
+
+    # One write transaction for every chain in the delta; a chain whose stored
+    # last_block moved on is skipped without touching the others.
+    with conn:
+        for chain_index, chain_name in enumerate(columns.chains):
+            transactions = chain_results[chain_index].get("transactions", [])
+            if not transactions:
+                continue
+            aggregate = aggregates.chain(chain_name)
+            previous_block = aggregate.last_block
+            last_block = max(int(tx.get("blockNumber") or 0) for tx in transactions)
+            gas_spent = float(flows.gas_by_chain[chain_index])
+
+            chain_rows = np.flatnonzero(columns.chain_codes == chain_index)
+            codes = columns.counterparty_codes[chain_rows]
+            present = codes != MISSING
+            uniques, first_index, inverse, counts = np.unique(
+                codes[present], return_index=True, return_inverse=True, return_counts=True
+            )
+            positions = np.flatnonzero(present)[first_index] + aggregate.tx_count
+            first_timestamps = np.full(len(uniques), np.iinfo(np.int64).max)
+            np.minimum.at(first_timestamps, inverse, timestamps[chain_rows][present])
+            failures = np.bincount(inverse, weights=errors[chain_rows][present], minlength=len(uniques))
+
+            rows = []
+            for code, first_seen, count, first_timestamp, failed in zip(
+                uniques.tolist(), positions.tolist(), counts.tolist(), first_timestamps.tolist(), failures.astype(np.int64).tolist()
+            ):
+                rows.append((wallet, chain_name, counterparties[code], count, first_seen, first_timestamp, failed))
+            chain_flows = flow_rows.get(chain_name, [])
+            chain_methods = methods.get(chain_name, {})
+            timeline = _timeline_chunk(columns, wallet, chain_rows, timestamps, errors)
+
+            if previous_block < 0:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO wallet_chain_state (wallet, chain, last_block, tx_count, gas_spent, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (wallet, chain_name, last_block, len(codes), gas_spent, int(time.time())),
+                )
+            else:
+                cursor = conn.execute(
+                    "UPDATE wallet_chain_state SET last_block = ?, tx_count = tx_count + ?, "
+                    "gas_spent = gas_spent + ?, updated_at = ? "
+                    "WHERE wallet = ? AND chain = ? AND last_block = ?",
+                    (last_block, len(codes), gas_spent, int(time.time()), wallet, chain_name, previous_block),
+                )
+            if cursor.rowcount == 0:
+                logger.info(f"Skipping stale {chain_name} delta for {wallet}; another refresh already merged it.")
+                continue
+            conn.executemany(
+                "INSERT INTO wallet_counterparties (wallet, chain, counterparty, tx_count, first_seen, first_timestamp, errors) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (wallet, chain, counterparty) DO UPDATE SET tx_count = tx_count + excluded.tx_count, "
+                "first_timestamp = MIN(first_timestamp, excluded.first_timestamp), errors = errors + excluded.errors",
+                rows,
+            )
+            conn.executemany(
+                "INSERT INTO wallet_flows (wallet, chain, counterparty, value_in, value_out, tx_in, tx_out) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (wallet, chain, counterparty) DO UPDATE SET "
+                "value_in = value_in + excluded.value_in, value_out = value_out + excluded.value_out, "
+                "tx_in = tx_in + excluded.tx_in, tx_out = tx_out + excluded.tx_out",
+                [(wallet,) + row for row in chain_flows],
+            )
+            conn.executemany(
+                "INSERT INTO wallet_methods (wallet, chain, method, name, calls, value_total) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (wallet, chain, method) DO UPDATE SET "
+                "calls = calls + excluded.calls, value_total = value_total + excluded.value_total",
+                [
+                    (wallet, chain_name, method.signature, method.name, calls, value)
+                    for method, (calls, value) in chain_methods.items()
+                ],
+            )
+            conn.execute(
+                "INSERT INTO wallet_timeline (wallet, chain, last_block, timestamps, amounts, peers, outgoing, errors) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (wallet, chain_name, last_block) + timeline,
+            )
+            _compact_timeline(conn, wallet, chain_name)
+            _merge_totals(conn, wallet, chain_name, rows)
+            merged.append((aggregate, len(codes), gas_spent, last_block))
+
+    for aggregate, count, gas_spent, last_block in merged:
+        aggregate.tx_count += count
+        aggregate.gas_spent += gas_spent
+        aggregate.last_block = last_block
+    return sum(count for _, count, _, _ in merged)
+
+
+def merge_chain_page(aggregates: WalletAggregates, chain_name: str, transactions: List[Dict[str, Any]], final: bool = False):
+    """
+    Merge one streamed page of a chain's transactions into the wallet's state.
+
+    The next page may continue the newest block, so its transactions are held
+    back and returned unless `final`; pass them in front of the next page. A
+    stream that fails part-way therefore leaves the state at a complete block.
+    """
+    held: List[Dict[str, Any]] = []
+    if transactions and not final:
+        newest = transactions[-1].get("blockNumber")
+        cut = len(transactions)
+        while cut and transactions[cut - 1].get("blockNumber") == newest:
+            cut -= 1
+        transactions, held = transactions[:cut], transactions[cut:]
+    if transactions:
+        merge_transactions(aggregates, [{"chain": chain_name, "transactions": transactions}])
+    return held
+
+
+async def refresh_wallet_aggregates(wallet_address: str, chains: Iterable[str], client=None, page_size: int = PAGE_SIZE) -> WalletAggregates:
+    """
+    Load a wallet's stored aggregates and bring them up to date with only the
+    transactions mined after each chain's last processed block.
+
+    Each chain is streamed a page at a time and merged as it arrives, so a
+    delta longer than Etherscan's 10,000 result cap is fetched in full and only
+    one page is held in memory. merge_chain_page holds back the newest block of
+    every page but the last, so last_block only advances past a block once all
+    of its transactions are merged; a stream that fails part-way resumes from
+    there on the next request.
+    """
+    if not is_valid_ethereum_address(wallet_address):
+        raise ValueError(f"Invalid Ethereum address: {wallet_address}")
+    chains = list(chains)
+    aggregates = load_wallet_aggregates(wallet_address)
+    merged = 0
+    raced = False
+
+    for chain_name, startblock in aggregates.startblocks(chains).items():
+        pages = iter_transaction_pages(chain_name, wallet_address, startblock, page_size=page_size, client=client)
+        aggregate = aggregates.chain(chain_name)
+        initial = aggregate.tx_count
+        held: List[Dict[str, Any]] = []
+        try:
+            async for page in pages:
+                pending, before = held + page, aggregate.tx_count
+                held = merge_chain_page(aggregates, chain_name, pending)
+                if aggregate.tx_count - before < len(pending) - len(held):
+                    # A concurrent refresh already merged these blocks; it will carry the chain on
+                    raced = True
+                    break
+            else:
+                before = aggregate.tx_count
+                merge_chain_page(aggregates, chain_name, held, final=True)
+                raced = raced or aggregate.tx_count - before < len(held)
+        except Exception as e:
+            logger.error(f"Error refreshing {chain_name} metrics state for {wallet_address}: {e}")
+        finally:
+            await pages.aclose()
+        merged += aggregate.tx_count - initial
+
+    # A concurrent refresh may have won the race for some chains; reload so they are counted.
+    if raced:
+        aggregates = load_wallet_aggregates(wallet_address)
+    logger.info(f"Merged {merged} new transactions into metrics state for {wallet_address}.")
+    return aggregates
@@ -55,6 +55,39 @@ except ValueError as e:
 # External logo URL
 EXTERNAL_LOGO_URL = "https://cdn.prod.website-files.com/631ee5b346419b93f92caf9a/631f8989dada7e625bfa2660_401_Website_Cover-01-01.jpg"
 
+def format_activity_patterns(activity_patterns):
+    """
+    Summarize burst, dormancy and fan-out findings as prompt lines.
+    """
+    if not activity_patterns or not activity_patterns.get("transactionsAnalyzed"):
+        return "No activity pattern analysis available."
+
+    lines = []
+    bursts = activity_patterns["bursts"]
+    if bursts["count"]:
+        peak = bursts["episodes"][0]
+        lines.append(
+            f"Activity Bursts: {bursts['count']} (largest {peak['transactions']} transactions "
+            f"between {peak['start']} and {peak['end']}, versus a baseline of "
+            f"{bursts['baselineHourlyTransactions']} per hour)"
+        )
+    dormancy = activity_patterns["dormancy"]
+    if dormancy["count"]:
+        longest = dormancy["periods"][0]
+        lines.append(
+            f"Dormant Periods: {dormancy['count']}, {dormancy['reactivations']} followed by renewed activity "
+            f"(longest {longest['gapDays']} days, until {longest['dormantUntil']}, "
+            f"then {longest['transactionsAfter']} transactions within a week)"
+        )
+    fan_out = activity_patterns["fanOut"]
+    if fan_out["count"]:
+        largest = fan_out["episodes"][0]
+        lines.append(
+            f"Rapid Fan-Out: {fan_out['count']} episodes (largest sent to {largest['counterparties']} "
+            f"distinct wallets between {largest['start']} and {largest['end']})"
+        )
+    return "\n        ".join(lines) if lines else "No bursts, dormant reactivations or rapid fan-out detected."
+
 async def generate_openai_narrative(metrics, date):
     """
     Generate a professional wallet activity report narrative based on metrics.
@@ -81,6 +114,8 @@ async def generate_openai_narrative(metrics, date):
         Most Active Wallet: {metrics['financialMetrics']['mostActiveWallet']['address']} 
                             with {metrics['financialMetrics']['mostActiveWallet']['transactionCount']} transactions.
         Fraud Risk Summary: {fraud_risk_summary}.
+        Activity Patterns:
+        {format_activity_patterns(metrics['financialMetrics'].get('activityPatterns'))}
     """
     try:
         response = await openai.ChatCompletion.acreate(
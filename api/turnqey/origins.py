@@ -1,10 +1,20 @@
 import os
 import json
+import time
 import asyncio
 import logging
+import threading
+import httpx
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
-from api.tools.etherscanv2 import get_transaction_data, is_valid_ethereum_address
+from types import MappingProxyType
+from typing import List, Dict, Any, AsyncIterator, Iterable, Iterator, Mapping, Optional, Tuple
+from api.tools.etherscanv2 import SUPPORTED_CHAINS, get_transaction_data, is_valid_ethereum_address, iter_transaction_pages
+from api.tools.edge_cache import queue_transactions
+from api.tools.method_signatures import MethodStats
+from api.tools.relationship_graph import VALUE_DECIMALS, RelationshipGraph, build_relationship_graph
+from api.tools.label_store import ANY_CHAIN, import_label_file, lookup_labels
+from api.tools.time_windows import find_time_slice, format_time_bound
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +28,20 @@ KNOWN_ORIGINS_PATH = os.path.normpath(os.path.join(
     "contract_origins.json"
 ))
 
+# Label store source name of contract_origins.json
+KNOWN_ORIGINS_SOURCE = "known_origins"
+
+# Chains an address or transaction is assumed to be on when nothing says otherwise
+DEFAULT_ORIGIN_CHAINS = ("ethereum",)
+
+# Transactions a batch remembers the reporting address of; later ones are not deduplicated
+BATCH_MAX_TRACKED_TRANSACTIONS = 1_000_000
+
+# Complete address results later batches reuse instead of refetching; open-ended ranges pick up new blocks after this
+HISTORY_REUSE_SECONDS = 300
+# Reusable address results kept per process, each sized by the address's distinct counterparties
+HISTORY_REUSE_MAX_ENTRIES = 256
+
 
 def load_known_origins() -> List[Dict[str, Any]]:
     """
@@ -43,37 +67,110 @@ def load_known_origins() -> List[Dict[str, Any]]:
         return []
 
 
-def build_relationships(transactions: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+class KnownOriginsIndex:
     """
-    Build relationships between addresses based on transaction data.
+    Immutable (chain, address) -> origin lookup for the addresses of one request.
+
+    Labels come from the SQLite label store in one batched query, and each is
+    only keyed on the chains it applies to, so a BSC router never labels an
+    Ethereum address that happens to share its bytes. Entries that name no
+    chain are keyed on ANY_CHAIN and match on every chain, after any
+    chain-specific label.
     """
-    relationships = {}
-    for tx in transactions:
-        from_addr = tx.get("from", "").lower()
-        to_addr = tx.get("to", "").lower()
 
-        if from_addr and to_addr:
-            if from_addr not in relationships:
-                relationships[from_addr] = []
-            relationships[from_addr].append(to_addr)
+    def __init__(self, labels: Mapping[Tuple[str, str], Mapping[str, Any]]):
+        self._labels = MappingProxyType(dict(labels))
+
+    @classmethod
+    def for_addresses(cls, addresses: Iterable[str]) -> "KnownOriginsIndex":
+        labels = {}
+        for address, by_chain in lookup_labels(addresses).items():
+            for chain, label in by_chain.items():
+                labels[(chain, address)] = MappingProxyType({**label, "address": address})
+        return cls(labels)
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def extended(self, addresses: Iterable[str]) -> "KnownOriginsIndex":
+        """
+        An index that also holds the labels of `addresses`, for callers that discover addresses as they stream.
+        """
+        added = KnownOriginsIndex.for_addresses(addresses)
+        if not len(added):
+            return self
+        return KnownOriginsIndex({**self._labels, **added._labels})
+
+    def lookup(self, chain: str, address: str) -> Optional[Mapping[str, Any]]:
+        label = self._labels.get((chain, address))
+        return label if label is not None else self._labels.get((ANY_CHAIN, address))
+
+    def lookup_any(self, chains: Iterable[str], address: str) -> Optional[Mapping[str, Any]]:
+        """
+        The origin of an address on the first of `chains` where it is known.
+        """
+        for chain in chains:
+            label = self._labels.get((chain, address))
+            if label is not None:
+                return label
+        return self._labels.get((ANY_CHAIN, address))
+
+
+_synced_mtime: Optional[float] = None
+_sync_lock = threading.Lock()
+
+
+def sync_known_origins() -> None:
+    """
+    Import contract_origins.json into the label store whenever the file changes.
 
-    return relationships
+    The import itself is skipped when the file's checksum matches the stored
+    version, so workers starting with an unchanged file do no writes.
+    """
+    global _synced_mtime
+    with _sync_lock:
+        try:
+            mtime = os.path.getmtime(KNOWN_ORIGINS_PATH)
+        except OSError:
+            logger.error(f"Known origins file not found at {KNOWN_ORIGINS_PATH}")
+            return
+        if mtime == _synced_mtime:
+            return
+        try:
+            import_label_file(KNOWN_ORIGINS_PATH, KNOWN_ORIGINS_SOURCE)
+            _synced_mtime = mtime
+        except Exception as e:
+            logger.error(f"Failed to import known origins into the label store: {e}")
+
+
+def build_relationships(chain_results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Build weighted relationships between addresses based on transaction data:
+    from -> to -> {count, total_value, first_seen, last_seen}.
+    """
+    return build_relationship_graph(chain_results).to_dict()
 
 
-def label_addresses(addresses: List[str], known_origins: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+def label_addresses(
+    addresses: List[str],
+    origins_index: KnownOriginsIndex,
+    address_chains: Optional[Dict[str, Iterable[str]]] = None,
+) -> Dict[str, Dict[str, Any]]:
     """
     Label unique addresses with known information or inferred data.
+    `address_chains` maps each address to the chains it was seen on (default: Ethereum).
     """
     address_labels = {}
-    origin_map = {o.get("address", "").lower(): o for o in known_origins}
+    address_chains = address_chains or {}
 
     for address in addresses:
-        if address in origin_map:
-            origin = origin_map[address]
+        origin = origins_index.lookup_any(address_chains.get(address, DEFAULT_ORIGIN_CHAINS), address)
+        if origin is not None:
             address_labels[address] = {
                 "name": origin.get("name", "Unknown"),
                 "type": origin.get("type", "Unknown"),
-                "source": "Known Origin"
+                "source": "Known Origin",
+                "label_list": origin.get("source"),
             }
         else:
             address_labels[address] = {
@@ -85,33 +182,46 @@ def label_addresses(addresses: List[str], known_origins: List[Dict[str, Any]]) -
     return address_labels
 
 
-def match_transactions_with_origins(transactions: List[Dict[str, Any]], known_origins: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def match_origin(tx: Dict[str, Any], origins_index: KnownOriginsIndex) -> Optional[Dict[str, Any]]:
     """
-    Match transactions with known origins.
+    The known origin of one transaction on its chain: the sender if known, else the recipient.
+    """
+    chain = tx.get("chain", DEFAULT_ORIGIN_CHAINS[0])
+    o = origins_index.lookup(chain, tx.get("from", "")) or origins_index.lookup(chain, tx.get("to", ""))
+    if o is None:
+        return None
+    return {
+        "transaction_hash": tx.get("hash"),
+        "origin_name": o["name"],
+        "origin_type": o["type"],
+        "origin_address": o["address"],
+        "chain": chain,
+    }
+
+
+def record_origins(
+    transactions: Iterable[Dict[str, Any]],
+    origins_index: KnownOriginsIndex,
+    matched_origins: List[Dict[str, Any]],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Pipeline stage: pass transactions through, appending their known-origin matches to `matched_origins`.
     """
-    matched_origins = []
-    origin_map = {o.get("address", "").lower(): o for o in known_origins}
-
     for tx in transactions:
-        from_addr = tx.get("from", "").lower()
-        to_addr = tx.get("to", "").lower()
-
-        if from_addr in origin_map:
-            o = origin_map[from_addr]
-            matched_origins.append({
-                "transaction_hash": tx.get("hash"),
-                "origin_name": o.get("name", "Unknown"),
-                "origin_type": o.get("type", "Unknown"),
-                "origin_address": from_addr
-            })
-        elif to_addr in origin_map:
-            o = origin_map[to_addr]
-            matched_origins.append({
-                "transaction_hash": tx.get("hash"),
-                "origin_name": o.get("name", "Unknown"),
-                "origin_type": o.get("type", "Unknown"),
-                "origin_address": to_addr
-            })
+        match = match_origin(tx, origins_index)
+        if match is not None:
+            matched_origins.append(match)
+        yield tx
+
+
+def match_transactions_with_origins(transactions: List[Dict[str, Any]], origins_index: KnownOriginsIndex) -> List[Dict[str, Any]]:
+    """
+    Match transactions with known origins on the chain each transaction happened on.
+    The sender is matched first, then the recipient.
+    """
+    matched_origins = []
+    for _ in record_origins(transactions, origins_index, matched_origins):
+        pass
 
     logger.info(f"Matched {len(matched_origins)} known origins for {len(transactions)} transactions.")
     return matched_origins
@@ -128,15 +238,17 @@ def format_timestamp(ts: str) -> str:
         return ts
 
 
-async def fetch_transaction_data(address: str) -> List[Dict[str, Any]]:
+async def fetch_transaction_data(address: str, client=None) -> List[Dict[str, Any]]:
     """
-    Fetch transactions for a given Ethereum address.
+    Fetch transactions for a given Ethereum address, optionally over a shared httpx client.
     """
     try:
-        transactions = await get_transaction_data(address)
+        transactions = await get_transaction_data(address, client=client)
         if transactions and isinstance(transactions, list):
             total_txs = sum(len(c["transactions"]) for c in transactions if "transactions" in c)
             logger.info(f"Fetched data from {len(transactions)} chains, total {total_txs} transactions for {address}.")
+            # Keep the edges for path queries; written off the event loop
+            queue_transactions(transactions)
             return transactions
         else:
             logger.warning(f"No transaction data returned for {address}.")
@@ -145,9 +257,167 @@ async def fetch_transaction_data(address: str) -> List[Dict[str, Any]]:
     return []
 
 
-async def process_address(address: str, known_origins: List[Dict[str, Any]]) -> Dict[str, Any]:
+def iter_unique_transactions(chain_results: List[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    (chain, transaction) pairs of get_transaction_data output, lazily, dropping repeated hashes.
+
+    Each chain's transactions are in block order, so a repeat (from overlapping
+    pages) always falls in the same block; only the current block's hashes are
+    remembered.
+    """
+    for chain_data in chain_results:
+        chain = chain_data.get("chain")
+        block, seen = None, set()
+        for tx in chain_data.get("transactions", []):
+            if tx.get("blockNumber") != block:
+                block, seen = tx.get("blockNumber"), set()
+            tx_hash = tx.get("hash")
+            if tx_hash in seen:
+                continue
+            seen.add(tx_hash)
+            yield chain, tx
+
+
+def record_relationships(
+    transactions: Iterable[Tuple[str, Dict[str, Any]]],
+    graph: RelationshipGraph,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Pipeline stage: pass (chain, transaction) pairs through, adding each transaction to `graph`.
+    """
+    for chain, tx in transactions:
+        graph.add_transaction(tx)
+        yield chain, tx
+
+
+def record_methods(
+    transactions: Iterable[Tuple[str, Dict[str, Any]]],
+    stats: MethodStats,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Pipeline stage: pass (chain, transaction) pairs through, counting calls and value per method signature.
+    """
+    for chain, tx in transactions:
+        stats.add(tx.get("functionName") or "", float(tx.get("value_ether") or 0))
+        yield chain, tx
+
+
+def flatten_transaction(chain: str, tx: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "hash": tx.get("hash"),
+        "from": (tx.get("from") or "").lower(),
+        "to": (tx.get("to") or "").lower(),
+        "value_in_eth": tx.get("value_ether", 0.0),
+        "function_name": tx.get("functionName", "N/A"),
+        "timestamp_utc": format_timestamp(tx.get("timeStamp", "0")),
+        "chain": chain,
+    }
+
+
+class OriginsSummary:
+    """
+    Single-pass origins analysis of one address, fed a page of transactions at a time.
+
+    Each page is deduped, its new addresses are noted with the chains they
+    were seen on and looked up in the label store in one query, and its
+    transactions flow through the relationship, method and origin stages
+    before the page is dropped. What is kept grows with distinct addresses
+    and edges, plus the known-origin matches; the flattened transactions are
+    only kept with `include_transactions`.
+    """
+
+    def __init__(self, include_transactions: bool = False):
+        self.include_transactions = include_transactions
+        self.graph = RelationshipGraph()
+        self.methods = MethodStats()
+        self.origins_index = KnownOriginsIndex({})
+        self.address_chains: Dict[str, List[str]] = {}
+        self.matched_origins: List[Dict[str, Any]] = []
+        self.transactions: List[Dict[str, Any]] = []
+        # chain -> [transactions, total value, first timestamp, last timestamp]
+        self.chain_totals: Dict[str, List] = {}
+        self.transaction_count = 0
+
+    def _record_addresses(self, chain: str, transactions: List[Dict[str, Any]]) -> List[str]:
+        new_addresses = []
+        for tx in transactions:
+            for addr in ((tx.get("from") or "").lower(), (tx.get("to") or "").lower()):
+                if not addr:
+                    continue
+                chains = self.address_chains.get(addr)
+                if chains is None:
+                    self.address_chains[addr] = [chain]
+                    new_addresses.append(addr)
+                elif chain not in chains:
+                    chains.append(chain)
+        return new_addresses
+
+    def update(self, chain: str, transactions: List[Dict[str, Any]]) -> None:
+        new_addresses = self._record_addresses(chain, transactions)
+        if new_addresses:
+            self.origins_index = self.origins_index.extended(new_addresses)
+
+        unique = iter_unique_transactions([{"chain": chain, "transactions": transactions}])
+        recorded = record_methods(record_relationships(unique, self.graph), self.methods)
+        totals = self.chain_totals.setdefault(chain, [0, 0.0, None, None])
+        for tx in record_origins((flatten_transaction(c, tx) for c, tx in recorded), self.origins_index, self.matched_origins):
+            self.transaction_count += 1
+            totals[0] += 1
+            totals[1] += float(tx["value_in_eth"] or 0)
+            if self.include_transactions:
+                self.transactions.append(tx)
+        if transactions:
+            first, last = int(transactions[0].get("timeStamp") or 0), int(transactions[-1].get("timeStamp") or 0)
+            totals[2] = first if totals[2] is None else min(totals[2], first)
+            totals[3] = last if totals[3] is None else max(totals[3], last)
+
+    def summary(self) -> Dict[str, Any]:
+        logger.info(f"Matched {len(self.matched_origins)} known origins for {self.transaction_count} transactions.")
+        origin_counts = {}
+        for mo in self.matched_origins:
+            key = (mo["origin_name"], mo["origin_address"])
+            origin_counts[key] = origin_counts.get(key, 0) + 1
+        origin_summary = sorted(
+            [{"origin_name": k[0], "origin_address": k[1], "count": v} for k, v in origin_counts.items()],
+            key=lambda x: x["count"], reverse=True
+        )
+
+        return {
+            "known_origins": self.matched_origins,
+            "transactions": self.transactions,
+            "transaction_count": self.transaction_count,
+            "chain_summaries": {
+                chain: {
+                    "transactions": count,
+                    "total_value": round(value, VALUE_DECIMALS),
+                    "first_seen": format_time_bound(first),
+                    "last_seen": format_time_bound(last),
+                }
+                for chain, (count, value, first, last) in self.chain_totals.items() if count
+            },
+            "relationships": self.graph.to_dict(),
+            "method_summary": self.methods.summary(),
+            "address_labels": label_addresses(list(self.address_chains), self.origins_index, self.address_chains),
+            "origin_interaction_summary": origin_summary,
+        }
+
+
+async def process_address(
+    address: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    client=None,
+    include_transactions: bool = False,
+) -> Dict[str, Any]:
     """
     Process an Ethereum address by fetching its transactions, matching known origins, and labeling addresses.
+    Only transactions between `start` and `end` (Unix seconds, inclusive) are considered when given.
+
+    Each chain is streamed a page at a time into an OriginsSummary, so memory
+    follows the address's distinct counterparties rather than its history.
+    The result carries per-chain summaries; the transactions themselves are
+    only returned with `include_transactions`. `complete` is False when a
+    chain failed to fetch.
     """
     if not is_valid_ethereum_address(address):
         logger.warning(f"Invalid Ethereum address: {address}")
@@ -156,76 +426,227 @@ async def process_address(address: str, known_origins: List[Dict[str, Any]]) ->
     logger.info(f"Processing address: {address}")
     result = {"address": address, "known_origins": [], "transactions": [], "status": "PROCESSED"}
 
-    transactions = await fetch_transaction_data(address)
-    if not transactions:
+    summary = OriginsSummary(include_transactions)
+    failed_chains = []
+    for chain_name in SUPPORTED_CHAINS:
+        pages = iter_transaction_pages(chain_name, address, client=client)
+        try:
+            async for page in pages:
+                # Keep the edges for path queries; written off the event loop
+                queue_transactions([{"chain": chain_name, "transactions": page}])
+                lo, hi = find_time_slice(page, start, end)
+                if hi > lo:
+                    summary.update(chain_name, page[lo:hi])
+                if hi < len(page):
+                    # Pages are in ascending time order, so nothing later can be in range
+                    break
+        except Exception as e:
+            logger.error(f"Error fetching {chain_name} transactions for {address}: {e}")
+            failed_chains.append(chain_name)
+        finally:
+            await pages.aclose()
+
+    result["complete"] = not failed_chains
+    if not summary.transaction_count:
         logger.warning(f"No transactions found for {address}")
         result["status"] = "NO_TRANSACTIONS"
         return result
 
-    flattened_transactions = [
-        {
-            "hash": tx.get("hash"),
-            "from": tx.get("from", "").lower(),
-            "to": tx.get("to", "").lower(),
-            "value_in_eth": tx.get("value_ether", 0.0),
-            "function_name": tx.get("functionName", "N/A"),
-            "timestamp_utc": format_timestamp(tx.get("timeStamp", "0"))
-        }
-        for chain_data in transactions
-        for tx in chain_data.get("transactions", [])
-    ]
-
-    unique_addresses, unique_transactions = extract_unique_addresses_and_transactions(flattened_transactions)
-    relationships = build_relationships(flattened_transactions)
-    address_labels = label_addresses(unique_addresses, known_origins)
-
-    matched_origins = match_transactions_with_origins(unique_transactions, known_origins)
-
-    # Summarize origins
-    origin_counts = {}
-    for mo in matched_origins:
-        key = (mo["origin_name"], mo["origin_address"])
-        origin_counts[key] = origin_counts.get(key, 0) + 1
-    origin_summary = sorted(
-        [{"origin_name": k[0], "origin_address": k[1], "count": v} for k, v in origin_counts.items()],
-        key=lambda x: x["count"], reverse=True
-    )
-
-    result["known_origins"] = matched_origins
-    result["transactions"] = unique_transactions
-    result["relationships"] = relationships
-    result["address_labels"] = address_labels
-    result["origin_interaction_summary"] = origin_summary
+    result.update(summary.summary())
+    return result
+
 
+def _address_error(address: str, error: Exception) -> Dict[str, Any]:
+    logger.error(f"Error processing address {address}: {error}")
+    return {
+        "address": address,
+        "status": "ERROR",
+        "details": str(error),
+        "known_origins": [],
+        "transactions": []
+    }
+
+
+def unique_batch_addresses(addresses: Iterable[str]) -> List[str]:
+    """
+    The distinct addresses of a batch, compared case-insensitively, in request order.
+    """
+    unique = {}
+    for address in addresses:
+        unique.setdefault(address.lower(), address)
+    return list(unique.values())
+
+
+class BatchTransactions:
+    """
+    Request-scoped record of which batch address reported each transaction.
+
+    Related addresses share much of their history (a transfer between two of
+    them shows up in both), so each transaction and its known-origin match
+    are returned only with the first result that contains it; later results
+    list its hash under `shared_transactions`, keyed by the address that
+    carried it. Results without their transaction list are deduplicated by
+    their matches alone. The record holds one entry per distinct transaction
+    of the batch, up to BATCH_MAX_TRACKED_TRANSACTIONS; transactions first
+    seen after that are returned with every result.
+    """
+
+    def __init__(self):
+        self._owners: Dict[Tuple[str, str], str] = {}
+
+    def _owner(self, key: Tuple[str, str], address: str) -> str:
+        owner = self._owners.get(key)
+        if owner is None:
+            owner = address
+            if len(self._owners) < BATCH_MAX_TRACKED_TRANSACTIONS:
+                self._owners[key] = owner
+        return owner
+
+    def claim(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        address = result["address"]
+        own, own_matches, shared, shared_keys = [], [], {}, set()
+        for tx in result.get("transactions", []):
+            key = (tx.get("chain"), tx.get("hash"))
+            owner = self._owner(key, address)
+            if owner == address:
+                own.append(tx)
+            else:
+                shared.setdefault(owner, []).append(tx.get("hash"))
+                shared_keys.add(key)
+        for match in result.get("known_origins", []):
+            key = (match.get("chain"), match.get("transaction_hash"))
+            owner = self._owner(key, address)
+            if owner == address:
+                own_matches.append(match)
+            elif key not in shared_keys:
+                shared.setdefault(owner, []).append(match.get("transaction_hash"))
+                shared_keys.add(key)
+        if shared:
+            logger.info(f"{len(shared_keys)} transactions of {address} were already reported in this batch.")
+        result["transactions"] = own
+        result["known_origins"] = own_matches
+        result["shared_transactions"] = shared
+        return result
+
+
+_history_lock = threading.Lock()
+_recent_histories: "OrderedDict[Tuple[str, Optional[int], Optional[int]], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+def recent_history(address: str, start: Optional[int], end: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    A copy of the address's complete result over the same range, if one was fetched in the last HISTORY_REUSE_SECONDS.
+    """
+    key = (address.lower(), start, end)
+    with _history_lock:
+        entry = _recent_histories.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > HISTORY_REUSE_SECONDS:
+            del _recent_histories[key]
+            return None
+        _recent_histories.move_to_end(key)
+        return dict(entry[1])
+
+
+def remember_history(address: str, start: Optional[int], end: Optional[int], result: Dict[str, Any]) -> None:
+    with _history_lock:
+        _recent_histories[(address.lower(), start, end)] = (time.monotonic(), dict(result))
+        _recent_histories.move_to_end((address.lower(), start, end))
+        while len(_recent_histories) > HISTORY_REUSE_MAX_ENTRIES:
+            _recent_histories.popitem(last=False)
+
+
+async def process_batch_address(
+    address: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    client=None,
+    include_transactions: bool = False,
+) -> Dict[str, Any]:
+    """
+    process_address for one batch member, checking the histories fetched by
+    this and recent batches before issuing any Etherscan request.
+
+    Only complete results without their transaction list are reused, so a
+    chain that failed to fetch is retried by the next batch.
+    """
+    if not include_transactions:
+        reused = recent_history(address, start, end)
+        if reused is not None:
+            logger.info(f"Reusing the history of {address} fetched by a recent batch.")
+            return reused
+    result = await process_address(address, start, end, client, include_transactions)
+    if not include_transactions and result.get("complete") and result.get("status") != "INVALID_ADDRESS":
+        remember_history(address, start, end, result)
     return result
 
 
-async def process_addresses_async(addresses: List[str]) -> List[Dict[str, Any]]:
+async def iter_processed_addresses(
+    addresses: List[str],
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    include_transactions: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
     """
-    Process multiple Ethereum addresses asynchronously.
+    Process multiple addresses concurrently, yielding each result as soon as it completes.
+
+    Results arrive in completion order, so the caller can send and drop each
+    one instead of holding every address's transactions until the slowest is done.
+    Each distinct address is fetched once over a shared client, unless a recent
+    batch already fetched it, and transactions already sent with an earlier
+    result are only referenced by hash.
+    """
+    sync_known_origins()
+
+    addresses = unique_batch_addresses(addresses)
+    logger.info(f"Streaming {len(addresses)} addresses.")
+    batch = BatchTransactions()
+
+    async with httpx.AsyncClient(timeout=10) as client:
+
+        async def run_one(address):
+            try:
+                return await process_batch_address(address, start, end, client, include_transactions)
+            except Exception as e:
+                return _address_error(address, e)
+
+        tasks = [asyncio.ensure_future(run_one(addr)) for addr in addresses]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield batch.claim(await next_done)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def process_addresses_async(
+    addresses: List[str],
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    include_transactions: bool = False,
+) -> List[Dict[str, Any]]:
     """
-    known_origins = load_known_origins()
-    if not known_origins:
-        logger.warning("No known origins loaded. Matches will be empty.")
-    else:
-        logger.info(f"Loaded {len(known_origins)} known origins for matching.")
+    Process multiple Ethereum addresses asynchronously, optionally within a time range.
+    Each distinct address is fetched once, unless a recent batch already fetched it, and
+    transactions shared between addresses are returned in full only with the first
+    address (in request order) that has them.
+    """
+    sync_known_origins()
 
+    addresses = unique_batch_addresses(addresses)
     logger.info(f"Processing {len(addresses)} addresses.")
-    tasks = [process_address(addr, known_origins) for addr in addresses]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    batch = BatchTransactions()
+    async with httpx.AsyncClient(timeout=10) as client:
+        tasks = [process_batch_address(addr, start, end, client, include_transactions) for addr in addresses]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
 
     processed_results = []
     for i, result in enumerate(results):
         if isinstance(result, Exception):
-            logger.error(f"Error processing address {addresses[i]}: {result}")
-            processed_results.append({
-                "address": addresses[i],
-                "status": "ERROR",
-                "details": str(result),
-                "known_origins": [],
-                "transactions": []
-            })
+            processed_results.append(_address_error(addresses[i], result))
         else:
-            processed_results.append(result)
+            processed_results.append(batch.claim(result))
 
     return processed_results
+
@@ -0,0 +1,234 @@
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from api.tools.time_windows import SECONDS_PER_DAY
+from api.turnqey.activity_patterns import ActivityTimeline
+
+# Logging configuration
+logger = logging.getLogger(__name__)
+
+# Columns of the counterparty feature matrix
+FEATURE_NAMES = (
+    "flagged",
+    "hop_distance",
+    "proximity",
+    "value_share",
+    "first_seen_age_days",
+    "error_rate",
+    "log_transactions",
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+# Score tiers; flagged counterparties are reported separately, as in fraudRiskSummary
+HIGH_RISK_SCORE = 0.7
+MODERATE_RISK_SCORE = 0.4
+
+DEFAULT_RISK_MODEL = "logistic"
+DEFAULT_REPORTED_COUNTERPARTIES = 25
+
+
+class LogisticRiskModel:
+    """
+    Logistic regression over the feature matrix: score = sigmoid(X @ weights + bias).
+
+    Weights are keyed by feature name; features without a weight are ignored.
+    """
+
+    def __init__(self, name: str, weights: Dict[str, float], bias: float = 0.0):
+        unknown = set(weights) - set(FEATURE_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown risk features: {', '.join(sorted(unknown))}")
+        self.name = name
+        self.bias = bias
+        self.weights = np.zeros(len(FEATURE_NAMES))
+        for feature, weight in weights.items():
+            self.weights[FEATURE_INDEX[feature]] = weight
+
+    def score(self, features: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-(features @ self.weights + self.bias)))
+
+
+# Hand-tuned defaults: flagged and close-to-flagged counterparties dominate; new,
+# rarely used, error-prone or value-heavy counterparties add risk, long history removes it.
+RISK_MODELS: Dict[str, Any] = {
+    DEFAULT_RISK_MODEL: LogisticRiskModel(
+        DEFAULT_RISK_MODEL,
+        {
+            "flagged": 6.0,
+            "proximity": 3.0,
+            "value_share": 2.0,
+            "first_seen_age_days": -0.01,
+            "error_rate": 2.5,
+            "log_transactions": -0.6,
+        },
+        bias=0.5,
+    ),
+}
+
+
+def register_risk_model(model) -> None:
+    """
+    Make a model selectable by name. Any object with `name` and a vectorized
+    `score(features) -> scores in [0, 1]` over the FEATURE_NAMES columns works.
+    """
+    RISK_MODELS[model.name] = model
+
+
+def get_risk_model(name: Optional[str] = None):
+    model = RISK_MODELS.get(name or DEFAULT_RISK_MODEL)
+    if model is None:
+        raise ValueError(f"Unknown risk model: {name}. Available: {', '.join(RISK_MODELS)}.")
+    return model
+
+
+def timeline_stats(timeline: ActivityTimeline, peer_ids: np.ndarray):
+    """
+    First-seen timestamp and failed transaction count of each peer id, from the merged timeline.
+
+    Unseen peers get a first-seen of -1 and no errors.
+    """
+    known, first_index, inverse = np.unique(timeline.peers, return_index=True, return_inverse=True)
+    errors = np.bincount(inverse, weights=timeline.errors, minlength=len(known))
+
+    slots = np.searchsorted(known, peer_ids).clip(max=max(len(known) - 1, 0))
+    found = known[slots] == peer_ids if len(known) else np.zeros(len(peer_ids), dtype=bool)
+    first_seen = np.full(len(peer_ids), -1, dtype=np.int64)
+    error_counts = np.zeros(len(peer_ids))
+    first_seen[found] = timeline.timestamps[first_index[slots[found]]]
+    error_counts[found] = errors[slots[found]]
+    return first_seen, error_counts
+
+
+def build_feature_matrix(
+    counts: np.ndarray,
+    flagged: np.ndarray,
+    hops: Optional[np.ndarray],
+    values: np.ndarray,
+    first_seen: np.ndarray,
+    errors: np.ndarray,
+    now: int,
+) -> np.ndarray:
+    """
+    One row per counterparty, one column per FEATURE_NAMES entry, computed column-wise.
+
+    `hops` is None when the exposure index has not been built; unreached
+    counterparties have hop_distance -1 and proximity 0.
+    """
+    n = len(counts)
+    features = np.zeros((n, len(FEATURE_NAMES)))
+    features[:, FEATURE_INDEX["flagged"]] = flagged
+    if hops is not None:
+        reached = hops >= 0
+        features[:, FEATURE_INDEX["hop_distance"]] = hops
+        features[reached, FEATURE_INDEX["proximity"]] = 1.0 / (1.0 + hops[reached])
+    else:
+        features[:, FEATURE_INDEX["hop_distance"]] = -1
+    total_value = values.sum()
+    if total_value > 0:
+        features[:, FEATURE_INDEX["value_share"]] = values / total_value
+    seen = first_seen >= 0
+    features[seen, FEATURE_INDEX["first_seen_age_days"]] = (now - first_seen[seen]) / SECONDS_PER_DAY
+    features[:, FEATURE_INDEX["error_rate"]] = errors / np.maximum(counts, 1)
+    features[:, FEATURE_INDEX["log_transactions"]] = np.log1p(counts)
+    return features
+
+
+def risk_tier(score: float) -> str:
+    if score >= HIGH_RISK_SCORE:
+        return "High"
+    if score >= MODERATE_RISK_SCORE:
+        return "Moderate"
+    return "Low"
+
+
+def summarize_risk_scores(
+    counterparties: Sequence[str],
+    features: np.ndarray,
+    scores: np.ndarray,
+    flagged: np.ndarray,
+    model_name: str,
+    top_n: int = DEFAULT_REPORTED_COUNTERPARTIES,
+) -> Dict[str, Any]:
+    """
+    Tier counts over all counterparties and the top_n highest scores with their features.
+    """
+    unflagged = scores[~flagged]
+    high = int(np.count_nonzero(unflagged >= HIGH_RISK_SCORE))
+    moderate = int(np.count_nonzero(unflagged >= MODERATE_RISK_SCORE)) - high
+
+    # Partial selection keeps the ranking linear in the counterparty count
+    top = np.argpartition(-scores, top_n - 1)[:top_n] if len(scores) > top_n else np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return {
+        "model": model_name,
+        "features": list(FEATURE_NAMES),
+        "scoredCounterparties": len(scores),
+        "summary": {
+            "Low": len(unflagged) - high - moderate,
+            "Moderate": moderate,
+            "High": high,
+            "Flagged": int(np.count_nonzero(flagged)),
+        },
+        "counterparties": [
+            {
+                "address": counterparties[i],
+                "score": round(float(scores[i]), 4),
+                "tier": "Flagged" if flagged[i] else risk_tier(scores[i]),
+                "features": {name: round(float(features[i, j]), 6) for j, name in enumerate(FEATURE_NAMES)},
+            }
+            for i in top.tolist()
+        ],
+    }
+
+
+def score_counterparties(
+    counterparties: Sequence[str],
+    counts: np.ndarray,
+    flagged: np.ndarray,
+    hops: Optional[np.ndarray],
+    values: np.ndarray,
+    first_seen: np.ndarray,
+    errors: np.ndarray,
+    now: int,
+    model_name: Optional[str] = None,
+    top_n: int = DEFAULT_REPORTED_COUNTERPARTIES,
+) -> Dict[str, Any]:
+    """
+    Score every counterparty at once with the selected model and summarize the result.
+    """
+    model = get_risk_model(model_name)
+    features = build_feature_matrix(counts, flagged, hops, values, first_seen, errors, now)
+    scores = np.asarray(model.score(features), dtype=np.float64)
+    return summarize_risk_scores(counterparties, features, scores, flagged, model.name, top_n)
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    rng = np.random.default_rng(7)
+    n = 200_000
+    now = 1_700_000_000
+    counts = rng.zipf(1.5, n).clip(max=10_000)
+    arguments = (
+        [f"0x{i:040x}" for i in range(n)],
+        counts,
+        rng.random(n) < 0.001,
+        rng.integers(-1, 5, n).astype(np.int16),
+        rng.random(n) * counts,
+        now - rng.integers(0, 1000 * SECONDS_PER_DAY, n),
+        rng.binomial(counts, 0.02).astype(np.float64),
+        now,
+    )
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        result = score_counterparties(*arguments)
+        timings.append(time.perf_counter() - started)
+    print(json.dumps({
+        "counterparties": n,
+        "score_ms": round(min(timings) * 1000, 3),
+        "summary": result["summary"],
+    }, indent=4))
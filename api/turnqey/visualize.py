@@ -1,6 +1,6 @@
 import asyncio
+from jinja2 import Template
 from pyvis.network import Network
-from collections import defaultdict
 import json
 import os
 import base64
@@ -8,6 +8,8 @@ import logging
 from firebase_admin import credentials, storage
 import firebase_admin
 from api.tools.etherscanv2 import get_transaction_data, is_valid_ethereum_address
+from api.tools.edge_cache import queue_transactions
+from api.tools.relationship_graph import COUNT, OTHERS_NODE, TOTAL_VALUE, build_relationship_graph
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -47,36 +49,63 @@ except ValueError as e:
     logger.error(f"Firebase initialization failed: {e}")
     raise
 
+# Counterparties drawn individually; the rest are collapsed into one node
+DEFAULT_MAX_COUNTERPARTIES = 50
+
 # Helper to shorten Ethereum addresses
 def shorten_address(address, length=6):
     return f"{address[:length]}...{address[-length:]}" if len(address) > 2 * length else address
 
 # Fetch transactions for a wallet and build relationships
 async def build_relationships(root_address):
-    """Builds parent-child relationships for a wallet."""
+    """Builds the weighted relationship graph of a wallet's transactions."""
     try:
         transactions = await get_transaction_data(root_address)
-        relationships = defaultdict(list)
-
-        for chain_data in transactions:
-            for tx in chain_data.get("transactions", []):
-                from_address = tx.get("from", "").lower()
-                to_address = tx.get("to", "").lower()
-
-                if from_address and from_address != root_address.lower():
-                    relationships[root_address].append(from_address)
-                if to_address and to_address != root_address.lower():
-                    relationships[root_address].append(to_address)
-
-        return relationships
+        queue_transactions(transactions)
+        return build_relationship_graph(transactions)
     except Exception as e:
         logger.error(f"Error building relationships for {root_address}: {e}")
         raise
 
+# Render a PyVis network to an HTML string without touching the filesystem
+def render_network_html(net):
+    """Renders the network's HTML in memory (net.show would write a file and open a browser)."""
+    if hasattr(net, "generate_html"):
+        return net.generate_html()
+
+    # pyvis 0.1.x only renders inside write_html; render its template the same way here
+    with open(net.path) as f:
+        template = Template(f.read())
+    nodes, edges, heading, height, width, options = net.get_network_data()
+    if isinstance(net.options, dict):
+        physics_enabled = net.options.get("physics", {}).get("enabled", True)
+    else:
+        physics_enabled = net.options.physics.enabled
+    return template.render(
+        height=height,
+        width=width,
+        nodes=nodes,
+        edges=edges,
+        heading=heading,
+        options=options,
+        physics_enabled=physics_enabled,
+        use_DOT=net.use_DOT,
+        dot_lang=net.dot_lang,
+        widget=net.widget,
+        bgcolor=net.bgcolor,
+        conf=net.conf,
+        tooltip_link=False,
+    )
+
 # Visualize relationships using PyVis
-def visualize_relationships(relationships, root_address):
-    """Visualizes relationships using PyVis."""
-    net = Network(height="1000px", width="100%", bgcolor="#222222", font_color="white")
+def visualize_relationships(graph, root_address, max_counterparties=DEFAULT_MAX_COUNTERPARTIES):
+    """
+    Renders the relationship graph to HTML, keeping the top counterparties by
+    transaction count and collapsing the rest into one "others" node.
+    """
+    graph, collapsed = graph.collapse(root_address, max_counterparties)
+
+    net = Network(height="1000px", width="100%", bgcolor="#222222", font_color="white", directed=True)
     net.set_options("""{
         "physics": {
             "solver": "forceAtlas2Based"
@@ -88,29 +117,35 @@ def visualize_relationships(relationships, root_address):
     }""")
 
     # Add nodes and edges
-    for parent, children in relationships.items():
-        net.add_node(parent, label=shorten_address(parent), color="purple", shape="star")
-        for child in children:
-            net.add_node(child, label=shorten_address(child), color="blue")
-            net.add_edge(parent, child)
-
-    # Save the visualization locally
-    output_file = f"{shorten_address(root_address)}_family_tree.html"
-    net.show(output_file)
-    return output_file
+    root = root_address.lower()
+    for address in graph.addresses:
+        if address == root:
+            net.add_node(address, label=shorten_address(address), color="purple", shape="star")
+        elif address == OTHERS_NODE:
+            net.add_node(address, label=f"{collapsed} others", color="gray", shape="dot")
+        else:
+            net.add_node(address, label=shorten_address(address), color="blue")
+    for from_addr, to_addr, stats in graph.edges():
+        net.add_edge(
+            from_addr,
+            to_addr,
+            value=stats[COUNT],
+            title=f"{stats[COUNT]} transactions, {stats[TOTAL_VALUE]:.6f} ETH",
+        )
+
+    return render_network_html(net)
 
 # Upload visualization to Firebase
-def upload_to_firebase(local_path, root_address):
-    """Uploads the visualization to Firebase and returns the public URL."""
-    blob_path = f"visualizations/{shorten_address(root_address)}_family_tree.html"
+def upload_to_firebase(html, root_address):
+    """Uploads the rendered visualization to Firebase and returns the public URL."""
+    blob_path = f"visualizations/{root_address.lower()}_family_tree.html"
     blob = bucket.blob(blob_path)
-    with open(local_path, "rb") as f:
-        blob.upload_from_file(f, content_type="text/html")
+    blob.upload_from_string(html, content_type="text/html")
     blob.make_public()
     return blob.public_url
 
 # Main function to create visualization
-async def create_visualization(wallet_address):
+async def create_visualization(wallet_address, max_counterparties=DEFAULT_MAX_COUNTERPARTIES):
     """Generates and uploads a visualization for a wallet."""
     try:
         # Validate wallet address
@@ -118,19 +153,13 @@ async def create_visualization(wallet_address):
             raise ValueError("Invalid Ethereum address.")
 
         # Build relationships
-        relationships = await build_relationships(wallet_address)
-        if not relationships:
+        graph = await build_relationships(wallet_address)
+        if not len(graph):
             raise ValueError("No transactions or relationships found for this wallet.")
 
-        # Generate visualization
-        visualization_path = visualize_relationships(relationships, wallet_address)
-
-        # Upload visualization to Firebase
-        firebase_url = upload_to_firebase(visualization_path, wallet_address)
-
-        # Clean up local files
-        if os.path.exists(visualization_path):
-            os.remove(visualization_path)
+        # Render in memory and upload; nothing is written locally, so concurrent requests cannot collide
+        html = visualize_relationships(graph, wallet_address, max_counterparties)
+        firebase_url = upload_to_firebase(html, wallet_address)
 
         return {"visualization_url": firebase_url}
 
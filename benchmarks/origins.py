@@ -0,0 +1,121 @@
+"""
+Peak RSS of origins.process_address on synthetic wallets, served page by
+page through an httpx.MockTransport at Etherscan's real rate limit.
+
+    python -m benchmarks.origins
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import tempfile
+import multiprocessing
+from typing import Any, Dict
+
+os.environ.setdefault("IDEFI_CACHE_DIR", tempfile.mkdtemp(prefix="origins-benchmark-"))
+
+import httpx
+
+from api.tools.etherscanv2 import SUPPORTED_CHAINS
+from api.turnqey.origins import process_address, sync_known_origins
+
+WALLET = f"0x{1:040x}"
+FIRST_BLOCK = 1_000_000
+TRANSACTIONS_PER_BLOCK = 3
+
+
+class SyntheticEtherscan:
+    """
+    txlist for one wallet on Ethereum whose transaction i is derived from i
+    alone, so pages are generated on request and the server holds nothing.
+    """
+
+    def __init__(self, num_transactions: int, num_counterparties: int, seed: int = 7):
+        rng = random.Random(seed)
+        self.num_transactions = num_transactions
+        self.peers = [f"0x{rng.getrandbits(160):040x}" for _ in range(num_counterparties)]
+        self.seed = seed
+
+    def transaction(self, i: int) -> Dict[str, Any]:
+        rng = random.Random(self.seed * 1_000_003 + i)
+        peer = self.peers[rng.randrange(len(self.peers))]
+        sender, recipient = (WALLET, peer) if i % 2 else (peer, WALLET)
+        return {
+            "hash": f"0x{i:064x}",
+            "blockNumber": str(FIRST_BLOCK + i // TRANSACTIONS_PER_BLOCK),
+            "timeStamp": str(1_600_000_000 + i * 4),
+            "from": sender,
+            "to": recipient,
+            "value": str(rng.randrange(10**18)),
+            "gas": "21000",
+            "gasPrice": "1000000000",
+            "gasUsed": "21000",
+            "isError": "0",
+            "functionName": "transfer(address,uint256)",
+        }
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if params.get("chainid") != str(SUPPORTED_CHAINS["ethereum"]):
+            return httpx.Response(200, json={"status": "0", "message": "No transactions found", "result": []})
+        first = max(0, (int(params.get("startblock", 0)) - FIRST_BLOCK) * TRANSACTIONS_PER_BLOCK)
+        last = min(self.num_transactions, first + int(params.get("offset", 10_000)))
+        rows = [self.transaction(i) for i in range(first, last)]
+        if not rows:
+            return httpx.Response(200, json={"status": "0", "message": "No transactions found", "result": []})
+        return httpx.Response(200, json={"status": "1", "message": "OK", "result": rows})
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def _measure(num_transactions: int, num_counterparties: int, include_transactions: bool, results) -> None:
+    server = SyntheticEtherscan(num_transactions, num_counterparties)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as client:
+            return await process_address(WALLET, client=client, include_transactions=include_transactions)
+
+    # Reset the peak RSS of this forked child so only the run is measured
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline = _status_kb("VmRSS:")
+    started = time.perf_counter()
+    result = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    results.put({
+        "transactions": result.get("transaction_count", 0),
+        "counterparties": num_counterparties,
+        "include_transactions": include_transactions,
+        "seconds": round(elapsed, 2),
+        "peak_rss_mb": round((_status_kb("VmHWM:") - baseline) / 1024, 1),
+        "labeled_addresses": len(result.get("address_labels", {})),
+    })
+
+
+def benchmark():
+    """
+    Peak RSS above the process baseline for each wallet size, with and
+    without the returned transaction list, each in a fresh forked process.
+    """
+    sync_known_origins()
+    context = multiprocessing.get_context("fork")
+    report = []
+    for num_transactions, num_counterparties in ((50_000, 1_000), (200_000, 1_000), (200_000, 20_000)):
+        for include_transactions in (False, True):
+            results = context.Queue()
+            child = context.Process(target=_measure, args=(num_transactions, num_counterparties, include_transactions, results))
+            child.start()
+            report.append(results.get())
+            child.join()
+    return report
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=4))
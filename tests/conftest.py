@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import tempfile
+
+import pytest
+
+# The API modules read these at import time
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("NEXT_PUBLIC_ETHERSCAN_API_KEY", "test-key")
+os.environ.setdefault("IDEFI_CACHE_DIR", tempfile.mkdtemp(prefix="idefi-tests-"))
+
+
+def address(n: int) -> str:
+    return f"0x{n:040x}"
+
+
+def write_tree(directory, root: str, parents, children=None) -> str:
+    from api.tools.family_tree_store import family_tree_filename
+
+    path = os.path.join(str(directory), family_tree_filename(root))
+    with open(path, "w") as f:
+        json.dump({"grandfather": root, "parents": list(parents), "children": children or {}}, f)
+    return path
+
+
+@pytest.fixture
+def tree_store(tmp_path, monkeypatch):
+    """
+    A family tree store built from two small trees in a temporary data directory,
+    installed as the process-wide store.
+    """
+    from api.tools import family_tree_store
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    store_path = str(data_dir / "family_trees.bin")
+    pattern = str(data_dir / "*_family_tree.json")
+    write_tree(data_dir, address(1), [address(2), address(3)], {address(2): [address(4)]})
+    write_tree(data_dir, address(10), [address(11)], {address(11): [address(12), address(13)]})
+    family_tree_store.convert_family_trees(sorted(data_dir.glob("*_family_tree.json")), store_path)
+
+    monkeypatch.setattr(family_tree_store, "FAMILY_TREE_STORE_PATH", store_path)
+    monkeypatch.setattr(family_tree_store, "FAMILY_TREE_GLOB", pattern)
+    monkeypatch.setattr(family_tree_store, "load_family_tree_store", lambda: family_tree_store.FamilyTreeStore(store_path))
+    monkeypatch.setattr(family_tree_store, "is_store_stale", lambda: False)
+    monkeypatch.setattr(family_tree_store, "_store", None)
+    monkeypatch.setattr(family_tree_store, "_store_mtime", None)
+    return {"dir": data_dir, "path": store_path, "pattern": pattern}
+
+
+# Synthetic chains mine one block every BLOCK_TIME seconds from GENESIS
+GENESIS = 1_600_000_000
+BLOCK_TIME = 12
+
+
+def raw_tx(block: int, sender: str, recipient: str, value_wei: int = 10**18, function_name: str = "", tx_hash=None, is_error="0"):
+    """
+    One transaction in Etherscan's raw txlist form.
+    """
+    return {
+        "blockNumber": str(block),
+        "timeStamp": str(GENESIS + block * BLOCK_TIME),
+        "hash": tx_hash or f"0x{block:08x}{sender[-6:]}{recipient[-6:]}",
+        "from": sender,
+        "to": recipient,
+        "value": str(value_wei),
+        "gas": "21000",
+        "gasPrice": str(10**9),
+        "gasUsed": "21000",
+        "isError": is_error,
+        "functionName": function_name,
+    }
+
+
+class FakeEtherscan:
+    """
+    Serves txlist, eth_getTransactionCount and getblocknobytime from in-memory
+    chains through an httpx.MockTransport and records every request.
+
+    txlist requests without an offset are capped at `result_cap` rows, like
+    Etherscan's 10,000 result limit; `failing` addresses always get HTTP 500.
+    """
+
+    def __init__(self, result_cap: int = 10000):
+        import httpx
+
+        self.chains = {}
+        self.requests = []
+        self.result_cap = result_cap
+        self.failing = set()
+        self.transport = httpx.MockTransport(self.handle)
+
+    def add(self, chain_name: str, transactions) -> None:
+        from api.tools.etherscanv2 import SUPPORTED_CHAINS
+
+        chain = self.chains.setdefault(str(SUPPORTED_CHAINS[chain_name]), [])
+        chain.extend(transactions)
+        chain.sort(key=lambda tx: int(tx["blockNumber"]))
+
+    def count(self, action: str = "txlist", address=None) -> int:
+        return sum(
+            1 for params in self.requests
+            if params["action"] == action and (address is None or params.get("address", "").lower() == address.lower())
+        )
+
+    def handle(self, request):
+        import httpx
+
+        params = dict(request.url.params)
+        self.requests.append(params)
+        wallet = params.get("address", "").lower()
+        if wallet in self.failing:
+            return httpx.Response(500, text="boom")
+        chain = self.chains.get(params["chainid"], [])
+
+        if params["action"] == "txlist":
+            start, end = int(params.get("startblock", 0)), int(params.get("endblock", 99999999))
+            rows = [
+                tx for tx in chain
+                if wallet in (tx["from"].lower(), tx["to"].lower()) and start <= int(tx["blockNumber"]) <= end
+            ]
+            if "offset" in params:
+                page, offset = int(params.get("page", 1)), int(params["offset"])
+                rows = rows[(page - 1) * offset:page * offset]
+            else:
+                rows = rows[:self.result_cap]
+            if not rows:
+                return httpx.Response(200, json={"status": "0", "message": "No transactions found", "result": []})
+            return httpx.Response(200, json={"status": "1", "message": "OK", "result": rows})
+
+        if params["action"] == "eth_getTransactionCount":
+            nonce = sum(1 for tx in chain if tx["from"].lower() == wallet)
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": 1, "result": hex(nonce)})
+
+        if params["action"] == "getblocknobytime":
+            elapsed = int(params["timestamp"]) - GENESIS
+            block = elapsed // BLOCK_TIME if params.get("closest") == "before" else -(-elapsed // BLOCK_TIME)
+            return httpx.Response(200, json={"status": "1", "message": "OK", "result": str(max(block, 0))})
+
+        return httpx.Response(400, json={"status": "0", "message": "Unknown action", "result": None})
+
+
+@pytest.fixture
+def etherscan(monkeypatch):
+    """
+    A FakeEtherscan that every httpx.AsyncClient talks to, with the rate limit delay removed.
+    """
+    import httpx
+
+    from api.tools import etherscanv2
+
+    fake = FakeEtherscan()
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(etherscanv2, "RATE_LIMIT_DELAY", 0)
+    monkeypatch.setattr(httpx, "AsyncClient", lambda *args, **kwargs: real_client(*args, **{**kwargs, "transport": fake.transport}))
+    return fake
+
+
+@pytest.fixture
+def metrics_state(tmp_path, monkeypatch):
+    """
+    The metrics_state module writing to a fresh database in a temporary directory.
+    """
+    from api.turnqey import metrics_state
+
+    monkeypatch.setattr(metrics_state, "METRICS_STATE_PATH", str(tmp_path / "metrics_state.db"))
+    return metrics_state
+
+
+@pytest.fixture
+def label_store(tmp_path, monkeypatch):
+    """
+    The label_store module writing to a fresh database in a temporary directory.
+    """
+    from api.tools import label_store
+
+    monkeypatch.setattr(label_store, "LABEL_STORE_PATH", str(tmp_path / "labels.db"))
+    return label_store
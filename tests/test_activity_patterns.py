@@ -0,0 +1,62 @@
+import numpy as np
+
+from api.tools.time_windows import SECONDS_PER_DAY
+from api.turnqey.activity_patterns import ActivityTimeline, analyze_activity, synthetic_timeline
+
+START = 1_600_000_000
+
+
+def planted_timeline():
+    """
+    Daily activity for 100 days, 100 dormant days, then a busy restart with a
+    20-transaction burst and a fan-out to 12 new addresses within 20 minutes.
+    """
+    daily = START + np.arange(100) * SECONDS_PER_DAY
+    restart = START + 200 * SECONDS_PER_DAY
+    burst = restart + np.arange(20) * 30
+    fan_out = restart + 3 * SECONDS_PER_DAY + np.arange(12) * 100
+    timestamps = np.concatenate([fan_out, daily, burst]).astype(np.int64)
+
+    n = len(timestamps)
+    peers = np.zeros(n, dtype=np.int64)
+    peers[:12] = np.arange(100, 112)
+    outgoing = np.zeros(n, dtype=bool)
+    outgoing[:12] = True
+    values = np.ones(n)
+    return ActivityTimeline(timestamps, values, peers, outgoing)
+
+
+def test_planted_patterns_are_flagged():
+    result = analyze_activity(planted_timeline())
+    assert result["transactionsAnalyzed"] == 132
+    assert result["flags"] == ["activity_burst", "dormant_reactivation", "rapid_fan_out"]
+
+    # The fan-out is also a burst; it starts right after the first one in index order but days later
+    assert result["bursts"]["count"] == 2
+    burst = result["bursts"]["episodes"][0]
+    assert burst["transactions"] == 20 and burst["valueMoved"] == 20.0
+
+    dormancy = result["dormancy"]
+    assert dormancy["count"] == 1 and dormancy["longestGapDays"] == 101.0
+    assert dormancy["periods"][0]["transactionsAfter"] == 32 and dormancy["periods"][0]["reactivated"]
+
+    fan_out = result["fanOut"]
+    assert fan_out["count"] == 1
+    assert fan_out["episodes"][0]["counterparties"] == 12 and fan_out["episodes"][0]["valueOut"] == 12.0
+
+
+def test_steady_wallet_has_no_flags():
+    timestamps = START + np.arange(300, dtype=np.int64) * SECONDS_PER_DAY // 2
+    peers = np.arange(300, dtype=np.int64)
+    timeline = ActivityTimeline(timestamps, np.ones(300), peers, np.ones(300, dtype=bool))
+    result = analyze_activity(timeline)
+    assert result["flags"] == []
+    assert result["dormancy"]["periods"] == [] and result["fanOut"]["episodes"] == []
+    assert analyze_activity(ActivityTimeline(*(np.zeros(0),) * 4))["flags"] == []
+
+
+def test_synthetic_timeline_finds_every_planted_pattern():
+    result = analyze_activity(synthetic_timeline(num_transactions=20_000))
+    assert result["flags"] == ["activity_burst", "dormant_reactivation", "rapid_fan_out"]
+    assert result["dormancy"]["periods"][0]["gapDays"] >= 120
+    assert result["fanOut"]["episodes"][0]["counterparties"] >= 50
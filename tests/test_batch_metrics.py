@@ -0,0 +1,43 @@
+import asyncio
+
+from api.turnqey import metrics
+from api.turnqey.metrics import calculate_batch_metrics
+
+from conftest import address
+
+
+def test_batch_streams_results_and_isolates_failures(monkeypatch):
+    wallets = [address(i) for i in range(1, 7)]
+    snapshots = []
+    calls = {"running": 0, "peak": 0, "clients": set(), "flagged": set()}
+
+    async def fake_metrics(wallet_address, chains, flagged_addresses, client, mode="auto"):
+        calls["running"] += 1
+        calls["peak"] = max(calls["peak"], calls["running"])
+        calls["clients"].add(id(client))
+        calls["flagged"].add(id(flagged_addresses))
+        # Later wallets finish first
+        await asyncio.sleep(0.01 * (len(wallets) - wallets.index(wallet_address)))
+        calls["running"] -= 1
+        if wallet_address == address(3):
+            raise RuntimeError("boom")
+        return {"wallet": wallet_address, "chains": chains}
+
+    monkeypatch.setattr(metrics, "load_and_validate_flagged_data", lambda: snapshots.append(1) or {address(99)})
+    monkeypatch.setattr(metrics, "calculate_metrics", fake_metrics)
+
+    async def collect():
+        return [event async for event in calculate_batch_metrics(wallets, ["ethereum"], concurrency=2)]
+
+    events = asyncio.run(collect())
+    assert events[-1] == {"event": "done", "total": 6}
+    results = events[:-1]
+    assert [e["completed"] for e in results] == list(range(1, 7))
+    assert all(e["total"] == 6 for e in results)
+    assert sorted(e["wallet_address"] for e in results) == wallets
+    assert [e["wallet_address"] for e in results if e["event"] == "error"] == [address(3)]
+    assert next(e for e in results if e["wallet_address"] == address(1))["metrics"] == {"wallet": address(1), "chains": ["ethereum"]}
+
+    # One flagged snapshot and one client for the whole batch, at most `concurrency` wallets in flight
+    assert len(snapshots) == 1 and len(calls["flagged"]) == 1 and len(calls["clients"]) == 1
+    assert calls["peak"] == 2
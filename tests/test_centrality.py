@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from api.tools import centrality
+from api.tools.address_graph import AddressGraph
+from api.tools.centrality import build_centrality_index, lookup_centrality, pagerank, rank_by_centrality
+
+from conftest import address
+
+
+def dense_pagerank(n, src, dst, damping=0.85, iterations=200):
+    matrix = np.zeros((n, n))
+    for s, d in zip(src, dst):
+        matrix[d, s] += 1
+    out_degree = matrix.sum(axis=0)
+    matrix = np.where(out_degree > 0, matrix / np.maximum(out_degree, 1), 1.0 / n)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        rank = damping * matrix @ rank + (1.0 - damping) / n
+    return rank
+
+
+def test_pagerank_matches_dense_power_iteration():
+    rng = np.random.default_rng(3)
+    n = 30
+    src, dst = rng.integers(0, n, 80), rng.integers(0, n, 80)
+    graph = AddressGraph(np.arange(n).astype("S20"), src, dst)
+
+    directed = pagerank(graph, directed=True)
+    assert np.allclose(directed, dense_pagerank(n, src, dst), atol=1e-8)
+    assert np.isclose(directed.sum(), 1.0)
+    undirected = pagerank(graph)
+    assert np.allclose(undirected, dense_pagerank(n, np.concatenate([src, dst]), np.concatenate([dst, src])), atol=1e-8)
+
+
+@pytest.fixture
+def built_index(tree_store, tmp_path, monkeypatch):
+    path = str(tmp_path / "centrality_index.npy")
+    monkeypatch.setattr(centrality, "CENTRALITY_INDEX_PATH", path)
+    monkeypatch.setattr(centrality, "load_flagged_data", lambda: [{"grandparent": address(11), "parents": [address(20), address(21), address(22)]}])
+    monkeypatch.setattr(centrality, "_centrality_index", None)
+    return build_centrality_index(path)
+
+
+def test_index_ranks_hubs_first(built_index):
+    # address(11) links its root, two children and three flagged parents
+    assert built_index["addresses"] == 11
+    top = lookup_centrality(address(11))
+    assert top["rank"] == 1 and top["percentile"] == 1.0 and top["of"] == 11
+    assert lookup_centrality(address(99)) is None
+
+    ranked = rank_by_centrality([address(99), address(4), address(11), address(2)], top_n=2)
+    assert [entry["address"] for entry in ranked] == [address(11), address(2)]
+    assert ranked[0]["score"] > ranked[1]["score"]
+    assert rank_by_centrality([address(99)]) == []
+
+
+def test_lookups_are_skipped_until_the_index_is_built(tmp_path, monkeypatch):
+    monkeypatch.setattr(centrality, "CENTRALITY_INDEX_PATH", str(tmp_path / "missing.npy"))
+    monkeypatch.setattr(centrality, "_centrality_index", None)
+    assert lookup_centrality(address(1)) is None
+    assert rank_by_centrality([address(1)]) is None
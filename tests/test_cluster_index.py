@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from api.tools import cluster_index
+from api.tools.cluster_index import ClusterIndex, get_cluster_index
+from api.tools.family_tree_store import convert_family_trees
+
+from conftest import address, write_tree
+
+
+@pytest.fixture
+def shared_index(tree_store, monkeypatch):
+    monkeypatch.setattr(cluster_index, "FAMILY_TREE_GLOB", tree_store["pattern"])
+    monkeypatch.setattr(cluster_index, "load_flagged_data", lambda: [{"grandparent": address(30), "parents": [address(31)]}])
+    monkeypatch.setattr(cluster_index, "_cluster_index", None)
+    return tree_store
+
+
+def test_union_find_merges_edges_and_lists_members():
+    index = ClusterIndex()
+    index.add_edge(address(1), address(2))
+    index.add_edge(address(3), address(4))
+    assert not index.same_cluster(address(1), address(3))
+
+    index.add_edge(address(2), address(3))
+    assert index.same_cluster(address(1), address(4))
+    assert index.cluster_size(address(4)) == 4
+    assert sorted(index.cluster_members(address(1))) == [address(i) for i in range(1, 5)]
+    assert len(index.cluster_members(address(1), limit=2)) == 2
+    assert index.find(address(9)) is None
+    assert index.describe(address(9))["clustered"] is False
+
+
+def test_index_covers_store_flagged_data_and_new_files(shared_index):
+    index = get_cluster_index()
+    assert index.same_cluster(address(1), address(4))
+    assert index.same_cluster(address(10), address(13))
+    assert not index.same_cluster(address(1), address(10))
+    assert index.same_cluster(address(30), address(31))
+
+    write_tree(shared_index["dir"], address(40), [address(4), address(12)])
+    index = get_cluster_index()
+    assert index.same_cluster(address(1), address(10))
+    assert index.describe(address(40))["size"] == 9
+
+
+def test_index_is_rebuilt_when_the_store_reloads(shared_index):
+    first = get_cluster_index()
+    write_tree(shared_index["dir"], address(50), [address(51)])
+    convert_family_trees(sorted(shared_index["dir"].glob("*_family_tree.json")), shared_index["path"])
+    mtime = os.path.getmtime(shared_index["path"]) + 1
+    os.utime(shared_index["path"], (mtime, mtime))
+
+    second = get_cluster_index()
+    assert second is not first
+    described = second.describe(address(51))
+    assert described["cluster_id"] is not None and described["size"] == 2
+    assert second.same_cluster(address(1), address(4))
@@ -0,0 +1,56 @@
+import numpy as np
+
+from conftest import address
+from api.turnqey import common_counterparties
+from api.turnqey.common_counterparties import CounterpartyIncidence, column_groups, common_counterparty_summary, pairwise_overlaps
+
+
+def random_incidence(seed, addresses=40, pool=60):
+    rng = np.random.default_rng(seed)
+    incidence = CounterpartyIncidence()
+    for i in range(addresses):
+        picked = rng.choice(pool, int(rng.integers(0, 25)), replace=False)
+        incidence.add(address(i), [address(1000 + int(c)) for c in picked])
+    return incidence
+
+
+def dense_overlaps(incidence):
+    rows, cols = incidence.coo()
+    matrix = np.zeros((len(incidence), len(incidence.counterparties)), dtype=np.int64)
+    matrix[rows, cols] = 1
+    return np.triu(matrix @ matrix.T, 1)
+
+
+def test_sparse_overlaps_match_dense_product(monkeypatch):
+    # A tiny chunk forces many partial merges
+    monkeypatch.setattr(common_counterparties, "PAIR_CHUNK", 16)
+    for seed in range(3):
+        incidence = random_incidence(seed)
+        rows, cols = incidence.coo()
+        _, starts, degrees = column_groups(rows, cols)
+        first, second, counts = pairwise_overlaps(rows, starts, degrees, len(incidence))
+
+        expected = dense_overlaps(incidence)
+        assert np.all(first < second) and np.all(counts > 0)
+        assert len(counts) == np.count_nonzero(expected)
+        assert np.array_equal(expected[first, second], counts)
+
+
+def test_summary_ranks_pairs_and_handles_unlinked_batches():
+    incidence = CounterpartyIncidence()
+    shared = [address(100 + i) for i in range(3)]
+    incidence.add(address(1), shared + [address(2)])
+    incidence.add(address(2), shared[:2])
+    incidence.add(address(3), shared[:1])
+    summary = common_counterparty_summary(incidence)
+
+    assert summary["linkedPairCount"] == 3
+    top = summary["pairs"][0]
+    assert top["addresses"] == [address(1), address(2)]
+    assert top["commonCounterparties"] == 2 and top["direct"]
+    assert summary["sharedCounterparties"][0] == {"address": shared[0], "sharedBy": 3, "addresses": [address(1), address(2), address(3)]}
+
+    lonely = CounterpartyIncidence()
+    lonely.add(address(1), [address(100)])
+    lonely.add(address(2), [address(101)])
+    assert common_counterparty_summary(lonely)["pairs"] == []
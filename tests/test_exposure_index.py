@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from api.tools import exposure_index
+from api.tools.address_graph import AddressGraph, encode_addresses
+from api.tools.exposure_index import build_exposure_index, lookup_exposure, lookup_hops, multi_source_bfs, summarize_exposure
+
+from conftest import address
+
+
+@pytest.fixture
+def built_index(tree_store, tmp_path, monkeypatch):
+    # A transaction chain hanging off address(4), two hops below root address(1)
+    chain = [address(4)] + [address(50 + i) for i in range(4)]
+    src, _ = encode_addresses(chain[:-1])
+    dst, _ = encode_addresses(chain[1:])
+    path = str(tmp_path / "exposure_index.npy")
+    monkeypatch.setattr(exposure_index, "EXPOSURE_INDEX_PATH", path)
+    monkeypatch.setattr(exposure_index, "load_flagged_data", lambda: [{"grandparent": address(30), "parents": [address(31)]}])
+    monkeypatch.setattr(exposure_index, "load_cached_edges", lambda: (src, dst))
+    monkeypatch.setattr(exposure_index, "_exposure_index", None)
+    return build_exposure_index(path, max_hops=4)
+
+
+def test_bfs_keeps_the_nearest_source():
+    # 0 - 1 - 2 - 3 - 4, sources at both ends
+    graph = AddressGraph(np.arange(5).astype("S20"), np.array([0, 1, 2, 3]), np.array([1, 2, 3, 4]))
+    hops, nearest = multi_source_bfs(graph, np.array([0, 4, -1]), max_hops=1)
+    assert hops.tolist() == [0, 1, -1, 1, 0]
+    assert nearest.tolist() == [0, 0, -1, 4, 4]
+
+
+def test_index_reports_hops_and_nearest_source(built_index):
+    # Roots 1 and 10 plus both flagged addresses are sources
+    assert built_index["sources"] == 4
+    assert lookup_exposure(address(1)) == {"hops": 0, "nearest_flagged_source": address(1)}
+    assert lookup_exposure(address(31)) == {"hops": 0, "nearest_flagged_source": address(31)}
+    assert lookup_exposure(address(13)) == {"hops": 2, "nearest_flagged_source": address(10)}
+    assert lookup_exposure(address(51)) == {"hops": 4, "nearest_flagged_source": address(1)}
+    assert lookup_exposure(address(52)) is None
+
+    assert lookup_hops([address(4), address(50), address(52), "not-an-address"]).tolist() == [2, 3, -1, -1]
+    assert summarize_exposure([address(1), address(2), address(12), address(50)]) == {"0": 1, "1": 1, "2": 1}
+
+
+def test_lookups_are_skipped_until_the_index_is_built(tmp_path, monkeypatch):
+    monkeypatch.setattr(exposure_index, "EXPOSURE_INDEX_PATH", str(tmp_path / "missing.npy"))
+    monkeypatch.setattr(exposure_index, "_exposure_index", None)
+    assert lookup_exposure(address(1)) is None
+    assert lookup_hops([address(1)]) is None
+    assert summarize_exposure([address(1)]) is None
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from api.tools import family_tree_builder
+from api.tools.family_tree_builder import FamilyTreeBuilder, top_counterparties
+
+from conftest import address, raw_tx
+
+ROOT = address(1)
+
+
+@pytest.fixture
+def indexed(monkeypatch):
+    added = []
+    monkeypatch.setattr(family_tree_builder, "queue_transactions", lambda chain_results: None)
+    monkeypatch.setattr(family_tree_builder, "add_family_tree_file", added.append)
+    return added
+
+
+def crawl(etherscan):
+    # The root trades most with address(2), then address(3); each parent has one child
+    etherscan.add("ethereum", [raw_tx(10 + i, ROOT, address(2)) for i in range(3)] + [raw_tx(20, address(3), ROOT)])
+    etherscan.add("ethereum", [raw_tx(30, address(2), address(20)), raw_tx(31, address(3), address(30))])
+
+
+def test_top_counterparties_rank_by_activity():
+    results = [{"chain": "ethereum", "transactions": [
+        {"from": ROOT, "to": address(2), "value_ether": 1.0},
+        {"from": address(3), "to": ROOT, "value_ether": 5.0},
+        {"from": ROOT, "to": address(4), "value_ether": 1.0},
+        {"from": ROOT, "to": address(4), "value_ether": 1.0},
+    ]}]
+    assert top_counterparties(ROOT, results, 2) == [address(4), address(3)]
+
+
+def test_interrupted_crawl_resumes_from_checkpoint(etherscan, indexed, tmp_path):
+    crawl(etherscan)
+    checkpoint = str(tmp_path / "checkpoint.json")
+    options = {"max_parents": 2, "max_children": 5, "checkpoint_path": checkpoint, "output_dir": str(tmp_path)}
+
+    etherscan.failing.add(address(3))
+    with pytest.raises(RuntimeError, match="1 parents could not be expanded"):
+        asyncio.run(FamilyTreeBuilder(ROOT, **options).run())
+    with open(checkpoint) as f:
+        state = json.load(f)
+    assert state["parents"] == [address(2), address(3)]
+    assert state["pending"] == [address(3)]
+    assert indexed == []
+
+    etherscan.failing.clear()
+    fetched = etherscan.count(address=ROOT), etherscan.count(address=address(2))
+    result = asyncio.run(FamilyTreeBuilder(ROOT, **options).run())
+    assert (etherscan.count(address=ROOT), etherscan.count(address=address(2))) == fetched
+    assert result["parents"] == 2 and result["children"] == 4
+
+    with open(result["path"]) as f:
+        tree = json.load(f)
+    assert tree["grandfather"] == ROOT
+    assert tree["parents"] == [address(2), address(3)]
+    assert sorted(tree["children"][address(3)]) == [ROOT, address(30)]
+    assert indexed == [result["path"]]
+    assert not os.path.exists(checkpoint)
+
+
+def test_failed_root_writes_nothing(etherscan, indexed, tmp_path):
+    etherscan.failing.add(ROOT)
+    with pytest.raises(RuntimeError, match="no family tree written"):
+        asyncio.run(FamilyTreeBuilder(ROOT, checkpoint_path=str(tmp_path / "checkpoint.json"), output_dir=str(tmp_path)).run())
+    assert os.listdir(tmp_path) == []
+    with pytest.raises(ValueError):
+        FamilyTreeBuilder("not-an-address")
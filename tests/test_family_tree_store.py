@@ -0,0 +1,40 @@
+import os
+
+from api.tools import family_tree_store
+from api.tools.family_tree_store import FamilyTreeStore, convert_family_trees, get_family_tree_store
+
+from conftest import address, write_tree
+
+
+def test_store_round_trips_trees(tree_store):
+    store = FamilyTreeStore(tree_store["path"])
+
+    assert len(store) == 2
+    assert store.num_addresses == 8
+    assert store.index_of(address(4)) >= 0
+    assert store.index_of(address(99)) == -1
+    assert store.index_of("not an address") == -1
+
+    tree_id = store.trees_containing(address(4))[0]
+    tree = store.tree(tree_id)
+    assert tree["grandfather"] == address(1)
+    assert tree["parents"] == [address(2), address(3)]
+    assert tree["children"][address(2)] == [address(4)]
+
+
+def test_reload_keeps_previous_store_readable(tree_store):
+    first = get_family_tree_store()
+    assert get_family_tree_store() is first
+
+    write_tree(tree_store["dir"], address(20), [address(21)])
+    convert_family_trees(sorted(tree_store["dir"].glob("*_family_tree.json")), tree_store["path"])
+    mtime = os.path.getmtime(tree_store["path"]) + 1
+    os.utime(tree_store["path"], (mtime, mtime))
+
+    second = get_family_tree_store()
+    assert second is not first
+    assert len(second) == 3
+    # Indexes built on the replaced store keep reading through it
+    assert first.address(first.index_of(address(4))) == address(4)
+    assert len(first.trees_containing(address(12))) == 1
+    assert family_tree_store._store is second
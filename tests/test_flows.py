@@ -0,0 +1,63 @@
+import pytest
+
+from api.turnqey.metrics_engine import TransactionColumns, aggregate_flows
+from benchmarks.metrics_engine import SYNTHETIC_WALLET, split_delta, synthetic_chain_results
+
+
+def flow_inputs():
+    results, _ = synthetic_chain_results(num_transactions=2000, num_counterparties=80)
+    # A self transfer pays gas but moves no value; a contract creation has no recipient
+    extra = {"timeStamp": "1600000000", "gasUsed": "50000", "gasPrice": 1e-8, "isError": "0", "functionName": ""}
+    results[0]["transactions"].append({**extra, "blockNumber": "9001", "hash": "0xself", "from": SYNTHETIC_WALLET, "to": SYNTHETIC_WALLET, "value_ether": 3.0})
+    results[0]["transactions"].append({**extra, "blockNumber": "9002", "hash": "0xcreate", "from": SYNTHETIC_WALLET, "to": "", "value_ether": 0.0})
+    return results
+
+
+def reference_flows(results):
+    wallet = SYNTHETIC_WALLET.lower()
+    counterparties, gas = {}, {}
+    for chain_data in results:
+        for tx in chain_data["transactions"]:
+            sender, recipient = tx["from"].lower(), (tx["to"] or "").lower()
+            if sender == wallet:
+                gas[chain_data["chain"]] = gas.get(chain_data["chain"], 0.0) + float(tx["gasUsed"]) * float(tx["gasPrice"])
+            if sender == recipient or not (recipient if sender == wallet else sender):
+                continue
+            other, incoming = (sender, True) if recipient == wallet else (recipient, False)
+            entry = counterparties.setdefault(other, [0.0, 0.0, 0, 0])
+            entry[0 if incoming else 1] += tx["value_ether"]
+            entry[2 if incoming else 3] += 1
+    return counterparties, gas
+
+
+def assert_matches_reference(summary, results):
+    counterparties, gas = reference_flows(results)
+    assert summary["counterparties"] == len(counterparties)
+    assert summary["totalValueIn"] == pytest.approx(sum(e[0] for e in counterparties.values()))
+    assert summary["totalValueOut"] == pytest.approx(sum(e[1] for e in counterparties.values()))
+    assert summary["gasSpentByChain"] == pytest.approx(gas)
+
+    top = sorted(counterparties.items(), key=lambda item: -(item[1][0] + item[1][1]))[:len(summary["topCounterpartiesByValue"])]
+    for entry, (other, (value_in, value_out, tx_in, tx_out)) in zip(summary["topCounterpartiesByValue"], top):
+        assert entry["address"] == other
+        assert (entry["valueIn"], entry["valueOut"]) == (pytest.approx(value_in), pytest.approx(value_out))
+        assert (entry["transactionsIn"], entry["transactionsOut"]) == (tx_in, tx_out)
+
+
+def test_group_by_matches_reference():
+    results = flow_inputs()
+    summary = aggregate_flows(TransactionColumns.from_chain_results(results), SYNTHETIC_WALLET).summary()
+    assert_matches_reference(summary, results)
+
+
+def test_stored_flows_add_up_deltas(metrics_state):
+    results = flow_inputs()
+    history, delta = split_delta(results)
+    metrics_state.merge_transactions(metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET), history)
+    metrics_state.merge_transactions(metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET), delta)
+
+    chains = [chain_data["chain"] for chain_data in results]
+    stored = metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET)
+    assert_matches_reference(stored.flow_summary(chains), results)
+    assert stored.flow_summary(["ethereum"])["counterparties"] == len(reference_flows(results[:1])[0])
+    assert stored.flow_summary(["base"])["totalValueIn"] == 0
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from api.tools.label_store import ANY_CHAIN
+from api.turnqey import origins
+from api.turnqey.origins import KnownOriginsIndex, label_addresses, match_origin, sync_known_origins
+
+from conftest import address
+
+ROUTER = address(0xD00D)
+BRIDGE = address(0xB41D)
+
+
+@pytest.fixture
+def origins_file(tmp_path, label_store, monkeypatch):
+    path = str(tmp_path / "contract_origins.json")
+    with open(path, "w") as f:
+        json.dump([
+            {"name": "Router", "type": "DEX", "address": ROUTER.upper().replace("0X", "0x")},
+            {"name": "BSC Router", "type": "DEX", "address": ROUTER, "chains": ["bsc"]},
+            {"name": "Bridge", "type": "Bridge", "address": BRIDGE, "chains": ["bsc", "polygon"]},
+        ], f)
+    monkeypatch.setattr(origins, "KNOWN_ORIGINS_PATH", path)
+    monkeypatch.setattr(origins, "_synced_mtime", None)
+    return path
+
+
+def test_labels_only_apply_on_their_chains(origins_file, label_store):
+    sync_known_origins()
+    index = KnownOriginsIndex.for_addresses([ROUTER, BRIDGE, address(1)])
+    assert len(index) == 4
+
+    assert index.lookup("bsc", ROUTER)["name"] == "BSC Router"
+    assert index.lookup("ethereum", ROUTER)["name"] == "Router"
+    assert index.lookup("ethereum", BRIDGE) is None
+    assert index.lookup_any(["ethereum", "polygon"], BRIDGE)["name"] == "Bridge"
+    assert index.lookup("ethereum", address(1)) is None
+
+    labels = label_addresses([BRIDGE, ROUTER], index, {BRIDGE: ["ethereum"]})
+    assert labels[BRIDGE]["source"] == "Inferred"
+    assert labels[ROUTER] == {"name": "Router", "type": "DEX", "source": "Known Origin", "label_list": origins.KNOWN_ORIGINS_SOURCE}
+
+    tx = {"hash": "0x1", "chain": "bsc", "from": address(2), "to": ROUTER}
+    assert match_origin(tx, index)["origin_name"] == "BSC Router"
+    assert match_origin({**tx, "to": BRIDGE, "chain": "ethereum"}, index) is None
+
+
+def test_index_is_immutable_and_extends_into_a_copy(origins_file):
+    sync_known_origins()
+    index = KnownOriginsIndex.for_addresses([ROUTER])
+    with pytest.raises(TypeError):
+        index.lookup("bsc", ROUTER)["name"] = "Changed"
+
+    extended = index.extended([BRIDGE])
+    assert extended.lookup("polygon", BRIDGE)["name"] == "Bridge"
+    assert index.lookup("polygon", BRIDGE) is None
+    assert index.extended([address(1)]) is index
+    assert extended.lookup(ANY_CHAIN, ROUTER)["name"] == "Router"
+
+
+def test_sync_imports_only_changed_files(origins_file, label_store):
+    sync_known_origins()
+    sync_known_origins()
+    assert [source["version"] for source in label_store.label_sources()] == [1]
+
+    # A touched but unchanged file is re-read and skipped by checksum
+    stat = os.stat(origins_file)
+    os.utime(origins_file, (stat.st_atime, stat.st_mtime + 10))
+    sync_known_origins()
+    assert [source["version"] for source in label_store.label_sources()] == [1]
+
+    with open(origins_file, "w") as f:
+        json.dump([{"name": "Bridge", "type": "Bridge", "address": BRIDGE}], f)
+    os.utime(origins_file, (stat.st_atime, stat.st_mtime + 20))
+    sync_known_origins()
+    assert [(source["version"], source["labels"]) for source in label_store.label_sources()] == [(2, 1)]
+    assert KnownOriginsIndex.for_addresses([ROUTER, BRIDGE]).lookup("ethereum", BRIDGE)["name"] == "Bridge"
@@ -0,0 +1,30 @@
+from conftest import address
+
+
+def test_malformed_entries_are_skipped(label_store):
+    labels = [
+        {"address": 12345, "name": "number"},
+        {"address": ["0xabc"], "name": "list"},
+        {"address": None, "name": "missing"},
+        {"address": "0xnothex", "name": "bad hex"},
+        {"address": address(2), "name": "bad chains", "chains": 7},
+        "not a dict",
+        {"address": " " + address(1).upper().replace("0X", "0x") + " ", "name": "Exchange", "type": "cex", "chains": "ethereum, base"},
+    ]
+
+    result = label_store.import_labels("list", labels)
+    assert result["imported"] == 2
+    assert label_store.lookup_labels([address(1), address(2)]) == {
+        address(1): {
+            "ethereum": {"name": "Exchange", "type": "cex", "source": "list"},
+            "base": {"name": "Exchange", "type": "cex", "source": "list"},
+        }
+    }
+
+
+def test_reimport_drops_removed_labels(label_store):
+    label_store.import_labels("list", [{"address": address(1), "name": "a"}, {"address": address(2), "name": "b"}])
+    result = label_store.import_labels("list", [{"address": address(2), "name": "b"}])
+
+    assert result == {"source": "list", "version": 2, "imported": 1, "skipped": False}
+    assert set(label_store.lookup_labels([address(1), address(2)])) == {address(2)}
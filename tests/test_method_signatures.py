@@ -0,0 +1,50 @@
+import pytest
+
+from api.tools.method_signatures import NATIVE_TRANSFER, MethodSignature, MethodStats, MethodTable, merge_method_totals, parse_signature
+from api.turnqey.metrics_engine import TransactionColumns, aggregate_methods
+
+from conftest import address
+
+SWAP = "swapExactETHForTokens(uint256 amountOutMin, address[] path, address to, uint256 deadline)"
+
+
+@pytest.mark.parametrize("function_name, expected", [
+    (SWAP, MethodSignature("swapExactETHForTokens", "swapExactETHForTokens(uint256,address[],address,uint256)")),
+    ("fill((address maker, uint256 amount)[] orders, bytes sig)", MethodSignature("fill", "fill((address,uint256)[],bytes)")),
+    ("claim", MethodSignature("claim", "claim()")),
+    ("  ", MethodSignature(NATIVE_TRANSFER, NATIVE_TRANSFER)),
+])
+def test_signatures_are_canonical(function_name, expected):
+    assert parse_signature(function_name) == expected
+
+
+def test_spellings_share_a_code_and_shared_tables_grow_stats():
+    table = MethodTable()
+    codes = table.codes([{"functionName": SWAP}, {}, {"functionName": SWAP.replace("path", "route")}])
+    assert codes.tolist() == [0, 1, 0]
+
+    # Codes interned elsewhere after the stats were created arrive out of order
+    stats = MethodStats(table)
+    table.code("transfer(address to, uint256 value)")
+    stats.add("transfer(address _to, uint256 _value)", 2.0)
+    stats.add(SWAP, 1.0, calls=3)
+    summary = stats.summary(top_n=1)
+    assert summary["distinctMethods"] == 2
+    assert summary["methods"] == [{"method": parse_signature(SWAP).signature, "name": "swapExactETHForTokens", "calls": 3, "totalValue": 1.0}]
+
+
+def test_column_and_stored_method_totals_agree(metrics_state):
+    transactions = [
+        {"blockNumber": str(block), "timeStamp": str(1_600_000_000 + block), "hash": f"0x{block:x}", "from": address(1),
+         "to": address(2), "value_ether": 0.5, "gasUsed": "21000", "gasPrice": 1e-9, "isError": "0", "functionName": name}
+        for block, name in enumerate([SWAP, "", SWAP.replace("deadline", "until"), "claim()"], start=1)
+    ]
+    results = [{"chain": "ethereum", "transactions": transactions[:3]}, {"chain": "base", "transactions": transactions[3:]}]
+    by_chain = aggregate_methods(TransactionColumns.from_chain_results(results))
+    assert by_chain["ethereum"][parse_signature(SWAP)] == [2, 1.0]
+    assert by_chain["base"] == {parse_signature("claim"): [1, 0.5]}
+
+    metrics_state.merge_transactions(metrics_state.load_wallet_aggregates(address(1)), results)
+    stored = metrics_state.load_wallet_aggregates(address(1))
+    assert stored.method_totals(["ethereum", "base"]) == merge_method_totals(by_chain.values())
+    assert stored.method_summary(["ethereum"])["methods"][0]["calls"] == 2
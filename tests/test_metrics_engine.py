@@ -0,0 +1,53 @@
+from api.turnqey.metrics_engine import TransactionColumns, compute_financial_metrics
+from benchmarks.metrics_engine import (
+    SYNTHETIC_WALLET,
+    reference_financial_metrics,
+    split_delta,
+    synthetic_chain_results,
+)
+
+L1_CHAINS = ["ethereum", "polygon"]
+L2_CHAINS = ["arbitrum", "optimism"]
+
+
+def test_engine_matches_reference():
+    results, flagged = synthetic_chain_results(num_transactions=4000, num_counterparties=300)
+    columns = TransactionColumns.from_chain_results(results)
+
+    assert compute_financial_metrics(columns, flagged, L1_CHAINS, L2_CHAINS) == reference_financial_metrics(
+        results, flagged, L1_CHAINS, L2_CHAINS
+    )
+
+
+def test_stored_state_matches_reference_after_delta(metrics_state):
+    results, flagged = synthetic_chain_results(num_transactions=4000, num_counterparties=300)
+    history, delta = split_delta(results)
+    chains = [chain_data["chain"] for chain_data in results]
+
+    metrics_state.merge_transactions(metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET), history)
+    aggregates = metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET)
+    assert metrics_state.merge_transactions(aggregates, delta) == sum(len(c["transactions"]) for c in delta)
+
+    expected = reference_financial_metrics(results, flagged, L1_CHAINS, L2_CHAINS)
+    assert aggregates.financial_summary(chains, flagged, L1_CHAINS, L2_CHAINS) == expected
+    reloaded = metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET)
+    assert reloaded.financial_summary(chains, flagged, L1_CHAINS, L2_CHAINS) == expected
+
+
+def test_stale_chain_is_skipped_without_dropping_the_others(metrics_state):
+    results, flagged = synthetic_chain_results(num_transactions=400, num_counterparties=50)
+    history, delta = split_delta(results)
+    metrics_state.merge_transactions(metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET), history)
+
+    # Another worker already merged the ethereum delta
+    winner = metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET)
+    metrics_state.merge_transactions(winner, delta[:1])
+    loser = metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET)
+    loser.chain("ethereum").last_block = winner.chain("ethereum").last_block - 1
+
+    merged = metrics_state.merge_transactions(loser, delta)
+    assert merged == sum(len(c["transactions"]) for c in delta[1:])
+    stored = metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET)
+    assert {name: chain.tx_count for name, chain in stored.chains.items()} == {
+        c["chain"]: len(c["transactions"]) for c in results
+    }
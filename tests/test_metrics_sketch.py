@@ -0,0 +1,48 @@
+import asyncio
+
+from conftest import address, raw_tx
+from api.tools.etherscanv2 import SUPPORTED_CHAINS
+from api.turnqey.metrics_sketch import WalletSketch
+from benchmarks.metrics_engine import SYNTHETIC_WALLET, synthetic_chain_results
+
+
+def stored_aggregates(metrics_state):
+    results, flagged = synthetic_chain_results(num_transactions=2000, num_counterparties=120)
+    metrics_state.merge_transactions(metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET), results)
+    return metrics_state.load_wallet_aggregates(SYNTHETIC_WALLET), [c["chain"] for c in results], flagged
+
+
+def test_counterparty_counts_stream_in_batches(metrics_state):
+    aggregates, chains, _ = stored_aggregates(metrics_state)
+
+    for subset in (chains, chains[:2]):
+        counterparties, counts = aggregates.counterparty_totals(subset)[:2]
+        batches = list(aggregates.iter_counterparty_counts(subset, batch_size=7))
+        assert all(len(batch) <= 7 for batch in batches)
+        streamed = {c: n for batch in batches for c, n in batch.items()}
+        assert streamed == dict(zip(counterparties, counts.tolist()))
+
+
+def test_sketch_starts_from_stored_counterparties(metrics_state):
+    aggregates, chains, flagged = stored_aggregates(metrics_state)
+    expected = aggregates.financial_summary(chains, flagged, ["ethereum", "polygon"], ["arbitrum", "optimism"])
+
+    sketch = WalletSketch(SYNTHETIC_WALLET, flagged)
+    sketch.add_aggregates(aggregates, chains)
+    summary = sketch.summary(["ethereum", "polygon"], ["arbitrum", "optimism"])
+
+    assert summary["totalTransactions"] == expected["totalTransactions"]
+    assert summary["interactingWalletTransactions"] == expected["interactingWalletTransactions"]
+    assert summary["mostActiveWallet"]["address"] == expected["mostActiveWallet"]["address"]
+    assert summary["fraudRiskSummary"]["Flagged"] == expected["fraudRiskSummary"]["Flagged"]
+
+
+def test_new_wallet_estimate_caps_nonce_probes(metrics_state, etherscan):
+    from api.turnqey.metrics import MAX_ESTIMATE_PROBES, estimate_transaction_count
+
+    wallet = address(0xE57)
+    etherscan.add("ethereum", [raw_tx(block, wallet, address(1)) for block in range(1, 6)])
+    chains = list(SUPPORTED_CHAINS)
+
+    assert asyncio.run(estimate_transaction_count(wallet, chains)) == 5
+    assert etherscan.count("eth_getTransactionCount") == MAX_ESTIMATE_PROBES < len(chains)
@@ -0,0 +1,55 @@
+import asyncio
+
+from conftest import address, raw_tx
+
+WALLET = address(0xA11CE)
+
+
+def history(count: int):
+    """
+    `count` transactions, two per block, alternating direction across five counterparties.
+    """
+    return [
+        raw_tx(100 + i // 2, WALLET, address(i % 5 + 1)) if i % 2 else raw_tx(100 + i // 2, address(i % 5 + 1), WALLET)
+        for i in range(count)
+    ]
+
+
+def refresh(metrics_state, page_size: int = 5):
+    return asyncio.run(metrics_state.refresh_wallet_aggregates(WALLET, ["ethereum"], page_size=page_size))
+
+
+def test_refresh_pages_past_the_result_cap(metrics_state, etherscan):
+    etherscan.result_cap = 5
+    etherscan.add("ethereum", history(23))
+
+    aggregates = refresh(metrics_state)
+    assert aggregates.chain("ethereum").tx_count == 23
+    assert aggregates.chain("ethereum").last_block == 111
+    assert metrics_state.load_wallet_aggregates(WALLET).chain("ethereum").tx_count == 23
+
+    etherscan.add("ethereum", [raw_tx(120, WALLET, address(9))])
+    requests = len(etherscan.requests)
+    aggregates = refresh(metrics_state)
+    assert aggregates.chain("ethereum").tx_count == 24
+    assert etherscan.requests[requests]["startblock"] == "112"
+
+
+def test_failed_stream_stops_at_a_complete_block(metrics_state, etherscan):
+    etherscan.add("ethereum", history(23))
+    handle = etherscan.handle
+    outage = {"after": 2}
+
+    def fail_after_two_pages(request):
+        if outage and etherscan.count() >= outage["after"]:
+            etherscan.failing.add(WALLET.lower())
+        return handle(request)
+
+    etherscan.transport.handler = fail_after_two_pages
+    stored = refresh(metrics_state).chain("ethereum")
+    assert 0 < stored.tx_count < 23
+    assert stored.tx_count == sum(1 for tx in history(23) if int(tx["blockNumber"]) <= stored.last_block)
+
+    outage.clear()
+    etherscan.failing.clear()
+    assert refresh(metrics_state).chain("ethereum").tx_count == 23
@@ -0,0 +1,120 @@
+import asyncio
+
+from conftest import GENESIS, BLOCK_TIME, address, raw_tx
+from api.turnqey.origins import BatchTransactions, OriginsSummary, process_address
+
+WALLET = address(0xC0FFEE)
+ROUTER = address(0xD00D)
+
+
+def history():
+    transactions = [raw_tx(block, WALLET, address(block % 3 + 1)) for block in range(1, 31)]
+    transactions += [raw_tx(40, WALLET, ROUTER, function_name="swap(uint256)"), raw_tx(41, ROUTER, WALLET)]
+    return transactions
+
+
+def test_process_address_summarizes_without_keeping_transactions(etherscan, label_store):
+    label_store.import_labels("routers", [{"address": ROUTER, "name": "Router", "type": "dex", "chains": "ethereum"}])
+    etherscan.add("ethereum", history())
+
+    result = asyncio.run(process_address(WALLET))
+
+    assert result["status"] == "PROCESSED"
+    assert result["transactions"] == []
+    assert result["transaction_count"] == 32
+    assert result["chain_summaries"]["ethereum"]["transactions"] == 32
+    assert result["chain_summaries"]["ethereum"]["total_value"] == 32.0
+    assert [match["transaction_hash"] for match in result["known_origins"]] == [history()[30]["hash"], history()[31]["hash"]]
+    assert result["address_labels"][ROUTER]["name"] == "Router"
+    assert result["relationships"][WALLET][address(1)]["count"] == 10
+    assert result["method_summary"]["distinctMethods"] == 2
+
+
+def test_process_address_window_and_transaction_list(etherscan, label_store):
+    etherscan.add("ethereum", history())
+    start, end = GENESIS + 11 * BLOCK_TIME, GENESIS + 20 * BLOCK_TIME
+
+    result = asyncio.run(process_address(WALLET, start, end, include_transactions=True))
+
+    assert result["transaction_count"] == 10
+    assert [tx["hash"] for tx in result["transactions"]] == [tx["hash"] for tx in history()[10:20]]
+
+
+def test_summary_dedupes_repeats_within_a_block():
+    transactions = history()[:5]
+    summary = OriginsSummary()
+    summary.update("ethereum", transactions + [transactions[-1]])
+    assert summary.summary()["transaction_count"] == 5
+
+
+def test_batch_claims_matches_of_results_without_transactions():
+    match = {"chain": "ethereum", "transaction_hash": "0xabc", "origin_name": "Router"}
+    batch = BatchTransactions()
+
+    first = batch.claim({"address": "a", "known_origins": [dict(match)], "transactions": []})
+    second = batch.claim({"address": "b", "known_origins": [dict(match)], "transactions": []})
+
+    assert first["known_origins"] == [match] and first["shared_transactions"] == {}
+    assert second["known_origins"] == [] and second["shared_transactions"] == {"a": ["0xabc"]}
+
+
+def test_batches_reuse_recent_histories(etherscan, label_store, monkeypatch):
+    from api.turnqey import origins
+
+    monkeypatch.setattr(origins, "_recent_histories", origins.OrderedDict())
+    other = address(0xFEED)
+    etherscan.add("ethereum", history() + [raw_tx(50, other, WALLET)])
+
+    first = asyncio.run(origins.process_addresses_async([WALLET, other]))
+    requests = etherscan.count()
+    second = asyncio.run(origins.process_addresses_async([other, WALLET.upper().replace("0X", "0x")]))
+
+    assert etherscan.count() == requests
+    assert [r["transaction_count"] for r in second] == [1, 33]
+    assert [r["status"] for r in first] == ["PROCESSED", "PROCESSED"]
+
+    etherscan.failing.add(other)
+    asyncio.run(origins.process_addresses_async([other], start=GENESIS))
+    assert etherscan.count() > requests
+    assert not origins.recent_history(other, GENESIS, None)
+
+
+def test_stream_yields_in_completion_order_and_isolates_failures(monkeypatch):
+    from api.turnqey import origins
+
+    delays = {address(1): 0.05, address(2): 0.0, address(3): 0.02}
+
+    async def fake_process(wallet, start, end, client, include_transactions):
+        await asyncio.sleep(delays[wallet])
+        if wallet == address(3):
+            raise RuntimeError("boom")
+        return {"address": wallet, "status": "PROCESSED", "known_origins": [], "transactions": []}
+
+    monkeypatch.setattr(origins, "sync_known_origins", lambda: None)
+    monkeypatch.setattr(origins, "process_batch_address", fake_process)
+
+    async def collect():
+        return [result async for result in origins.iter_processed_addresses(list(delays) + [address(2)])]
+
+    results = asyncio.run(collect())
+    assert [r["address"] for r in results] == [address(2), address(3), address(1)]
+    assert [r["status"] for r in results] == ["PROCESSED", "ERROR", "PROCESSED"]
+    assert results[1]["details"] == "boom"
+
+
+def test_stream_matches_buffered_results(etherscan, label_store, monkeypatch):
+    from api.turnqey import origins
+
+    monkeypatch.setattr(origins, "_recent_histories", origins.OrderedDict())
+    other = address(0xFEED)
+    etherscan.add("ethereum", history() + [raw_tx(50, other, WALLET)])
+
+    async def collect():
+        return [result async for result in origins.iter_processed_addresses([WALLET, other])]
+
+    streamed = {r["address"]: r for r in asyncio.run(collect())}
+    buffered = {r["address"]: r for r in asyncio.run(origins.process_addresses_async([WALLET, other]))}
+    assert streamed.keys() == buffered.keys()
+    for key, result in streamed.items():
+        assert result["transaction_count"] == buffered[key]["transaction_count"]
+        assert result["relationships"] == buffered[key]["relationships"]
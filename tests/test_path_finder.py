@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from api.tools import path_finder
+from api.tools.address_graph import AddressGraph
+from api.tools.edge_cache import EDGE_CACHE_PATH, EDGE_CACHE_SCHEMA, prune_edges, record_transactions
+from api.tools.path_finder import bidirectional_bfs, find_paths, get_path_graph, k_shortest_paths
+from api.tools.sqlite_store import connect
+
+from conftest import address
+
+
+def int_graph(edges, n):
+    addresses = np.array([bytes([i]) * 20 for i in range(1, n + 1)], dtype="S20")
+    src, dst = (np.array(side, dtype=np.int64) for side in zip(*edges))
+    return AddressGraph(addresses, src, dst)
+
+
+DIAMOND = int_graph([(0, 1), (1, 5), (0, 2), (2, 5), (0, 3), (3, 4), (4, 5)], 7)
+
+
+def test_bidirectional_bfs_finds_a_shortest_path():
+    path = bidirectional_bfs(DIAMOND, 0, 5)
+    assert len(path) == 3 and path[0] == 0 and path[-1] == 5
+    assert bidirectional_bfs(DIAMOND, 0, 6) is None
+    assert bidirectional_bfs(DIAMOND, 0, 5, max_hops=1) is None
+
+    blocked = np.zeros(len(DIAMOND), dtype=bool)
+    blocked[[1, 2]] = True
+    assert bidirectional_bfs(DIAMOND, 0, 5, blocked_nodes=blocked) == [0, 3, 4, 5]
+
+
+def test_k_shortest_paths_are_loop_free_and_ordered():
+    paths = k_shortest_paths(DIAMOND, 0, 5, k=3)
+    assert sorted(paths[:2]) == [[0, 1, 5], [0, 2, 5]]
+    assert paths[2] == [0, 3, 4, 5]
+    assert all(len(set(p)) == len(p) for p in paths)
+    assert len(k_shortest_paths(DIAMOND, 0, 5, k=3, max_hops=2)) == 2
+
+
+@pytest.fixture
+def edge_cache():
+    conn = connect(EDGE_CACHE_PATH, EDGE_CACHE_SCHEMA)
+    with conn:
+        conn.execute("DELETE FROM tx_edges")
+    yield
+    with conn:
+        conn.execute("DELETE FROM tx_edges")
+
+
+def cache_edge(n, sender, recipient):
+    record_transactions([{"chain": "ethereum", "transactions": [
+        {"hash": f"0x{n:064x}", "from": sender, "to": recipient, "value_ether": 1.0, "blockNumber": str(n), "timeStamp": "0"},
+    ]}])
+
+
+def test_path_graph_reloads_edges_after_prune_keeps_count(tree_store, edge_cache, monkeypatch):
+    monkeypatch.setattr(path_finder, "load_flagged_data", lambda: [])
+    monkeypatch.setattr(path_finder, "_path_graph", None)
+    cache_edge(1, address(4), address(60))
+    cache_edge(2, address(60), address(61))
+    first = get_path_graph()
+    assert find_paths(address(1), address(61))["paths"][0]["hops"] == 4
+
+    # One edge in, one pruned out: the row count is unchanged
+    cache_edge(3, address(61), address(12))
+    assert prune_edges(max_rows=2) == 1
+    monkeypatch.setattr(path_finder, "GRAPH_REFRESH_SECONDS", -1)
+    second = get_path_graph()
+    assert second is not first
+    result = find_paths(address(61), address(10))
+    assert result["missing_addresses"] == []
+    assert result["paths"][0]["addresses"] == [address(61), address(12), address(11), address(10)]
+    assert result["paths"][0]["edges"][0]["family_tree"] is False
+    assert result["paths"][0]["edges"][1]["family_tree"] is True
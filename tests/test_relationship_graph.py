@@ -0,0 +1,61 @@
+from api.tools.relationship_graph import COUNT, OTHERS_NODE, build_relationship_graph
+from api.tools.time_windows import format_time_bound
+from api.turnqey.origins import build_relationships
+
+from conftest import address
+
+WALLET = address(1)
+
+
+def tx(sender, recipient, value, timestamp):
+    return {"from": sender, "to": recipient, "value_ether": value, "timeStamp": str(timestamp)}
+
+
+def test_repeated_transfers_share_one_weighted_edge():
+    results = [
+        {"chain": "ethereum", "transactions": [
+            tx(WALLET, address(2), 1.5, 300),
+            tx(WALLET.upper().replace("0X", "0x"), address(2), 0.5, 100),
+            tx(address(2), WALLET, 2.0, 200),
+            tx(WALLET, "", 9.0, 400),
+        ]},
+        {"chain": "polygon", "transactions": [tx(WALLET, address(2), 1.0, 500)]},
+    ]
+    graph = build_relationship_graph(results)
+    assert len(graph) == 2 and graph.num_nodes == 2
+
+    adjacency = graph.to_dict()
+    assert adjacency[WALLET][address(2)] == {
+        "count": 3,
+        "total_value": 3.0,
+        "first_seen": format_time_bound(100),
+        "last_seen": format_time_bound(500),
+    }
+    assert adjacency[address(2)][WALLET]["count"] == 1
+    # The origins endpoint reports the same adjacency
+    assert build_relationships(results) == adjacency
+
+
+def test_collapse_keeps_top_counterparties_and_sums_the_rest():
+    transactions = []
+    for peer, repeats in ((2, 5), (3, 4), (4, 1), (5, 1)):
+        transactions += [tx(WALLET, address(peer), 1.0, 100 + i) for i in range(repeats)]
+    transactions += [tx(address(6), WALLET, 2.0, 50), tx(address(2), address(3), 1.0, 60), tx(address(2), address(4), 1.0, 70)]
+    graph = build_relationship_graph([{"chain": "ethereum", "transactions": transactions}])
+
+    pruned, collapsed = graph.collapse(WALLET, top_n=2)
+    assert collapsed == 3
+    assert set(pruned.addresses) == {WALLET, address(2), address(3), OTHERS_NODE}
+    adjacency = pruned.to_dict()
+    assert adjacency[WALLET][OTHERS_NODE]["count"] == 2
+    assert adjacency[OTHERS_NODE][WALLET] == {
+        "count": 1,
+        "total_value": 2.0,
+        "first_seen": format_time_bound(50),
+        "last_seen": format_time_bound(50),
+    }
+    # Edges between kept counterparties survive; edges to dropped ones are removed
+    assert adjacency[address(2)] == {address(3): adjacency[address(2)][address(3)]}
+    assert sum(stats[COUNT] for _, _, stats in pruned.edges()) == len(transactions) - 1
+
+    assert graph.collapse(WALLET, top_n=10) == (graph, 0)
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from api.tools.time_windows import SECONDS_PER_DAY
+from api.turnqey import risk_scoring
+from api.turnqey.activity_patterns import ActivityTimeline
+from api.turnqey.risk_scoring import (
+    FEATURE_INDEX,
+    LogisticRiskModel,
+    build_feature_matrix,
+    register_risk_model,
+    score_counterparties,
+    timeline_stats,
+)
+
+from conftest import address
+
+NOW = 1_700_000_000
+
+
+def test_timeline_stats_report_first_seen_and_errors():
+    timeline = ActivityTimeline(
+        np.array([300, 100, 200, 400], dtype=np.int64),
+        np.ones(4),
+        np.array([7, 5, 7, 5]),
+        np.zeros(4, dtype=bool),
+        np.array([True, False, True, True]),
+    )
+    first_seen, errors = timeline_stats(timeline, np.array([5, 6, 7]))
+    assert first_seen.tolist() == [100, -1, 200]
+    assert errors.tolist() == [1, 0, 2]
+
+
+def test_feature_columns():
+    features = build_feature_matrix(
+        counts=np.array([4, 1]),
+        flagged=np.array([False, True]),
+        hops=np.array([1, -1]),
+        values=np.array([3.0, 1.0]),
+        first_seen=np.array([NOW - 10 * SECONDS_PER_DAY, -1]),
+        errors=np.array([2.0, 0.0]),
+        now=NOW,
+    )
+    column = lambda name: features[:, FEATURE_INDEX[name]].tolist()
+    assert column("flagged") == [0, 1]
+    assert column("hop_distance") == [1, -1]
+    assert column("proximity") == [0.5, 0]
+    assert column("value_share") == [0.75, 0.25]
+    assert column("first_seen_age_days") == [10, 0]
+    assert column("error_rate") == [0.5, 0]
+    assert column("log_transactions") == pytest.approx([np.log(5), np.log(2)])
+
+    unindexed = build_feature_matrix(np.ones(2), np.zeros(2, dtype=bool), None, np.zeros(2), np.full(2, -1), np.zeros(2), NOW)
+    assert unindexed[:, FEATURE_INDEX["hop_distance"]].tolist() == [-1, -1]
+    assert not unindexed[:, FEATURE_INDEX["value_share"]].any()
+
+
+def scored(model_name=None, top_n=25):
+    # A flagged address, one next to a flagged source, a new failing one and an old regular
+    return score_counterparties(
+        [address(i) for i in range(1, 5)],
+        counts=np.array([1, 2, 3, 500]),
+        flagged=np.array([True, False, False, False]),
+        hops=np.array([0, 1, -1, -1]),
+        values=np.array([1.0, 1.0, 1.0, 1.0]),
+        first_seen=np.array([NOW, NOW, NOW - SECONDS_PER_DAY, NOW - 900 * SECONDS_PER_DAY]),
+        errors=np.array([0.0, 0.0, 3.0, 0.0]),
+        now=NOW,
+        model_name=model_name,
+        top_n=top_n,
+    )
+
+
+def test_default_model_ranks_and_tiers_counterparties():
+    result = scored()
+    assert [entry["address"] for entry in result["counterparties"]] == [address(1), address(3), address(2), address(4)]
+    assert [entry["tier"] for entry in result["counterparties"]] == ["Flagged", "High", "High", "Low"]
+    assert result["summary"] == {"Low": 1, "Moderate": 0, "High": 2, "Flagged": 1}
+    assert scored(top_n=2)["counterparties"] == result["counterparties"][:2]
+
+
+def test_models_are_selectable_by_name(monkeypatch):
+    monkeypatch.setattr(risk_scoring, "RISK_MODELS", dict(risk_scoring.RISK_MODELS))
+    register_risk_model(LogisticRiskModel("errors_only", {"error_rate": 10.0}, bias=-5.0))
+    result = scored("errors_only")
+    assert result["model"] == "errors_only"
+    assert result["counterparties"][0]["address"] == address(3)
+    assert result["summary"]["High"] == 1
+
+    with pytest.raises(ValueError, match="Unknown risk model"):
+        scored("missing")
+    with pytest.raises(ValueError, match="Unknown risk features"):
+        LogisticRiskModel("bad", {"shoe_size": 1.0})
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from api.tools import similarity_index
+from api.tools.similarity_index import find_similar_wallets, minhash_signature, update_wallet_signature
+
+from conftest import address
+
+
+@pytest.fixture
+def similarity_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity_index, "SIMILARITY_INDEX_PATH", str(tmp_path / "similarity.db"))
+
+
+def test_signature_agreement_estimates_jaccard():
+    base = [address(i) for i in range(400)]
+    # 300 shared out of 500 distinct: Jaccard 0.6
+    other = base[100:] + [address(1000 + i) for i in range(100)]
+    estimate = np.mean(minhash_signature(base) == minhash_signature(other))
+    assert abs(estimate - 0.6) < 0.1
+
+    # Order, case and duplicates do not change the signature; invalid entries are ignored
+    assert np.array_equal(minhash_signature(base), minhash_signature(["0x" + a[2:].upper() for a in reversed(base)] + base[:5] + ["junk"]))
+    assert minhash_signature([]) is None
+
+
+def test_similar_wallets_are_found_through_shared_buckets(similarity_db):
+    base = [address(i) for i in range(300)]
+    assert update_wallet_signature(address(9001), base)
+    assert update_wallet_signature(address(9002), base[:270] + [address(2000 + i) for i in range(30)])
+    assert update_wallet_signature(address(9003), [address(5000 + i) for i in range(300)])
+    assert not update_wallet_signature(address(9004), [])
+
+    similar = find_similar_wallets(address(9001))
+    assert [entry["wallet"] for entry in similar] == [address(9002)]
+    assert similar[0]["estimated_jaccard"] > 0.6 and similar[0]["counterparties"] == 300
+
+    # Re-indexing replaces the old buckets
+    update_wallet_signature(address(9002), [address(6000 + i) for i in range(300)])
+    assert find_similar_wallets(address(9001)) == []
+
+    adhoc = find_similar_wallets(address(1), counterparties=[address(5000 + i) for i in range(300)])
+    assert adhoc[0] == {"wallet": address(9003), "estimated_jaccard": 1.0, "counterparties": 300}
+    assert find_similar_wallets(address(9999)) is None
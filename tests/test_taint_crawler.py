@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from api.tools import taint_crawler
+from api.tools.taint_crawler import find_taint_paths, summarize_counterparties
+
+from conftest import address, raw_tx
+
+ROOT = address(1)
+HEAVY = address(2)
+LIGHT = address(3)
+FLAGGED = address(99)
+
+
+@pytest.fixture
+def crawl_graph(etherscan, monkeypatch):
+    monkeypatch.setattr(taint_crawler, "queue_transactions", lambda chain_results: True)
+    etherscan.add("ethereum", [
+        raw_tx(10, ROOT, HEAVY, 5 * 10**18),
+        raw_tx(11, ROOT, LIGHT, 10**18),
+        raw_tx(12, HEAVY, FLAGGED, 10**18),
+        raw_tx(13, LIGHT, address(4), 10**18),
+    ])
+    return etherscan
+
+
+def crawl(**kwargs):
+    return asyncio.run(find_taint_paths(ROOT, chains=["ethereum"], flagged_addresses={FLAGGED}, use_exposure_index=False, **kwargs))
+
+
+def test_summarize_counterparties_keeps_heaviest_evidence():
+    chain_results = [{"chain": "ethereum", "transactions": [
+        {"hash": "0xa", "from": ROOT, "to": HEAVY, "value_ether": 1.0},
+        {"hash": "0xb", "from": HEAVY, "to": ROOT, "value_ether": 3.0},
+        {"hash": "0xc", "from": ROOT, "to": ROOT, "value_ether": 9.0},
+    ]}]
+    summary = summarize_counterparties(ROOT, chain_results)
+    assert list(summary) == [HEAVY]
+    assert summary[HEAVY]["tx_count"] == 2
+    assert summary[HEAVY]["total_value"] == 4.0
+    assert summary[HEAVY]["evidence"]["hash"] == "0xb"
+
+
+def test_crawl_expands_heaviest_edge_first_and_reports_path(crawl_graph):
+    result = crawl()
+    assert result["tainted"] is True
+    path = result["paths"][0]
+    assert path["path"] == [ROOT, HEAVY, FLAGGED]
+    assert [edge["from"] for edge in path["edges"]] == [ROOT, HEAVY]
+    # The root and the heavy branch were enough; the light branch was never fetched
+    assert result["api_calls"] == 2
+    assert crawl_graph.count("txlist", LIGHT) == 0
+
+
+def test_crawl_stops_at_request_budget(crawl_graph):
+    result = crawl(max_api_calls=1)
+    assert result["tainted"] is False
+    assert result["budget_exhausted"] is True
+    assert result["api_calls"] == 1
+    assert crawl_graph.count("txlist") == 1
+
+
+def test_crawl_respects_max_depth(crawl_graph):
+    result = crawl(max_depth=1)
+    assert result["tainted"] is False
+    assert result["depth_reached"] == 1
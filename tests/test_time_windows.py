@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from conftest import BLOCK_TIME, GENESIS, address, raw_tx
+from api.tools.time_windows import SECONDS_PER_DAY, parse_time_bound, parse_time_range
+
+WALLET = address(0xB0B)
+
+
+@pytest.mark.parametrize("value", [True, False])
+def test_parse_time_bound_rejects_booleans(value):
+    with pytest.raises(ValueError):
+        parse_time_bound(value)
+
+
+def test_parse_time_bounds():
+    assert parse_time_bound(None) is None
+    assert parse_time_bound("1700000000") == 1_700_000_000
+    assert parse_time_bound(1_700_000_000.7) == 1_700_000_000
+    assert parse_time_bound("2024-01-01") == 1_704_067_200
+    assert parse_time_bound("2024-01-01", end_of_day=True) == 1_704_067_200 + SECONDS_PER_DAY - 1
+    with pytest.raises(ValueError):
+        parse_time_range("2024-02-01", "2024-01-01")
+
+
+def test_window_metrics_fetch_only_the_window_blocks(etherscan):
+    from api.turnqey.metrics import calculate_window_metrics
+
+    blocks = range(10_000, 2_000_001, 10_000)
+    etherscan.add("ethereum", [raw_tx(block, address(block // 10_000 % 7 + 1), WALLET) for block in blocks])
+    end = GENESIS + 2_000_000 * BLOCK_TIME
+    start = end - 10 * SECONDS_PER_DAY
+
+    metrics = asyncio.run(calculate_window_metrics(WALLET, ["ethereum"], set(), start=start, end=end))
+
+    txlist = [params for params in etherscan.requests if params["action"] == "txlist"]
+    assert len(txlist) == 1
+    # The widest rolling window (90 days) reaches further back than the 10 day range
+    assert int(txlist[0]["startblock"]) == 2_000_000 - 90 * SECONDS_PER_DAY // BLOCK_TIME
+    assert int(txlist[0]["endblock"]) == 2_000_000
+    in_range = sum(1 for block in blocks if GENESIS + block * BLOCK_TIME >= start)
+    assert metrics["financialMetrics"]["totalTransactions"] == in_range